@@ -1,113 +1,346 @@
-from flask import Flask, request, jsonify
-import joblib
-import pandas as pd
-import numpy as np
-import os
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
 
+import metrics
+from batcher import batcher_from_env
+from counterfactual import DEFAULT_COUNTERFACTUAL_BUDGET_MS, find_counterfactual
+from explainer import (
+    DEFAULT_EXPLAIN_TOP_N, DEFAULT_TOP_FEATURES, MAX_EXPLAIN_BATCH_SIZE, explain_cached,
+)
+from inference import DIRECT_SCORE_FEATURES, numeric_score
+from model_registry import admin_allowed, registry_from_env
+from prediction_cache import cache_from_env
+from predictor import DEFAULT_TOP_N, MAX_BATCH_SIZE
+
 app = Flask(__name__)
 
 # Enable CORS for the frontend origin
 CORS(app, origins=["http://localhost:5173"])
 
-# Define the path to the model pipeline file
-# Assuming the model file is in the same directory as this app.py
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'Career_model_pipeline.pkl')
-
-# Load the model pipeline when the app starts
-pipeline = None
-try:
-    pipeline = joblib.load(MODEL_PATH)
-    print("Successfully loaded model pipeline.")
-except FileNotFoundError:
-    print(f"Error: Model file not found at {MODEL_PATH}")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    print("Ensure you have the correct versions of joblib, scikit-learn, and lightgbm installed.")
-
-# Define the expected features for the model input based on the notebook analysis
-# These are the direct scores used, excluding the engineered features initially
-DIRECT_SCORE_FEATURES = [
-    'cognition', 'reasoning', 'figural_memory', 'spatial_ability',
-    'verbal_ability', 'social_ability', 'numerical_ability', 'numerical_memory',
-    'knowledge', 'practical', 'artistic', 'social', 'power_coping'
-]
-
-# The full list of features including engineered ones, in the order expected by the model
-# This order is important for consistency if your scaler or model are sensitive to it
-# Based on the provided list, assuming this is the correct order
-EXPECTED_FEATURES_ORDER = [
-    'cognition', 'reasoning', 'figural_memory', 'spatial_ability',
-    'verbal_ability', 'social_ability', 'numerical_ability', 'numerical_memory',
-    'knowledge', 'practical', 'artistic', 'social', 'power_coping',
-    'analytical_skill', 'creative_practical'
-]
+# Load the model pipeline when the app starts; the registry swaps in new versions later
+registry = registry_from_env()
+
+
+def predict_score_rows(score_rows, top_n):
+    """Scale and score a list of score dicts; used as the micro-batcher's batch function.
+
+    Returns (careers, probabilities, model_version) for the version active at call time.
+    """
+    predictor = registry.active
+    metrics.record_batch('predict', len(score_rows))
+    careers, probabilities = predictor.predict_score_rows(score_rows, top_n, metrics.stage_timer())
+    return careers, probabilities, predictor.version
+
+
+# Opt-in request coalescing for concurrent /predict traffic (see batcher_from_env)
+batcher = batcher_from_env(predict_score_rows)
+
+# Cache of /predict results for repeated score vectors (see cache_from_env)
+prediction_cache = cache_from_env()
+
+# Cache of /explain results per profile (EXPLANATION_CACHE_SIZE/TTL/QUANTUM)
+explanation_cache = cache_from_env('EXPLANATION_CACHE', default_size=1000)
+
+
+@app.before_request
+def start_timer():
+    g.timer = metrics.stage_timer()
+    g.error = None
+
+
+@app.after_request
+def record_request(response):
+    """Count the request by endpoint and status; 4xx/5xx responses also count as errors."""
+    timer = getattr(g, 'timer', None)
+    if timer is not None:
+        error = g.error
+        if error is None and response.status_code >= 400:
+            error = f"http_{response.status_code}"
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.record_request(endpoint, response.status_code, timer.elapsed(), error)
+    return response
+
+
+def predict_one(scores):
+    """Score a single profile, coalesced with concurrent requests when batching is enabled."""
+    if batcher is not None:
+        return batcher.predict(scores, DEFAULT_TOP_N)
+    predicted_careers, probabilities, model_version = predict_score_rows([scores], DEFAULT_TOP_N)
+    return predicted_careers[0], probabilities[0], model_version
 
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    if pipeline is None:
+    predictor = registry.active
+    if predictor is None:
         return jsonify({"error": "Model not loaded"}), 500
 
     try:
         # Get the scores from the request
         data = request.get_json(force=True)
         scores = data.get('scores')
+        g.timer.lap('parse')
 
         if not scores:
+            g.error = 'invalid_request'
             return jsonify({"error": "No scores provided"}), 400
 
-        # --- Data Preprocessing to match training data format ---
-        # Create a dictionary with the expected direct score features
-        # Use .get() with a default of 0 in case a score is missing
-        feature_data = {feature: scores.get(feature, 0) for feature in DIRECT_SCORE_FEATURES}
+        # Score the profile, reusing the cached result for a repeated score vector
+        if prediction_cache is not None:
+            predicted_careers, _, model_version = prediction_cache.get_or_compute(
+                scores, DEFAULT_TOP_N, predictor.version, predict_one,
+                version_of=lambda result: result[2],
+            )
+        else:
+            predicted_careers, _, model_version = predict_one(scores)
 
-        # Convert to DataFrame
-        # Initially create with direct scores, then add engineered features
-        input_df = pd.DataFrame([feature_data])
+        # Convert predictions to a list
+        predicted_careers_list = predicted_careers.tolist()
 
-        # Recreate engineered features - must match notebook logic exactly
-        # Ensure the keys used here match the keys retrieved from `scores` above
-        # These columns should exist in input_df now
-        input_df['analytical_skill'] = input_df['reasoning'] * input_df['numerical_ability']
-        input_df['creative_practical'] = input_df['artistic'] * input_df['practical']
+        return jsonify({"predicted_careers": predicted_careers_list, "model_version": model_version})
 
-        # Reorder columns to match the order the model was trained on
-        # This is crucial for ensuring correct input to the scaler and model
-        input_df = input_df[EXPECTED_FEATURES_ORDER]
+    except Exception as e:
+        print(f"Error during prediction: {e}")
+        g.error = e
+        return jsonify({"error": "Error during prediction", "details": str(e)}), 500
 
-        # --- End Preprocessing ---
 
-        # Scale the input features using the loaded scaler
-        scaler = pipeline['scaler']
-        input_scaled = scaler.transform(input_df)
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Score many profiles in one call.
 
-        # Make predictions using the loaded model
-        model = pipeline['model']
-        # Get probabilities to find top N careers
-        probabilities = model.predict_proba(input_scaled)
+    The body holds either "scores", a list of score dicts keyed like /predict,
+    or "matrix", a list of rows ordered as DIRECT_SCORE_FEATURES. An optional
+    "top_n" sets how many careers are returned per profile.
+    """
+    predictor = registry.active
+    if predictor is None:
+        return jsonify({"error": "Model not loaded"}), 500
 
-        # Get top N predictions (e.g., top 5)
-        top_n = 5 # Or any number you want
-        # Get the indices of the top N probabilities
-        top_n_indices = np.argsort(probabilities[0])[-top_n:][::-1]
+    data = request.get_json(force=True, silent=True)
+    g.timer.lap('parse')
+    if not isinstance(data, dict):
+        g.error = 'invalid_request'
+        return jsonify({"error": "Request body must be a JSON object"}), 400
 
-        # Decode the predicted labels using the loaded encoder
-        encoder = pipeline['encoder']
-        predicted_careers = encoder.inverse_transform(top_n_indices)
+    score_rows = data.get('scores')
+    matrix = data.get('matrix')
+    rows = score_rows if score_rows is not None else matrix
 
-        # Convert predictions to a list
-        predicted_careers_list = predicted_careers.tolist()
+    if not rows or not isinstance(rows, list):
+        g.error = 'invalid_request'
+        return jsonify({"error": "Provide a non-empty 'scores' list or 'matrix'"}), 400
+    if len(rows) > MAX_BATCH_SIZE:
+        g.error = 'invalid_request'
+        return jsonify({"error": f"Batch size exceeds the limit of {MAX_BATCH_SIZE}"}), 400
+
+    try:
+        top_n = predictor.clamp_top_n(data.get('top_n', DEFAULT_TOP_N))
+        if score_rows is not None:
+            if not all(isinstance(scores, dict) for scores in score_rows):
+                raise ValueError("Every entry in 'scores' must be an object")
+            input_scaled = predictor.scale_score_rows(score_rows, g.timer)
+        else:
+            input_scaled = predictor.scale_score_matrix(matrix, g.timer)
+    except (TypeError, ValueError) as e:
+        g.error = 'invalid_request'
+        return jsonify({"error": "Invalid batch", "details": str(e)}), 400
+
+    try:
+        metrics.record_batch('predict_batch', len(rows))
+        predicted_careers, probabilities = predictor.predict_top_n(input_scaled, top_n, g.timer)
 
-        return jsonify({"predicted_careers": predicted_careers_list})
+        predictions = [
+            {"predicted_careers": careers.tolist(), "probabilities": probs.tolist()}
+            for careers, probs in zip(predicted_careers, probabilities)
+        ]
+        return jsonify({"predictions": predictions, "model_version": predictor.version})
 
     except Exception as e:
-        print(f"Error during prediction: {e}")
+        print(f"Error during batch prediction: {e}")
+        g.error = e
         return jsonify({"error": "Error during prediction", "details": str(e)}), 500
 
+
+@app.route('/explain', methods=['POST'])
+def explain():
+    """Explain why careers are recommended, using SHAP values.
+
+    The body holds "scores", one score dict or a list of them, plus optional
+    "top_n" (careers explained per profile) and "top_features" (features
+    reported per career).
+    """
+    predictor = registry.active
+    if predictor is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    data = request.get_json(force=True, silent=True)
+    g.timer.lap('parse')
+    if not isinstance(data, dict):
+        g.error = 'invalid_request'
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+    score_rows = data.get('scores')
+    if isinstance(score_rows, dict):
+        score_rows = [score_rows]
+    try:
+        if not score_rows or not isinstance(score_rows, list):
+            raise ValueError("Provide 'scores' as an object or a non-empty list of objects")
+        if len(score_rows) > MAX_EXPLAIN_BATCH_SIZE:
+            raise ValueError(f"Batch size exceeds the limit of {MAX_EXPLAIN_BATCH_SIZE}")
+        if not all(isinstance(scores, dict) and scores for scores in score_rows):
+            raise ValueError("Every entry in 'scores' must be a non-empty object")
+        try:
+            [numeric_score(scores.get(feature, 0)) for scores in score_rows for feature in DIRECT_SCORE_FEATURES]
+        except (TypeError, ValueError):
+            raise ValueError(f"Scores must be numeric for {DIRECT_SCORE_FEATURES}") from None
+        top_n = predictor.clamp_top_n(data.get('top_n', DEFAULT_EXPLAIN_TOP_N))
+        top_features = data.get('top_features', DEFAULT_TOP_FEATURES)
+        if isinstance(top_features, bool) or not isinstance(top_features, int) or top_features < 1:
+            raise ValueError("top_features must be a positive integer")
+    except ValueError as e:
+        g.error = 'invalid_request'
+        return jsonify({"error": "Invalid request", "details": str(e)}), 400
+
+    try:
+        explanations = explain_cached(predictor, score_rows, top_n, top_features, explanation_cache)
+        g.timer.lap('explain')
+        return jsonify({"explanations": explanations, "model_version": predictor.version})
+
+    except Exception as e:
+        print(f"Error during explanation: {e}")
+        g.error = e
+        return jsonify({"error": "Error during explanation", "details": str(e)}), 500
+
+
+@app.route('/counterfactual', methods=['POST'])
+def counterfactual():
+    """Find the smallest change to a profile's scores that makes a career one of its top matches.
+
+    The body holds "scores" (one score dict) and "target_career", plus optional
+    "top_n", "features" (the scores allowed to change), "allow_decrease" and
+    "time_budget_ms".
+    """
+    predictor = registry.active
+    if predictor is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    data = request.get_json(force=True, silent=True)
+    g.timer.lap('parse')
+    if not isinstance(data, dict):
+        g.error = 'invalid_request'
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+    scores = data.get('scores')
+    target_career = data.get('target_career')
+    features = data.get('features')
+    allow_decrease = data.get('allow_decrease', False)
+    try:
+        if not scores or not isinstance(scores, dict):
+            raise ValueError("Provide 'scores' as a non-empty object")
+        if not isinstance(target_career, str):
+            raise ValueError("Provide 'target_career' as a string")
+        if features is not None and not isinstance(features, list):
+            raise ValueError("'features' must be a list of score names")
+        if not isinstance(allow_decrease, bool):
+            raise ValueError("allow_decrease must be true or false")
+        result = find_counterfactual(
+            predictor, scores, target_career, data.get('top_n', DEFAULT_TOP_N), features, allow_decrease,
+            data.get('time_budget_ms', DEFAULT_COUNTERFACTUAL_BUDGET_MS),
+        )
+    except (TypeError, ValueError) as e:
+        g.error = 'invalid_request'
+        return jsonify({"error": "Invalid request", "details": str(e)}), 400
+    except Exception as e:
+        print(f"Error during counterfactual search: {e}")
+        g.error = e
+        return jsonify({"error": "Error during counterfactual search", "details": str(e)}), 500
+
+    g.timer.lap('counterfactual')
+    metrics.record_batch('counterfactual', result['candidates_scored'])
+    return jsonify({**result, "model_version": predictor.version})
+
+
+@app.route('/batcher/stats', methods=['GET'])
+def batcher_stats():
+    """Batch size distribution and queueing delay of the micro-batcher."""
+    if batcher is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **batcher.stats()})
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit, miss and eviction counters of the prediction and explanation caches."""
+    if prediction_cache is None:
+        response = {"enabled": False}
+    else:
+        response = {"enabled": True, **prediction_cache.stats()}
+    response["explanations"] = (
+        {"enabled": True, **explanation_cache.stats()} if explanation_cache is not None else {"enabled": False}
+    )
+    return jsonify(response)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request counts, error counts, stage latencies and batch sizes in Prometheus text format."""
+    predictor = registry.active
+    body = metrics.render(predictor.version if predictor is not None else None)
+    return app.response_class(body, content_type=metrics.CONTENT_TYPE)
+
+
+def admin_denied():
+    """Error response when the request lacks a valid X-Admin-Token, else None."""
+    if not admin_allowed(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Admin access denied"}), 403
+    return None
+
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """Active and previous model versions and the recent load history."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify(registry.status())
+
+
+@app.route('/admin/models/reload', methods=['POST'])
+def admin_reload():
+    """Load a model version in the background and swap it in once it is warm.
+
+    An optional "name" picks an artifact in MODEL_DIR; by default the newest one
+    is loaded. Poll GET /admin/models for the outcome.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        path = registry.resolve_name(data['name']) if data.get('name') else None
+        registry.reload(path)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid reload", "details": str(e)}), 400
+    return jsonify({"status": "loading"}), 202
+
+
+@app.route('/admin/models/rollback', methods=['POST'])
+def admin_rollback():
+    """Swap the previous model version back in without reloading it."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        predictor = registry.rollback()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"model_version": predictor.version})
+
+
 if __name__ == '__main__':
     # To run the Flask app, navigate to the directory containing app.py in your terminal
     # and run: python app.py
     # For development, you can run with debug=True
-    # For production, use a production-ready WSGI server like Gunicorn or uWSGI
+    # For production, run the ASGI entry point instead: python asgi_app.py
     app.run(debug=True, port=5001) # You can choose any available port 
\ No newline at end of file
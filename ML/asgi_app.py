@@ -0,0 +1,388 @@
+"""Production ASGI entry point for the career prediction service.
+
+Serves the same ``/predict`` and ``/predict_batch`` contract as ``app.py`` on
+FastAPI/uvicorn. Request bodies are validated once into typed models, and
+model inference runs in a bounded thread pool so the event loop never blocks
+on ``predict_proba``.
+
+Run with: python asgi_app.py  (or: uvicorn asgi_app:app --port 5001)
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+
+import uvicorn
+from fastapi import FastAPI, Header, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, create_model, model_validator
+
+import metrics
+from batcher import batcher_from_env
+from counterfactual import DEFAULT_COUNTERFACTUAL_BUDGET_MS, find_counterfactual
+from explainer import (
+    DEFAULT_EXPLAIN_TOP_N, DEFAULT_TOP_FEATURES, MAX_EXPLAIN_BATCH_SIZE, explain_cached,
+)
+from inference import DIRECT_SCORE_FEATURES
+from model_registry import admin_allowed, registry_from_env
+from prediction_cache import cache_from_env
+from predictor import DEFAULT_TOP_N, MAX_BATCH_SIZE
+
+# Threads running model inference; NumPy and the tree libraries release the GIL
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', str(os.cpu_count() or 4)))
+
+# Requests allowed to wait for an inference thread before new ones queue on the event loop
+MAX_PENDING_INFERENCES = int(os.environ.get('MAX_PENDING_INFERENCES', str(4 * INFERENCE_THREADS)))
+
+
+class ScoreBase(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
+    @model_validator(mode='before')
+    @classmethod
+    def require_scores(cls, data):
+        if isinstance(data, dict) and not data:
+            raise ValueError("No scores provided")
+        return data
+
+    def as_row(self):
+        return [getattr(self, feature) for feature in DIRECT_SCORE_FEATURES]
+
+
+# One float field per direct score; missing scores default to 0 as in app.py
+Scores = create_model(
+    'Scores', __base__=ScoreBase,
+    **{feature: (float, 0.0) for feature in DIRECT_SCORE_FEATURES},
+)
+
+
+class PredictRequest(BaseModel):
+    scores: Scores
+
+
+class PredictBatchRequest(BaseModel):
+    scores: Optional[List[Scores]] = Field(default=None, min_length=1, max_length=MAX_BATCH_SIZE)
+    matrix: Optional[List[List[float]]] = Field(default=None, min_length=1, max_length=MAX_BATCH_SIZE)
+    top_n: int = Field(default=DEFAULT_TOP_N, ge=1)
+
+    @model_validator(mode='after')
+    def require_rows(self):
+        if self.scores is None and self.matrix is None:
+            raise ValueError("Provide a non-empty 'scores' list or 'matrix'")
+        return self
+
+    def as_matrix(self):
+        if self.scores is not None:
+            return [scores.as_row() for scores in self.scores]
+        return self.matrix
+
+
+class ExplainRequest(BaseModel):
+    scores: Union[Scores, List[Scores]]
+    top_n: int = Field(default=DEFAULT_EXPLAIN_TOP_N, ge=1)
+    top_features: int = Field(default=DEFAULT_TOP_FEATURES, ge=1)
+
+    @model_validator(mode='after')
+    def limit_rows(self):
+        if isinstance(self.scores, list) and not 1 <= len(self.scores) <= MAX_EXPLAIN_BATCH_SIZE:
+            raise ValueError(f"Provide between 1 and {MAX_EXPLAIN_BATCH_SIZE} profiles in 'scores'")
+        return self
+
+    def score_rows(self):
+        rows = self.scores if isinstance(self.scores, list) else [self.scores]
+        return [scores.model_dump() for scores in rows]
+
+
+class CounterfactualRequest(BaseModel):
+    scores: Scores
+    target_career: str
+    top_n: int = Field(default=DEFAULT_TOP_N, ge=1)
+    features: Optional[List[str]] = Field(default=None, min_length=1)
+    allow_decrease: bool = False
+    time_budget_ms: float = Field(default=DEFAULT_COUNTERFACTUAL_BUDGET_MS, gt=0)
+
+
+class ReloadRequest(BaseModel):
+    name: Optional[str] = None
+
+
+app = FastAPI(title="Career Pathfinder prediction service")
+
+# Enable CORS for the frontend origin
+app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:5173"], allow_methods=["*"],
+                   allow_headers=["*"])
+
+# Load the model pipeline when the app starts; the registry swaps in new versions later
+registry = registry_from_env()
+
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix='inference')
+inference_slots = asyncio.Semaphore(MAX_PENDING_INFERENCES)
+
+
+def predict_score_rows(score_rows, top_n):
+    """Scale and score a list of score dicts; used as the micro-batcher's batch function.
+
+    Returns (careers, probabilities, model_version) for the version active at call time.
+    """
+    predictor = registry.active
+    metrics.record_batch('predict', len(score_rows))
+    careers, probabilities = predictor.predict_score_rows(score_rows, top_n, metrics.stage_timer())
+    return careers, probabilities, predictor.version
+
+
+# Opt-in request coalescing for concurrent /predict traffic (see batcher_from_env)
+batcher = batcher_from_env(predict_score_rows)
+
+# Cache of /predict results for repeated score vectors (see cache_from_env)
+prediction_cache = cache_from_env()
+
+# Cache of /explain results per profile (EXPLANATION_CACHE_SIZE/TTL/QUANTUM)
+explanation_cache = cache_from_env('EXPLANATION_CACHE', default_size=1000)
+
+
+def predict_matrix(predictor, matrix, top_n):
+    """Scale and score rows ordered as DIRECT_SCORE_FEATURES."""
+    timer = metrics.stage_timer()
+    input_scaled = predictor.scale_score_matrix(matrix, timer)
+    metrics.record_batch('predict_batch', len(input_scaled))
+    return predictor.predict_top_n(input_scaled, top_n, timer)
+
+
+async def run_inference(function, *args):
+    """Run a blocking inference call in the worker pool without blocking the event loop."""
+    async with inference_slots:
+        return await asyncio.get_running_loop().run_in_executor(inference_pool, function, *args)
+
+
+async def predict_one(scores):
+    """Score a single score dict, coalesced with concurrent requests when batching is enabled."""
+    if batcher is not None:
+        return await asyncio.wrap_future(batcher.submit(scores, DEFAULT_TOP_N))
+    careers, probabilities, model_version = await run_inference(predict_score_rows, [scores], DEFAULT_TOP_N)
+    return careers[0], probabilities[0], model_version
+
+
+async def predict_one_cached(predictor, scores):
+    """Score a single score dict, reusing the cached result for a repeated score vector."""
+    if prediction_cache is None:
+        return await predict_one(scores)
+
+    vector, canonical = prediction_cache.canonical_scores(scores)
+    if vector is None:
+        return await predict_one(scores)
+    key = prediction_cache.make_key(vector, DEFAULT_TOP_N)
+    result = prediction_cache.get(key, predictor.version)
+    if result is None:
+        result = await predict_one(canonical)
+        # Store under the version that computed it, which differs if a swap happened meanwhile
+        prediction_cache.put(key, result, result[2])
+    return result
+
+
+@app.middleware('http')
+async def record_request(request: Request, call_next):
+    """Count the request by endpoint and status; 4xx/5xx responses also count as errors."""
+    request.state.timer = metrics.stage_timer()
+    request.state.error = None
+    response = await call_next(request)
+    error = request.state.error
+    if error is None and response.status_code >= 400:
+        error = f"http_{response.status_code}"
+    route = request.scope.get('route')
+    endpoint = route.path if route is not None else 'unmatched'
+    metrics.record_request(endpoint, response.status_code, request.state.timer.elapsed(), error)
+    return response
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    # Keep the Flask service's 400 error shape instead of FastAPI's default 422
+    request.state.error = 'invalid_request'
+    details = "; ".join(error['msg'] for error in exc.errors())
+    return JSONResponse({"error": "Invalid request", "details": details}, status_code=400)
+
+
+@app.post('/predict')
+async def predict(body: PredictRequest, request: Request):
+    # Body reading and validation happen before the handler runs
+    request.state.timer.lap('parse')
+    predictor = registry.active
+    if predictor is None:
+        return JSONResponse({"error": "Model not loaded"}, status_code=500)
+
+    try:
+        careers, _, model_version = await predict_one_cached(predictor, body.scores.model_dump())
+        return {"predicted_careers": careers.tolist(), "model_version": model_version}
+    except Exception as e:
+        print(f"Error during prediction: {e}")
+        request.state.error = e
+        return JSONResponse({"error": "Error during prediction", "details": str(e)}, status_code=500)
+
+
+@app.post('/predict_batch')
+async def predict_batch(body: PredictBatchRequest, request: Request):
+    request.state.timer.lap('parse')
+    predictor = registry.active
+    if predictor is None:
+        return JSONResponse({"error": "Model not loaded"}, status_code=500)
+
+    try:
+        top_n = predictor.clamp_top_n(body.top_n)
+        careers, probabilities = await run_inference(predict_matrix, predictor, body.as_matrix(), top_n)
+    except ValueError as e:
+        request.state.error = 'invalid_request'
+        return JSONResponse({"error": "Invalid batch", "details": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"Error during batch prediction: {e}")
+        request.state.error = e
+        return JSONResponse({"error": "Error during prediction", "details": str(e)}, status_code=500)
+
+    return {
+        "predictions": [
+            {"predicted_careers": row_careers.tolist(), "probabilities": row_probabilities.tolist()}
+            for row_careers, row_probabilities in zip(careers, probabilities)
+        ],
+        "model_version": predictor.version,
+    }
+
+
+@app.post('/explain')
+async def explain(body: ExplainRequest, request: Request):
+    """Explain why careers are recommended, using SHAP values.
+
+    "scores" is one score dict or a list of them; "top_n" sets the careers
+    explained per profile and "top_features" the features reported per career.
+    """
+    request.state.timer.lap('parse')
+    predictor = registry.active
+    if predictor is None:
+        return JSONResponse({"error": "Model not loaded"}, status_code=500)
+
+    try:
+        top_n = predictor.clamp_top_n(body.top_n)
+        explanations = await run_inference(
+            explain_cached, predictor, body.score_rows(), top_n, body.top_features, explanation_cache
+        )
+        request.state.timer.lap('explain')
+    except Exception as e:
+        print(f"Error during explanation: {e}")
+        request.state.error = e
+        return JSONResponse({"error": "Error during explanation", "details": str(e)}, status_code=500)
+
+    return {"explanations": explanations, "model_version": predictor.version}
+
+
+@app.post('/counterfactual')
+async def counterfactual(body: CounterfactualRequest, request: Request):
+    """Find the smallest change to a profile's scores that makes a career one of its top matches.
+
+    "features" limits the scores allowed to change and "time_budget_ms" bounds
+    the search; the result also reports how many candidates were scored.
+    """
+    request.state.timer.lap('parse')
+    predictor = registry.active
+    if predictor is None:
+        return JSONResponse({"error": "Model not loaded"}, status_code=500)
+
+    try:
+        result = await run_inference(
+            find_counterfactual, predictor, body.scores.model_dump(), body.target_career, body.top_n,
+            body.features, body.allow_decrease, body.time_budget_ms,
+        )
+        request.state.timer.lap('counterfactual')
+    except ValueError as e:
+        request.state.error = 'invalid_request'
+        return JSONResponse({"error": "Invalid request", "details": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"Error during counterfactual search: {e}")
+        request.state.error = e
+        return JSONResponse({"error": "Error during counterfactual search", "details": str(e)}, status_code=500)
+
+    metrics.record_batch('counterfactual', result['candidates_scored'])
+    return {**result, "model_version": predictor.version}
+
+
+@app.get('/batcher/stats')
+async def batcher_stats():
+    """Batch size distribution and queueing delay of the micro-batcher."""
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+
+@app.get('/cache/stats')
+async def cache_stats():
+    """Hit, miss and eviction counters of the prediction and explanation caches."""
+    if prediction_cache is None:
+        response = {"enabled": False}
+    else:
+        response = {"enabled": True, **prediction_cache.stats()}
+    response["explanations"] = (
+        {"enabled": True, **explanation_cache.stats()} if explanation_cache is not None else {"enabled": False}
+    )
+    return response
+
+
+@app.get('/metrics')
+async def metrics_endpoint():
+    """Request counts, error counts, stage latencies and batch sizes in Prometheus text format."""
+    predictor = registry.active
+    body = metrics.render(predictor.version if predictor is not None else None)
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
+
+def admin_denied(token):
+    """Error response when the request lacks a valid X-Admin-Token, else None."""
+    if not admin_allowed(token):
+        return JSONResponse({"error": "Admin access denied"}, status_code=403)
+    return None
+
+
+@app.get('/admin/models')
+async def admin_models(x_admin_token: Optional[str] = Header(default=None)):
+    """Active and previous model versions and the recent load history."""
+    return admin_denied(x_admin_token) or registry.status()
+
+
+@app.post('/admin/models/reload', status_code=202)
+async def admin_reload(body: Optional[ReloadRequest] = None,
+                       x_admin_token: Optional[str] = Header(default=None)):
+    """Load a model version in the background and swap it in once it is warm.
+
+    An optional "name" picks an artifact in MODEL_DIR; by default the newest one
+    is loaded. Poll GET /admin/models for the outcome.
+    """
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    try:
+        path = registry.resolve_name(body.name) if body and body.name else None
+        registry.reload(path)
+    except ValueError as e:
+        return JSONResponse({"error": "Invalid reload", "details": str(e)}, status_code=400)
+    return {"status": "loading"}
+
+
+@app.post('/admin/models/rollback')
+async def admin_rollback(x_admin_token: Optional[str] = Header(default=None)):
+    """Swap the previous model version back in without reloading it."""
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    try:
+        predictor = registry.rollback()
+    except RuntimeError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return {"model_version": predictor.version}
+
+
+if __name__ == '__main__':
+    # Each uvicorn worker is a separate process with its own copy of the model
+    uvicorn.run(
+        'asgi_app:app',
+        host=os.environ.get('HOST', '127.0.0.1'),
+        port=int(os.environ.get('PORT', '5001')),
+        workers=int(os.environ.get('WEB_CONCURRENCY', '1')),
+    )
@@ -0,0 +1,250 @@
+"""Request coalescing in front of the model for concurrent single-row traffic.
+
+``MicroBatcher`` collects requests from many server threads and scores them
+together. A batch is dispatched when it reaches ``max_batch_size`` or when the
+oldest queued request has waited ``max_wait_ms``. In adaptive mode the wait
+window is skipped while traffic is light: a batch is only held open once the
+recent batch sizes show that requests really are arriving concurrently, so an
+idle service does not pay the wait on every call.
+"""
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from inference import DIRECT_SCORE_FEATURES, numeric_score
+
+# Upper bounds (in milliseconds) of the queueing delay histogram buckets
+QUEUE_DELAY_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, float('inf'))
+
+# Number of recent queueing delays kept for percentile estimates
+RECENT_DELAYS = 10000
+
+# Smoothing factor of the moving average of batch sizes used by adaptive mode
+BATCH_SIZE_EWMA_ALPHA = 0.2
+
+
+def numeric_scores(scores):
+    """The direct scores of one score dict as floats (missing ones as 0); ValueError if any is not numeric."""
+    try:
+        return {feature: numeric_score(scores.get(feature, 0)) for feature in DIRECT_SCORE_FEATURES}
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("Scores must be a mapping of numeric values") from None
+
+
+class PendingRequest:
+    __slots__ = ('scores', 'top_n', 'enqueued', 'future')
+
+    def __init__(self, scores, top_n):
+        self.scores = scores
+        self.top_n = top_n
+        self.enqueued = time.perf_counter()
+        self.future = Future()
+
+
+class MicroBatcher:
+    """Coalesce concurrent predictions into batched model calls.
+
+    ``predict_batch(score_rows, top_n)`` must score a list of score dicts in one
+    pass and return ``(careers, probabilities, model_version)``, the first two
+    being arrays with one row per input. Every caller receives
+    ``(careers_row, probabilities_row, model_version)`` with the rows trimmed
+    to the top_n it asked for.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=2.0, adaptive=True,
+                 adaptive_threshold=1.5):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.adaptive = adaptive
+        self.adaptive_threshold = adaptive_threshold
+
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._running = True
+
+        # Statistics, guarded by _stats_lock
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = collections.Counter()
+        self._delay_buckets = [0] * len(QUEUE_DELAY_BUCKETS_MS)
+        self._recent_delays = collections.deque(maxlen=RECENT_DELAYS)
+        self._delay_sum = 0.0
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._batch_size_ewma = 1.0
+
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, scores, top_n):
+        """Queue one score dict and return a Future for (careers, probabilities, model_version).
+
+        Scores are validated before queueing, so invalid input fails only its own Future.
+        """
+        try:
+            scores = numeric_scores(scores)
+        except ValueError as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        pending = PendingRequest(scores, top_n)
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("MicroBatcher has been closed")
+            self._queue.append(pending)
+            self._condition.notify()
+        return pending.future
+
+    def predict(self, scores, top_n, timeout=None):
+        """Score one profile through the batcher and wait for its row."""
+        return self.submit(scores, top_n).result(timeout)
+
+    def close(self):
+        """Stop the worker after the queued requests have been served."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._worker.join()
+
+    def _wait_window(self):
+        if not self.adaptive or self._batch_size_ewma >= self.adaptive_threshold:
+            return self.max_wait
+        return 0.0
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue and self._running:
+                self._condition.wait()
+            if not self._queue:
+                return None
+
+            deadline = self._queue[0].enqueued + self._wait_window()
+            while len(self._queue) < self.max_batch_size and self._running:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            dispatched = time.perf_counter()
+            try:
+                careers, probabilities, model_version = self.predict_batch(
+                    [pending.scores for pending in batch],
+                    max(pending.top_n for pending in batch),
+                )
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                    self._record(batch, dispatched, failed=1)
+                else:
+                    # Score the rows one by one so only the request that fails gets the error
+                    self._record(batch, dispatched, failed=self._run_singly(batch))
+                continue
+
+            for pending, row_careers, row_probabilities in zip(batch, careers, probabilities):
+                pending.future.set_result(
+                    (row_careers[:pending.top_n], row_probabilities[:pending.top_n], model_version)
+                )
+            self._record(batch, dispatched)
+
+    def _run_singly(self, batch):
+        """Score each request of a failed batch on its own; return the number that failed again."""
+        failed = 0
+        for pending in batch:
+            try:
+                careers, probabilities, model_version = self.predict_batch([pending.scores], pending.top_n)
+            except Exception as e:
+                pending.future.set_exception(e)
+                failed += 1
+                continue
+            pending.future.set_result((careers[0][:pending.top_n], probabilities[0][:pending.top_n], model_version))
+        return failed
+
+    def _record(self, batch, dispatched, failed=0):
+        delays_ms = [(dispatched - pending.enqueued) * 1000.0 for pending in batch]
+        bucket_index = np.searchsorted(QUEUE_DELAY_BUCKETS_MS, delays_ms)
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._errors += failed
+            self._batch_sizes[len(batch)] += 1
+            self._batch_size_ewma += BATCH_SIZE_EWMA_ALPHA * (len(batch) - self._batch_size_ewma)
+            for index in bucket_index:
+                self._delay_buckets[index] += 1
+            self._delay_sum += sum(delays_ms)
+            self._recent_delays.extend(delays_ms)
+
+    def stats(self):
+        """Return batch size and queueing delay statistics as a JSON-serializable dict."""
+        with self._stats_lock:
+            recent = np.asarray(self._recent_delays, dtype=float)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            delay_buckets = list(self._delay_buckets)
+            requests, batches, errors = self._requests, self._batches, self._errors
+            delay_sum, ewma = self._delay_sum, self._batch_size_ewma
+        with self._condition:
+            queued = len(self._queue)
+
+        percentiles = {}
+        if len(recent):
+            for q in (50, 95, 99):
+                percentiles[f'p{q}'] = float(np.percentile(recent, q))
+            percentiles['max'] = float(recent.max())
+
+        return {
+            'config': {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'adaptive': self.adaptive,
+            },
+            'requests': requests,
+            'batches': batches,
+            'errors': errors,
+            'queued': queued,
+            'mean_batch_size': requests / batches if batches else 0.0,
+            'recent_batch_size': ewma,
+            'batch_size_distribution': {str(size): count for size, count in batch_sizes.items()},
+            'queue_delay_ms': {
+                'mean': delay_sum / requests if requests else 0.0,
+                'recent': percentiles,
+                'buckets': {
+                    ('+Inf' if bound == float('inf') else str(bound)): count
+                    for bound, count in zip(QUEUE_DELAY_BUCKETS_MS, delay_buckets)
+                },
+            },
+        }
+
+
+def batcher_from_env(predict_batch):
+    """Build a MicroBatcher from the environment, or return None when it is disabled.
+
+    MICRO_BATCH=1 enables it; MICRO_BATCH_WAIT_MS bounds how long a request may be
+    held for company, MICRO_BATCH_MAX_SIZE caps the rows per model call and
+    MICRO_BATCH_ADAPTIVE=0 always applies the full wait window.
+    """
+    if os.environ.get('MICRO_BATCH', '0') != '1':
+        return None
+    return MicroBatcher(
+        predict_batch,
+        max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', '32')),
+        max_wait_ms=float(os.environ.get('MICRO_BATCH_WAIT_MS', '2')),
+        adaptive=os.environ.get('MICRO_BATCH_ADAPTIVE', '1') == '1',
+    )
@@ -0,0 +1,256 @@
+"""Microbenchmarks for the prediction hot paths, with stored baselines.
+
+Times single-row and batched runs of every stage a request goes through, plus
+``ModelService.predict_careers`` and dataset generation, and records the peak
+memory each one allocates (measured with tracemalloc in a separate pass, so
+it does not skew the timings).
+
+Results are written as JSON next to ``models/results/training_results.json``.
+``compare`` checks a new run against a baseline and exits non-zero when a
+benchmark got slower, or allocated more, by more than the threshold.
+
+Usage:
+    python benchmarks.py run                                  # writes models/results/benchmarks.json
+    python benchmarks.py run --output /tmp/new.json --baseline ../models/results/benchmarks.json
+    python benchmarks.py compare ../models/results/benchmarks.json /tmp/new.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ML_DIR, '..', 'src', 'data'))
+sys.path.insert(0, os.path.join(ML_DIR, '..', 'backend', 'src', 'services'))
+from generate_career_dataset import generate_dataset
+from inference import DIRECT_SCORE_FEATURES, build_feature_frame, build_feature_frame_from_matrix
+from model_store import resolve_model_path
+from predictor import DEFAULT_TOP_N, load_predictor
+from load_test import generate_profiles
+from model_service import ModelService
+from tree_engine import ENGINE_COMPILED, ENGINE_NATIVE, CompiledTreeEnsemble, compile_model
+
+RESULTS_PATH = os.path.join(ML_DIR, '..', 'models', 'results', 'benchmarks.json')
+
+# Row counts every benchmark is run at
+BATCH_SIZES = (1, 32, 1024, 65536)
+
+# Each measurement repeats until it has run this long (and at least MIN_REPEATS times)
+MIN_SECONDS = 0.25
+MIN_REPEATS = 3
+MAX_REPEATS = 1000
+
+# Relative slowdown (or memory growth) that compare reports as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def measure(function, min_seconds=MIN_SECONDS):
+    """Time function() repeatedly and measure its peak allocation once."""
+    function()  # warm caches and lazy initialisation
+
+    timings = []
+    deadline = time.perf_counter() + min_seconds
+    while len(timings) < MIN_REPEATS or (time.perf_counter() < deadline and len(timings) < MAX_REPEATS):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings) * 1000.0
+    return {
+        'median_ms': float(np.median(timings)),
+        'min_ms': float(timings.min()),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'repeats': len(timings),
+        'peak_memory_bytes': int(peak),
+    }
+
+
+def benchmark_profiles(count, seed=0):
+    """Realistic score matrix of count rows, in DIRECT_SCORE_FEATURES order."""
+    # Generating profiles is slow in pure Python, so a smaller pool is tiled up to count rows
+    pool = generate_profiles(min(count, 4096), seed)
+    matrix = np.array([[scores[feature] for feature in DIRECT_SCORE_FEATURES] for scores in pool])
+    return np.resize(matrix, (count, matrix.shape[1]))
+
+
+def build_cases(predictor, model_path, matrix, sizes):
+    """Yield (name, size, function) for every benchmark."""
+    model = predictor.pipeline['model']
+    # Memory-mapped artifacts only carry the compiled ensemble
+    engines = {} if isinstance(model, CompiledTreeEnsemble) else {ENGINE_NATIVE: model}
+    try:
+        engines[ENGINE_COMPILED] = compile_model(model)
+    except TypeError:
+        pass
+
+    service = ModelService(model_path)
+
+    for size in sizes:
+        rows = matrix[:size]
+        score_rows = [dict(zip(DIRECT_SCORE_FEATURES, row)) for row in rows.tolist()]
+
+        # Feature construction as app.py does it: score dicts into the model input layout
+        if predictor.plan is not None:
+            if size == 1:
+                yield 'features', size, lambda: predictor.plan.features_scores(score_rows[0])
+            else:
+                yield 'features', size, lambda: predictor.plan.features_rows(score_rows)
+        yield 'features_pandas', size, lambda: build_feature_frame(score_rows)
+
+        input_df = build_feature_frame_from_matrix(rows)
+        yield 'scaler_transform', size, lambda: predictor.scaler.transform(input_df)
+
+        input_scaled = predictor.scale_score_matrix(rows)
+        for engine, engine_model in engines.items():
+            yield f'predict_proba[{engine}]', size, lambda m=engine_model: m.predict_proba(input_scaled)
+
+        probabilities = model.predict_proba(input_scaled)
+
+        def top_n_decode():
+            top_n_indices = np.argsort(probabilities, axis=1)[:, -DEFAULT_TOP_N:][:, ::-1]
+            np.take_along_axis(probabilities, top_n_indices, axis=1)
+            predictor.encoder.inverse_transform(top_n_indices.ravel())
+
+        yield 'top_n_decode', size, top_n_decode
+
+        yield 'end_to_end', size, lambda: predictor.predict_score_rows(score_rows)
+
+        # predict_careers takes one profile; larger sizes go through its batched entry point
+        if size == 1:
+            yield 'model_service', size, lambda: service.predict_careers(score_rows[0])
+        else:
+            yield 'model_service', size, lambda: service.predict_matrix(rows)
+
+        yield 'generate_dataset', size, lambda: generate_dataset(size)
+
+
+def run(args):
+    model_path = resolve_model_path(args.model)
+    predictor = load_predictor(model_path)
+    if predictor is None:
+        sys.exit(1)
+
+    sizes = args.sizes or BATCH_SIZES
+    matrix = benchmark_profiles(max(sizes))
+    results = {}
+    for name, size, function in build_cases(predictor, model_path, matrix, sizes):
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        result = measure(function, args.min_seconds)
+        result['per_row_us'] = result['median_ms'] * 1000.0 / size
+        results.setdefault(name, {})[str(size)] = result
+        print(f"{name:<26} rows={size:<6} median={result['median_ms']:10.3f} ms "
+              f"({result['per_row_us']:9.3f} us/row)  peak={result['peak_memory_bytes'] / 1e6:8.2f} MB")
+
+    import sklearn
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scikit_learn': sklearn.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'model': {
+            'path': model_path,
+            'version': predictor.version,
+            'type': type(predictor.pipeline['model']).__name__,
+            'inference_mode': predictor.inference_mode,
+        },
+        'results': results,
+    }
+    output = args.output or RESULTS_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if report_regressions(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+def report_regressions(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Print the change of every benchmark present in both runs; return the regressions."""
+    for section in ('model', 'environment'):
+        if baseline.get(section) != current.get(section):
+            print(f"Warning: the runs differ in {section}, so timings may not be comparable")
+
+    regressions = []
+    for name, by_size in sorted(current['results'].items()):
+        for size, result in sorted(by_size.items(), key=lambda item: int(item[0])):
+            previous = baseline['results'].get(name, {}).get(size)
+            if previous is None:
+                continue
+            time_change = result['median_ms'] / previous['median_ms'] - 1.0 if previous['median_ms'] else 0.0
+            memory_change = (
+                result['peak_memory_bytes'] / previous['peak_memory_bytes'] - 1.0
+                if previous['peak_memory_bytes'] else 0.0
+            )
+            flags = []
+            if time_change > threshold:
+                flags.append('SLOWER')
+            if memory_change > threshold:
+                flags.append('MORE MEMORY')
+            if flags:
+                regressions.append((name, size, time_change, memory_change))
+            print(f"{name:<26} rows={size:<6} time {time_change:+7.1%}  memory {memory_change:+7.1%}  {' '.join(flags)}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {threshold:.0%}")
+    else:
+        print(f"\nNo regressions above {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the prediction hot paths")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks and write the results")
+    run_parser.add_argument('--model', default=None, help="Model artifact (default: resolved automatically)")
+    run_parser.add_argument('--output', default=None, help="Results file (default: models/results/benchmarks.json)")
+    run_parser.add_argument('--baseline', default=None, help="Compare against this results file afterwards")
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    run_parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')], default=None,
+                            help="Comma-separated row counts (default: 1,32,1024,65536)")
+    run_parser.add_argument('--only', nargs='*', default=None, help="Run benchmarks whose name contains any of these")
+    run_parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS,
+                            help="Minimum time spent repeating each measurement")
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two results files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if report_regressions(baseline, current, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Career category of every career the dataset generator knows.
+
+Shared by ``src/data/generate_career_dataset.py``, which defines the careers' score
+patterns, and by jobs that group results by category, such as ``explain_batch.py``.
+Careers not listed here fall into ``OTHER_CATEGORY``.
+"""
+
+OTHER_CATEGORY = 'Other'
+
+CAREER_CATEGORIES = {
+    'IAS Officer': 'Government',
+    'IPS Officer': 'Government',
+    'IFS Officer': 'Government',
+    'IRS Officer': 'Government',
+    'IES Officer': 'Government',
+    'Software Engineer': 'IT',
+    'Data Scientist': 'IT',
+    'AI Engineer': 'IT',
+    'Cloud Architect': 'IT',
+    'DevOps Engineer': 'IT',
+    'Medical Doctor': 'Healthcare',
+    'Ayurvedic Doctor': 'Healthcare',
+    'Homeopathic Doctor': 'Healthcare',
+    'Dental Surgeon': 'Healthcare',
+    'Ayurvedic Pharmacist': 'Healthcare',
+    'Chartered Accountant': 'Finance',
+    'Investment Banker': 'Finance',
+    'Actuary': 'Finance',
+    'Financial Analyst': 'Finance',
+    'Stock Market Trader': 'Finance',
+    'UX Designer': 'Creative',
+    'Digital Artist': 'Creative',
+    'Animation Artist': 'Creative',
+    'Fashion Designer': 'Creative',
+    'Interior Designer': 'Creative',
+    'Blockchain Developer': 'Emerging',
+    'Robotics Engineer': 'Emerging',
+    'AR/VR Developer': 'Emerging',
+    'Drone Pilot': 'Emerging',
+    'Space Scientist': 'Emerging',
+    'Ethical Hacker': 'IT',
+    'Forensic Scientist': 'Science',
+    'Food Technologist': 'Science',
+    'Gemologist': 'Science',
+    'Meteorologist': 'Science',
+    'Vedic Scholar': 'Traditional',
+    'Yoga Instructor': 'Traditional',
+    'Astrologer': 'Traditional',
+    'Ayurvedic Therapist': 'Traditional',
+    'Vastu Consultant': 'Traditional',
+    'School Teacher': 'Education',
+    'Professor': 'Education',
+    'Educational Counselor': 'Education',
+    'Special Educator': 'Education',
+    'Career Counselor': 'Education',
+    'Lawyer': 'Legal',
+    'Judge': 'Legal',
+    'Legal Advisor': 'Legal',
+    'Corporate Lawyer': 'Legal',
+    'Criminal Lawyer': 'Legal',
+    'Agricultural Scientist': 'Agriculture',
+    'Horticulturist': 'Agriculture',
+    'Agricultural Engineer': 'Agriculture',
+    'Organic Farmer': 'Agriculture',
+    'Agricultural Economist': 'Agriculture',
+    'Army Officer': 'Defense',
+    'Navy Officer': 'Defense',
+    'Air Force Officer': 'Defense',
+    'Defense Scientist': 'Defense',
+    'Military Engineer': 'Defense',
+    'AI/ML Specialist': 'Emerging',
+    'Quantum Computing Engineer': 'Emerging',
+    'Cybersecurity Analyst': 'Emerging',
+    'Digital Health Specialist': 'Emerging',
+    'Green Energy Engineer': 'Emerging',
+    'Digital Marketing Strategist': 'Emerging',
+    'E-commerce Specialist': 'Emerging',
+    'Sustainability Consultant': 'Emerging',
+    'FinTech Specialist': 'Emerging',
+    'Business Intelligence Analyst': 'Emerging',
+}
+
+
+def career_category(career):
+    return CAREER_CATEGORIES.get(career, OTHER_CATEGORY)
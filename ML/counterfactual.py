@@ -0,0 +1,334 @@
+"""Counterfactual search for the /counterfactual endpoint: what it would take to reach a career.
+
+Given a profile and a target career, the search looks for the smallest change
+to the direct scores (total points moved, then fewest scores touched) that puts
+the target among the top N recommendations. Candidates are scored as score
+matrices through ``Predictor.scale_score_matrix``, so the engineered features
+(``analytical_skill``, ``creative_practical``) are recomputed from every
+candidate's direct scores and can never disagree with them.
+
+The search runs in phases, each one scoring its candidates in a few large
+vectorized batches:
+
+1. greedy ascent: repeatedly apply the step that closes the most of the gap
+   between the target and the N-th career per point spent, which finds a
+   match quickly even on slow models;
+2. pruning: shrink each changed score as far as it stays a match;
+3. every single-score change on a grid of ``step`` points cheaper than the
+   best match so far;
+4. random sparse candidates cheaper than the best so far, in large batches,
+   until the budget runs out or RANDOM_PATIENCE batches in a row find
+   nothing cheaper, then pruning again.
+
+The budget is hard: a batch only starts when the cost of one model call plus
+the time per candidate of the largest batch so far says it will finish before
+the deadline. Both are seeded from the call that scores the profile itself,
+the one call that always runs, and batches grow by at most doubling so the
+estimate is never far off. The best and closest candidates keep the
+probabilities they were scored with, so building the result calls no model.
+"""
+import time
+
+import numpy as np
+
+from inference import DIRECT_SCORE_FEATURES, ENGINEERED_FEATURES
+from predictor import DEFAULT_TOP_N
+
+# Time budget of a search, and the most a request may ask for
+DEFAULT_COUNTERFACTUAL_BUDGET_MS = 250
+MAX_COUNTERFACTUAL_BUDGET_MS = 2000
+
+# Candidates scored per model call
+COUNTERFACTUAL_BATCH_SIZE = 4096
+
+# Granularity of the suggested changes, in score points
+SCORE_STEP = 1.0
+
+# Range a suggested score may move within (wider if the profile is already outside it)
+SCORE_BOUNDS = (0.0, 100.0)
+
+# Most scores changed together by a random candidate
+MAX_RANDOM_FEATURES = 4
+
+# Random batches in a row that may fail to find a cheaper match before the search stops early
+RANDOM_PATIENCE = 8
+
+# Batch time estimates are scaled by this much before they are checked against the deadline, to absorb jitter
+BUDGET_SAFETY_FACTOR = 1.25
+
+
+class CounterfactualSearch:
+    """One search for the cheapest change to a profile that makes target a top_n career."""
+
+    def __init__(self, predictor, scores, target, top_n=DEFAULT_TOP_N, features=None, allow_decrease=False,
+                 time_budget_ms=DEFAULT_COUNTERFACTUAL_BUDGET_MS, step=SCORE_STEP, seed=0):
+        self.predictor = predictor
+        self.start = time.perf_counter()
+        self.deadline = self.start + time_budget_ms / 1000.0
+        # Fixed cost of a model call and time per candidate in the largest batch so far, both seeded
+        # from scoring the profile; batches at most double, so estimates stay close
+        self.call_seconds = 0.0
+        self.seconds_per_row = 0.0
+        self.fitted_rows = 0
+        self.candidates_scored = 0
+        self.budget_exhausted = False
+        self.rng = np.random.default_rng(seed)
+
+        classes = [str(career) for career in predictor.encoder.classes_]
+        if target not in classes:
+            raise ValueError(f"Unknown career '{target}'")
+        self.target = target
+        self.target_index = classes.index(target)
+        self.top_n = predictor.clamp_top_n(top_n)
+
+        features = list(DIRECT_SCORE_FEATURES) if features is None else list(features)
+        unknown = [feature for feature in features if feature not in DIRECT_SCORE_FEATURES]
+        if unknown or not features:
+            raise ValueError(f"'features' must be a non-empty subset of {DIRECT_SCORE_FEATURES}")
+        self.features = features
+        self.columns = np.array([DIRECT_SCORE_FEATURES.index(feature) for feature in features], dtype=np.intp)
+
+        self.base = np.array([float(scores.get(feature, 0)) for feature in DIRECT_SCORE_FEATURES])
+        current = self.base[self.columns]
+        self.step = step
+        # Largest move allowed per changed score, in whole steps
+        self.upper = np.floor((np.maximum(SCORE_BOUNDS[1], current) - current) / step)
+        self.lower = (
+            -np.floor((current - np.minimum(SCORE_BOUNDS[0], current)) / step) if allow_decrease
+            else np.zeros(len(features))
+        )
+
+        # Best candidate so far as a vector of steps per changed score, with its probabilities
+        self.best = None
+        self.best_cost = np.inf
+        self.best_probabilities = None
+        self.closest = np.zeros(len(features))
+        self.closest_margin = -np.inf
+        self.closest_probabilities = None
+        self.base_margin = None
+
+    # --- Scoring ---
+
+    def fits_budget(self, rows):
+        """Whether scoring rows candidates is expected to finish before the deadline."""
+        estimate = (self.call_seconds + self.seconds_per_row * rows) * BUDGET_SAFETY_FACTOR
+        return time.perf_counter() + estimate <= self.deadline
+
+    def _score(self, steps):
+        """(margins, probabilities) of candidates; a margin is the target probability minus the N-th other's."""
+        started = time.perf_counter()
+        matrix = np.repeat(self.base[None, :], len(steps), axis=0)
+        matrix[:, self.columns] += steps * self.step
+        probabilities = self.predictor.model.predict_proba(self.predictor.scale_score_matrix(matrix))
+        others = probabilities.copy()
+        others[:, self.target_index] = -np.inf
+        nth_other = -np.partition(-others, self.top_n - 1, axis=1)[:, self.top_n - 1]
+        margins = probabilities[:, self.target_index] - nth_other
+
+        self.candidates_scored += len(steps)
+        if len(steps) >= self.fitted_rows:
+            # The call overhead is counted in the time per row too, which keeps estimates on the safe side
+            self.seconds_per_row = (time.perf_counter() - started) / len(steps)
+            self.fitted_rows = len(steps)
+        self._keep_best(steps, margins, probabilities)
+        return margins
+
+    def margins(self, steps):
+        """Target probability minus the N-th best other career's, per candidate (>= 0 is a match).
+
+        Returns None, scoring nothing, when the batch would not finish before the deadline.
+        """
+        steps = np.asarray(steps, dtype=np.float64).reshape(-1, len(self.features))
+        if not self.fits_budget(len(steps)):
+            self.budget_exhausted = True
+            return None
+        return self._score(steps)
+
+    def _keep_best(self, steps, margins, probabilities):
+        feasible = np.flatnonzero(margins >= 0)
+        if len(feasible):
+            costs = np.abs(steps[feasible]).sum(axis=1)
+            changed = (steps[feasible] != 0).sum(axis=1)
+            # Cheapest first, then fewest changed scores, then the safest match
+            best = feasible[np.lexsort((-margins[feasible], changed, costs))[0]]
+            cost = np.abs(steps[best]).sum()
+            if cost < self.best_cost:
+                self.best, self.best_cost = steps[best].copy(), cost
+                self.best_probabilities = probabilities[best].copy()
+        closest = int(np.argmax(margins))
+        if margins[closest] > self.closest_margin:
+            self.closest, self.closest_margin = steps[closest].copy(), margins[closest]
+            self.closest_probabilities = probabilities[closest].copy()
+
+    def _batches(self, steps):
+        """Margins of all candidates, scored in chunks of up to COUNTERFACTUAL_BATCH_SIZE.
+
+        Chunks grow no faster than doubling, so the time of each one is known before
+        it starts. Returns None once the budget runs out.
+        """
+        margins = []
+        begin = 0
+        while begin < len(steps):
+            size = self.next_batch_size()
+            chunk = self.margins(steps[begin:begin + size])
+            if chunk is None:
+                return None
+            margins.append(chunk)
+            begin += size
+        return np.concatenate(margins)
+
+    def next_batch_size(self):
+        """Largest batch that at most doubles the largest one so far and still fits the budget."""
+        size = int(min(COUNTERFACTUAL_BATCH_SIZE, max(2 * self.fitted_rows, 64)))
+        while size > 1 and not self.fits_budget(size):
+            size //= 2
+        return size
+
+    # --- Phases ---
+
+    def single_feature_grid(self):
+        """Every change of one score by a whole number of steps that is cheaper than the best match."""
+        limit = self.best_cost - 1 if self.best is not None else np.inf
+        rows = []
+        for i in range(len(self.features)):
+            lower, upper = max(self.lower[i], -limit), min(self.upper[i], limit)
+            moves = np.concatenate([np.arange(lower, 0), np.arange(1, upper + 1)])
+            block = np.zeros((len(moves), len(self.features)))
+            block[:, i] = moves
+            rows.append(block)
+        rows = np.vstack(rows)
+        if len(rows):
+            self._batches(rows)
+
+    def greedy(self, max_rounds=200):
+        """Climb from the profile, buying the most margin per step, until it matches."""
+        n_features = len(self.features)
+        current = np.zeros(n_features)
+        current_margin = self.base_margin
+        # Moves of one score by 1, 2, 4 ... 64 steps up or down
+        sizes = 2.0 ** np.arange(7)
+        offsets = np.concatenate([sizes, -sizes])
+        directions = (offsets[:, None, None] * np.eye(n_features)[None, :, :]).reshape(-1, n_features)
+        for _ in range(max_rounds):
+            if self.best is not None:
+                return
+            moves = current + directions
+            moves = moves[((moves >= self.lower) & (moves <= self.upper)).all(axis=1)]
+            if not len(moves):
+                return
+            margins = self._batches(moves)
+            if margins is None:
+                return
+            gain = (margins - current_margin) / np.abs(moves - current).sum(axis=1)
+            choice = int(np.argmax(gain))
+            if gain[choice] <= 0:
+                return
+            current, current_margin = moves[choice], margins[choice]
+
+    def prune(self):
+        """Shrink each changed score of the best candidate while it still matches."""
+        while self.best is not None:
+            cost = self.best_cost
+            rows = []
+            for i in np.flatnonzero(self.best):
+                shrunk = np.arange(0, abs(self.best[i])) * np.sign(self.best[i])
+                block = np.repeat(self.best[None, :], len(shrunk), axis=0)
+                block[:, i] = shrunk
+                rows.append(block)
+            if not rows or self._batches(np.vstack(rows)) is None or self.best_cost >= cost:
+                return
+
+    def random_candidates(self):
+        """Sparse random changes costing less than the best so far, batch after batch."""
+        n_features = len(self.features)
+        misses = 0
+        while misses < RANDOM_PATIENCE:
+            batch = self.next_batch_size()
+            limit = self.best_cost - 1 if self.best is not None else (self.upper - self.lower).sum()
+            if limit < 1:
+                return
+            # Pick 1..MAX_RANDOM_FEATURES scores per candidate and share a random total between them
+            counts = self.rng.integers(1, min(MAX_RANDOM_FEATURES, n_features) + 1, batch)
+            ranks = np.argsort(self.rng.random((batch, n_features)), axis=1).argsort(axis=1)
+            chosen = ranks < counts[:, None]
+            shares = self.rng.exponential(size=(batch, n_features)) * chosen
+            shares /= shares.sum(axis=1, keepdims=True)
+            totals = self.rng.uniform(1, limit + 1, batch)[:, None]
+            signs = np.where(self.rng.random((batch, n_features)) < 0.5, -1.0, 1.0) if self.lower.any() else 1.0
+            steps = np.clip(np.round(shares * totals * signs), self.lower, self.upper)
+            cost = self.best_cost
+            if self.margins(steps) is None:
+                return
+            misses = misses + 1 if self.best_cost >= cost else 0
+
+    def run(self):
+        """Run the phases in turn and return the result; phases stop early once batches no longer fit the budget."""
+        # The profile is always scored; that call also seeds the cost estimates
+        started = time.perf_counter()
+        self.base_margin = self._score(np.zeros((1, len(self.features))))[0]
+        self.call_seconds = time.perf_counter() - started
+        if self.base_margin < 0:
+            phases = (self.greedy, self.prune, self.single_feature_grid, self.random_candidates, self.prune)
+            for phase in phases:
+                phase()
+        return self.result(bool(self.base_margin >= 0))
+
+    def result(self, already_matched):
+        if self.best is not None:
+            steps, scored = self.best, self.best_probabilities
+        else:
+            steps, scored = self.closest, self.closest_probabilities
+        counterfactual = self.base.copy()
+        counterfactual[self.columns] += steps * self.step
+        # Decoded like Predictor.predict_top_n, from the probabilities the candidate was scored with
+        top = np.argsort(scored)[-self.top_n:][::-1]
+        careers = self.predictor.encoder.inverse_transform(top)
+        probabilities = scored[top]
+
+        changes = [
+            {
+                "feature": feature,
+                "from": float(self.base[column]),
+                "to": float(counterfactual[column]),
+                "change": float(counterfactual[column] - self.base[column]),
+            }
+            for feature, column, move in zip(self.features, self.columns, steps) if move
+        ]
+        # Engineered features move with the scores they are built from
+        position = {feature: i for i, feature in enumerate(DIRECT_SCORE_FEATURES)}
+        engineered = {}
+        for name, (left, right) in ENGINEERED_FEATURES.items():
+            before = self.base[position[left]] * self.base[position[right]]
+            after = counterfactual[position[left]] * counterfactual[position[right]]
+            if after != before:
+                engineered[name] = {"from": float(before), "to": float(after)}
+
+        return {
+            "target_career": self.target,
+            "top_n": self.top_n,
+            "reachable": bool(already_matched or self.best is not None),
+            "already_matched": already_matched,
+            "changes": changes,
+            "total_change": float(np.abs(steps).sum() * self.step),
+            "engineered_changes": engineered,
+            "counterfactual_scores": dict(zip(DIRECT_SCORE_FEATURES, counterfactual.tolist())),
+            "predicted_careers": careers.tolist(),
+            "probabilities": probabilities.tolist(),
+            "candidates_scored": self.candidates_scored,
+            "budget_exhausted": self.budget_exhausted,
+            "elapsed_ms": (time.perf_counter() - self.start) * 1000.0,
+        }
+
+
+def find_counterfactual(predictor, scores, target, top_n=DEFAULT_TOP_N, features=None, allow_decrease=False,
+                        time_budget_ms=DEFAULT_COUNTERFACTUAL_BUDGET_MS):
+    """The smallest change to scores that makes target one of the top_n careers.
+
+    When no change within the budget gets there, the result describes the
+    candidate that came closest and has "reachable" set to False.
+    """
+    if isinstance(time_budget_ms, bool) or not isinstance(time_budget_ms, (int, float)) or time_budget_ms <= 0:
+        raise ValueError("time_budget_ms must be a positive number")
+    time_budget_ms = min(time_budget_ms, MAX_COUNTERFACTUAL_BUDGET_MS)
+    search = CounterfactualSearch(predictor, scores, target, top_n, features, allow_decrease, time_budget_ms)
+    return search.run()
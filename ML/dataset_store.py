@@ -0,0 +1,298 @@
+"""Compact, memory-mappable columnar format for the career dataset.
+
+A ``.cbin`` file stores each column as one contiguous little-endian array, so
+readers map only the columns they need and never parse text::
+
+    8 bytes     magic b'CARCOL\\x00\\x01'
+    uint64      length of the JSON schema header that follows
+    header      format version, row count and, per column, name, dtype, byte
+                offset and (for the label column) the category dictionary
+    columns     each one starting on a 64-byte boundary
+
+Scores are stored as float32 and the career as an integer code into the
+dictionary (uint8, or uint16 past 256 careers). Compared with the CSV export
+(17 significant digits and the career name on every row) files are under a
+quarter of the size and open in microseconds.
+
+Usage:
+    python dataset_store.py convert ../career_dataset.csv ../career_dataset.cbin
+    python dataset_store.py export ../career_dataset.cbin ../career_dataset.csv
+    python dataset_store.py info ../career_dataset.cbin
+"""
+import argparse
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DATASET_FORMAT = 'career-dataset-columnar'
+DATASET_FORMAT_VERSION = 1
+
+MAGIC = b'CARCOL\x00\x01'
+HEADER_LENGTH = struct.Struct('<Q')
+ALIGNMENT = 64
+
+COLUMNAR_SUFFIX = '.cbin'
+FEATURE_DTYPE = np.dtype('<f4')
+LABEL_COLUMN = 'career'
+
+# Rows converted or exported at a time, which bounds memory
+CHUNK_ROWS = 100000
+
+
+def is_columnar(path):
+    return str(path).endswith(COLUMNAR_SUFFIX)
+
+
+def label_dtype(n_categories):
+    return np.dtype('<u1') if n_categories <= 256 else np.dtype('<u2')
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class ColumnarWriter:
+    """Writes a dataset of known size chunk by chunk, memory bounded by the chunk.
+
+    The file is written next to path and moved into place by close(), so readers
+    never see a partial dataset.
+    """
+
+    def __init__(self, path, feature_columns, categories, num_rows, label_column=LABEL_COLUMN):
+        self.path = path
+        self.num_rows = num_rows
+        self.categories = [str(category) for category in categories]
+        self.codes = {category: code for code, category in enumerate(self.categories)}
+        self.rows_written = 0
+
+        columns = [{'name': name, 'dtype': FEATURE_DTYPE.str} for name in feature_columns]
+        columns.append({'name': label_column, 'dtype': label_dtype(len(self.categories)).str,
+                        'categories': self.categories})
+
+        # The header size depends on the offsets it records, so lay out until it settles
+        data_start = 0
+        while True:
+            offset = data_start
+            for column in columns:
+                column['offset'] = offset
+                offset = _align(offset + num_rows * np.dtype(column['dtype']).itemsize)
+            header = json.dumps({
+                'format': DATASET_FORMAT,
+                'format_version': DATASET_FORMAT_VERSION,
+                'rows': num_rows,
+                'columns': columns,
+            }).encode()
+            needed = _align(len(MAGIC) + HEADER_LENGTH.size + len(header))
+            if needed <= data_start:
+                break
+            data_start = needed
+        self.columns = columns
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=COLUMNAR_SUFFIX)
+        self._file = os.fdopen(fd, 'w+b')
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        self._file.truncate(offset)
+
+    def write(self, chunk):
+        """Append the rows of a DataFrame with the feature columns and the label column."""
+        rows = len(chunk)
+        if self.rows_written + rows > self.num_rows:
+            raise ValueError(f"More than the declared {self.num_rows} rows written")
+        for column in self.columns:
+            values = chunk[column['name']]
+            if 'categories' in column:
+                values = values.map(self.codes).to_numpy()
+                if pd.isna(values).any():
+                    raise ValueError(f"Unknown {column['name']} value not in the category dictionary")
+            dtype = np.dtype(column['dtype'])
+            self._file.seek(column['offset'] + self.rows_written * dtype.itemsize)
+            self._file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self.rows_written += rows
+
+    def close(self):
+        self._file.close()
+        if self.rows_written != self.num_rows:
+            os.unlink(self._tmp_path)
+            raise ValueError(f"Wrote {self.rows_written} rows, declared {self.num_rows}")
+        # mkstemp creates the file private; give it the permissions a plain open() would
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(self._tmp_path, 0o666 & ~umask)
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.unlink(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_columnar(path, df, feature_columns=None, label_column=LABEL_COLUMN, categories=None):
+    """Write an in-memory DataFrame as a columnar dataset."""
+    if feature_columns is None:
+        feature_columns = [column for column in df.columns if column != label_column]
+    if categories is None:
+        categories = sorted(df[label_column].unique())
+    with ColumnarWriter(path, feature_columns, categories, len(df), label_column) as writer:
+        writer.write(df)
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a {DATASET_FORMAT} file")
+        (length,) = HEADER_LENGTH.unpack(f.read(HEADER_LENGTH.size))
+        header = json.loads(f.read(length))
+    if header.get('format_version') != DATASET_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported dataset format version {header.get('format_version')} "
+            f"(this reader reads version {DATASET_FORMAT_VERSION})"
+        )
+    return header
+
+
+class ColumnarDataset:
+    """Read-only view of a columnar dataset; columns are memory-mapped on first access."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = read_header(path)
+        self.num_rows = self.header['rows']
+        self._columns = {column['name']: column for column in self.header['columns']}
+        self._arrays = {}
+
+    def __len__(self):
+        return self.num_rows
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def label_column(self):
+        return next((name for name, column in self._columns.items() if 'categories' in column), None)
+
+    @property
+    def categories(self):
+        return self._columns[self.label_column]['categories']
+
+    def column(self, name):
+        """The stored array of a column: float32 scores, or the integer codes of the label column."""
+        if name not in self._arrays:
+            column = self._columns[name]
+            dtype = np.dtype(column['dtype'])
+            if self.num_rows == 0:
+                self._arrays[name] = np.empty(0, dtype=dtype)
+            else:
+                self._arrays[name] = np.memmap(self.path, dtype=dtype, mode='r',
+                                               offset=column['offset'], shape=(self.num_rows,))
+        return self._arrays[name]
+
+    def labels(self, start=0, stop=None):
+        """Decoded label values (e.g. career names) of rows start:stop."""
+        categories = np.asarray(self.categories, dtype=object)
+        return categories[self.column(self.label_column)[start:stop]]
+
+    def matrix(self, columns, start=0, stop=None, dtype=np.float64):
+        """Rows start:stop of the given feature columns as one (rows, columns) array."""
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        out = np.empty((max(stop - start, 0), len(columns)), dtype=dtype)
+        for i, name in enumerate(columns):
+            out[:, i] = self.column(name)[start:stop]
+        return out
+
+    def to_frame(self, columns=None, start=0, stop=None):
+        """Rows start:stop as a DataFrame with decoded labels."""
+        columns = self.columns if columns is None else columns
+        data = {}
+        for name in columns:
+            data[name] = self.labels(start, stop) if name == self.label_column else self.column(name)[start:stop]
+        return pd.DataFrame(data, columns=columns)
+
+    def iter_frames(self, columns=None, chunk_rows=CHUNK_ROWS):
+        for start in range(0, self.num_rows, chunk_rows):
+            yield self.to_frame(columns, start, start + chunk_rows)
+
+
+def load_dataset(path, columns=None):
+    """Load a dataset from a columnar file or a CSV export, optionally only some columns."""
+    if is_columnar(path):
+        return ColumnarDataset(path).to_frame(columns)
+    return pd.read_csv(path, usecols=columns)[columns] if columns is not None else pd.read_csv(path)
+
+
+def load_score_matrix(path, features):
+    """The given score columns of a dataset file as a float64 (rows, features) matrix."""
+    if is_columnar(path):
+        return ColumnarDataset(path).matrix(features)
+    return pd.read_csv(path, usecols=features)[features].to_numpy()
+
+
+def convert_csv(csv_path, output_path, label_column=LABEL_COLUMN, chunk_rows=CHUNK_ROWS):
+    """Convert a CSV dataset into the columnar format in bounded memory (two passes over the CSV)."""
+    num_rows = 0
+    categories = set()
+    for chunk in pd.read_csv(csv_path, usecols=[label_column], chunksize=chunk_rows):
+        num_rows += len(chunk)
+        categories.update(chunk[label_column].astype(str).unique())
+
+    feature_columns = [column for column in pd.read_csv(csv_path, nrows=0).columns if column != label_column]
+    with ColumnarWriter(output_path, feature_columns, sorted(categories), num_rows, label_column) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            chunk[label_column] = chunk[label_column].astype(str)
+            writer.write(chunk)
+
+
+def export_csv(path, csv_path, chunk_rows=CHUNK_ROWS):
+    """Write a columnar dataset back out as CSV, chunk by chunk."""
+    dataset = ColumnarDataset(path)
+    with open(csv_path, 'w', newline='') as f:
+        pd.DataFrame(columns=dataset.columns).to_csv(f, index=False)
+        for frame in dataset.iter_frames(chunk_rows=chunk_rows):
+            frame.to_csv(f, header=False, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and inspect columnar career datasets")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="Convert a CSV dataset to the columnar format")
+    convert_parser.add_argument('csv')
+    convert_parser.add_argument('output', nargs='?', default=None,
+                                help="Columnar file (default: the CSV path with a .cbin suffix)")
+
+    export_parser = subparsers.add_parser('export', help="Export a columnar dataset as CSV")
+    export_parser.add_argument('path')
+    export_parser.add_argument('csv')
+
+    info_parser = subparsers.add_parser('info', help="Print the schema header of a columnar dataset")
+    info_parser.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(read_header(args.path), indent=2))
+    elif args.command == 'export':
+        export_csv(args.path, args.csv)
+        print(f"Exported {args.path} to {args.csv}")
+    else:
+        output = args.output or os.path.splitext(args.csv)[0] + COLUMNAR_SUFFIX
+        convert_csv(args.csv, output)
+        print(f"Converted {args.csv} ({os.path.getsize(args.csv):,} bytes) "
+              f"to {output} ({os.path.getsize(output):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""Batch SHAP explanations over a career dataset, for model audits.
+
+Rows start:stop of a CSV or columnar dataset are split into chunks and
+explained in a process pool, each worker building one TreeExplainer when it
+starts. Workers write their SHAP values straight into a float32 ``.npy`` array
+of shape (rows, careers, features) in the output directory, so values never
+travel back through the pool and memory is bounded by the chunks in flight.
+
+A chunk is marked done in ``progress.npy`` only after its values are flushed to
+disk. Running the job again with the same arguments skips the finished chunks,
+so an interrupted run resumes where it stopped.
+
+When every chunk is done, the values are read back chunk by chunk and reduced
+to per-career and per-category attributions: the mean and mean absolute SHAP
+value of each feature toward the row's own career (or its predicted career
+with ``--group-by predicted``). They are written to ``attributions.json``.
+
+Usage:
+    python explain_batch.py ../career_dataset.csv
+    python explain_batch.py ../career_dataset.cbin --stop 50000 --workers 4 --output ../models/results/shap
+    python explain_batch.py ../career_dataset.cbin --output ../models/results/shap --aggregate-only
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+from career_categories import career_category
+from dataset_store import LABEL_COLUMN, ColumnarDataset, is_columnar
+from explainer import ModelExplainer
+from inference import DIRECT_SCORE_FEATURES, EXPECTED_FEATURES_ORDER
+from model_store import artifact_version, load_model_artifact, resolve_model_path
+from predictor import Predictor
+
+OUTPUT_DIR = os.path.join(ML_DIR, '..', 'models', 'results', 'shap')
+
+MANIFEST_FILE = 'manifest.json'
+VALUES_FILE = 'shap_values.npy'
+LABELS_FILE = 'labels.npy'
+PREDICTED_FILE = 'predicted.npy'
+PROGRESS_FILE = 'progress.npy'
+ATTRIBUTIONS_FILE = 'attributions.json'
+
+# Rows per task; SHAP on a forest takes tens of milliseconds per row
+DEFAULT_CHUNK_ROWS = 500
+
+# Rows of SHAP values read back at a time while aggregating
+AGGREGATE_CHUNK_ROWS = 4096
+
+# Features listed per career and category in the report
+TOP_FEATURES = 5
+
+
+class DatasetSlice:
+    """Rows start:stop of a CSV or columnar dataset.
+
+    Columnar scores stay memory-mapped and are read a chunk at a time; a CSV
+    is parsed once, for the score and label columns of the slice only.
+    """
+
+    def __init__(self, path, start=0, stop=None):
+        if is_columnar(path):
+            self.dataset = ColumnarDataset(path)
+            total = len(self.dataset)
+        else:
+            self.dataset = None
+            total = None
+        self.start = start
+        if self.dataset is None:
+            nrows = None if stop is None else max(stop - start, 0)
+            frame = pd.read_csv(path, usecols=DIRECT_SCORE_FEATURES + [LABEL_COLUMN],
+                                skiprows=range(1, start + 1), nrows=nrows)
+            self._scores = frame[DIRECT_SCORE_FEATURES].to_numpy()
+            self._careers = frame[LABEL_COLUMN].astype(str).to_numpy(dtype=object)
+            self.stop = start + len(frame)
+        else:
+            self.stop = total if stop is None else min(stop, total)
+
+    def __len__(self):
+        return max(self.stop - self.start, 0)
+
+    def scores(self, begin, end):
+        """Scores of slice rows begin:end, ordered as DIRECT_SCORE_FEATURES."""
+        end = min(end, len(self))
+        if self.dataset is None:
+            return self._scores[begin:end]
+        return self.dataset.matrix(DIRECT_SCORE_FEATURES, self.start + begin, self.start + end)
+
+    def careers(self):
+        if self.dataset is None:
+            return self._careers
+        return self.dataset.labels(self.start, self.stop)
+
+
+# --- Workers ---
+
+# One predictor and explainer per worker process, built by init_worker
+_worker = {}
+
+
+def init_worker(model_path, output_dir):
+    # TreeExplainer needs the original estimator, so memory-mapped artifacts load their source pickle
+    pipeline = load_model_artifact(model_path, prefer_pickle=True)
+    predictor = Predictor(pipeline, version=artifact_version(model_path), path=model_path)
+    _worker['predictor'] = predictor
+    _worker['explainer'] = ModelExplainer(predictor)
+    _worker['values'] = np.load(os.path.join(output_dir, VALUES_FILE), mmap_mode='r+')
+    _worker['predicted'] = np.load(os.path.join(output_dir, PREDICTED_FILE), mmap_mode='r+')
+
+
+def explain_chunk(task):
+    """Explain one chunk, write its values and predictions to disk and return its index."""
+    index, begin, scores = task
+    predictor = _worker['predictor']
+    input_scaled = predictor.scale_score_matrix(scores)
+    end = begin + len(scores)
+
+    values = _worker['values']
+    predicted = _worker['predicted']
+    values[begin:end] = _worker['explainer'].shap_values(input_scaled)
+    predicted[begin:end] = np.argmax(predictor.model.predict_proba(input_scaled), axis=1)
+    values.flush()
+    predicted.flush()
+    return index
+
+
+def run_chunks(tasks, workers, initargs):
+    """Yield the index of every chunk as it finishes, in any order.
+
+    With workers > 1 at most 2 * workers chunks are in flight, so only their
+    input rows are held in memory.
+    """
+    if workers <= 1:
+        init_worker(*initargs)
+        yield from map(explain_chunk, tasks)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=initargs) as pool:
+        pending = set()
+        try:
+            for task in tasks:
+                pending.add(pool.submit(explain_chunk, task))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+# --- Job ---
+
+def describe_job(dataset_path, rows, model_path, careers, chunk_rows):
+    """Everything the stored values depend on; a resumed run must match it exactly."""
+    stat = os.stat(dataset_path)
+    return {
+        'dataset': os.path.abspath(dataset_path),
+        'dataset_size': stat.st_size,
+        'dataset_mtime': stat.st_mtime,
+        'start': rows.start,
+        'stop': rows.stop,
+        'chunk_rows': chunk_rows,
+        'model_path': os.path.abspath(model_path),
+        'model_version': artifact_version(model_path),
+        'careers': careers,
+        'features': list(EXPECTED_FEATURES_ORDER),
+    }
+
+
+def prepare_output(output_dir, job, rows, overwrite=False):
+    """Create the output arrays, or reopen those of an unfinished run of the same job.
+
+    Returns the progress array, one flag per chunk.
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path) and not overwrite:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest['job'] != job:
+            raise ValueError(f"{output_dir} holds a different job; use --overwrite or another --output")
+        return np.load(os.path.join(output_dir, PROGRESS_FILE), mmap_mode='r+')
+
+    os.makedirs(output_dir, exist_ok=True)
+    # The manifest goes last, so a half-prepared directory is never taken for a resumable run
+    if os.path.exists(manifest_path):
+        os.unlink(manifest_path)
+
+    n_rows = len(rows)
+    n_careers = len(job['careers'])
+    n_features = len(job['features'])
+    n_chunks = -(-n_rows // job['chunk_rows'])
+    shape = (n_rows, n_careers, n_features)
+    values = np.lib.format.open_memmap(os.path.join(output_dir, VALUES_FILE), mode='w+',
+                                       dtype=np.float32, shape=shape)
+    del values
+
+    # Careers the model does not know are stored as -1 and left out of the per-career attributions
+    codes = {career: code for code, career in enumerate(job['careers'])}
+    labels = np.array([codes.get(career, -1) for career in rows.careers()], dtype=np.int16)
+    np.save(os.path.join(output_dir, LABELS_FILE), labels)
+    np.save(os.path.join(output_dir, PREDICTED_FILE), np.full(n_rows, -1, dtype=np.int16))
+    np.save(os.path.join(output_dir, PROGRESS_FILE), np.zeros(n_chunks, dtype=bool))
+
+    with open(manifest_path, 'w') as f:
+        json.dump({
+            'job': job,
+            'shape': list(shape),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }, f, indent=2)
+    return np.load(os.path.join(output_dir, PROGRESS_FILE), mmap_mode='r+')
+
+
+def explain_dataset(dataset_path, output_dir=OUTPUT_DIR, model_path=None, start=0, stop=None,
+                    chunk_rows=DEFAULT_CHUNK_ROWS, workers=1, overwrite=False, progress=True):
+    """Explain rows start:stop of a dataset into output_dir, resuming an unfinished run."""
+    model_path = resolve_model_path(model_path)
+    careers = [str(career) for career in load_model_artifact(model_path)['encoder'].classes_]
+    rows = DatasetSlice(dataset_path, start, stop)
+    if len(rows) == 0:
+        raise ValueError(f"No rows to explain in {dataset_path}[{start}:{stop}]")
+
+    job = describe_job(dataset_path, rows, model_path, careers, chunk_rows)
+    done = prepare_output(output_dir, job, rows, overwrite)
+    remaining = np.flatnonzero(~done)
+    if len(remaining) < len(done):
+        print(f"Resuming: {len(done) - len(remaining)} of {len(done)} chunks already explained")
+
+    tasks = (
+        (index, index * chunk_rows, rows.scores(index * chunk_rows, (index + 1) * chunk_rows))
+        for index in remaining
+    )
+    to_explain = sum(min(chunk_rows, len(rows) - index * chunk_rows) for index in remaining)
+    explained = 0
+    started = time.perf_counter()
+    for index in run_chunks(tasks, workers, (model_path, output_dir)):
+        done[index] = True
+        done.flush()
+        explained += min(chunk_rows, len(rows) - index * chunk_rows)
+        if progress:
+            report_progress(explained, to_explain, started)
+
+
+def report_progress(explained, total, started):
+    elapsed = time.perf_counter() - started
+    rate = explained / elapsed if elapsed else 0.0
+    eta = (total - explained) / rate if rate else 0.0
+    print(f"  {explained:,} / {total:,} rows ({explained / total:.0%}), {rate:,.0f} rows/s, ETA {eta:.0f}s",
+          file=sys.stderr, flush=True)
+
+
+# --- Aggregation ---
+
+def aggregate(output_dir, group_by='career', chunk_rows=AGGREGATE_CHUNK_ROWS):
+    """Per-career and per-category attributions of a finished run, read chunk_rows rows at a time.
+
+    Each row contributes its SHAP values toward the career it is grouped under,
+    the labelled career or (group_by='predicted') the one the model ranked first.
+    """
+    with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    done = np.load(os.path.join(output_dir, PROGRESS_FILE))
+    if not done.all():
+        raise ValueError(f"{int((~done).sum())} of {len(done)} chunks are not explained yet; run the job to finish them")
+
+    careers = manifest['job']['careers']
+    features = manifest['job']['features']
+    values = np.load(os.path.join(output_dir, VALUES_FILE), mmap_mode='r')
+    groups = np.load(os.path.join(output_dir, LABELS_FILE if group_by == 'career' else PREDICTED_FILE))
+    n_rows, n_careers, n_features = values.shape
+
+    count = np.zeros(n_careers, dtype=np.int64)
+    total = np.zeros((n_careers, n_features))
+    total_abs = np.zeros((n_careers, n_features))
+    # Mean |SHAP| over every row and career, the model's global feature importance
+    overall_abs = np.zeros(n_features)
+    for begin in range(0, n_rows, chunk_rows):
+        block = values[begin:begin + chunk_rows]
+        group = groups[begin:begin + chunk_rows].astype(np.intp)
+        known = np.flatnonzero(group >= 0)
+        group = group[known]
+        own = block[known, group].astype(np.float64)
+
+        count += np.bincount(group, minlength=n_careers)
+        total += np.stack([np.bincount(group, weights=column, minlength=n_careers) for column in own.T], axis=1)
+        total_abs += np.stack([np.bincount(group, weights=np.abs(column), minlength=n_careers)
+                               for column in own.T], axis=1)
+        overall_abs += np.abs(block).sum(axis=(0, 1), dtype=np.float64)
+
+    def summarise(rows, sums, abs_sums):
+        mean_abs = abs_sums / max(rows, 1)
+        strongest = np.argsort(-mean_abs, kind='stable')[:TOP_FEATURES]
+        return {
+            'rows': int(rows),
+            'mean': dict(zip(features, (sums / max(rows, 1)).tolist())),
+            'mean_abs': dict(zip(features, mean_abs.tolist())),
+            'top_features': [features[i] for i in strongest],
+        }
+
+    by_career = {}
+    by_category = {}
+    for code, career in enumerate(careers):
+        if count[code] == 0:
+            continue
+        by_career[career] = summarise(count[code], total[code], total_abs[code])
+        category = career_category(career)
+        by_career[career]['category'] = category
+        rows, sums, abs_sums = by_category.get(category, (0, 0.0, 0.0))
+        by_category[category] = (rows + count[code], sums + total[code], abs_sums + total_abs[code])
+
+    overall_mean_abs = overall_abs / max(n_rows * n_careers, 1)
+    return {
+        'group_by': group_by,
+        'rows': int(n_rows),
+        'ungrouped_rows': int(n_rows - count.sum()),
+        'model_version': manifest['job']['model_version'],
+        'overall_mean_abs': dict(zip(features, overall_mean_abs.tolist())),
+        'categories': {category: summarise(*totals) for category, totals in sorted(by_category.items())},
+        'careers': by_career,
+    }
+
+
+def print_attributions(attributions):
+    print(f"\n{attributions['rows']} rows grouped by {attributions['group_by']}"
+          f" ({attributions['ungrouped_rows']} without a known career)")
+
+    print("\nMean |SHAP| over all careers:")
+    overall = sorted(attributions['overall_mean_abs'].items(), key=lambda item: -item[1])
+    for feature, value in overall:
+        print(f"  {feature:<24} {value:.4f}")
+
+    for category, summary in attributions['categories'].items():
+        print(f"\n{category} ({summary['rows']} rows):")
+        for feature in summary['top_features']:
+            print(f"  {feature:<24} mean {summary['mean'][feature]:+.4f}  |mean| {summary['mean_abs'][feature]:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch SHAP explanations over a career dataset")
+    parser.add_argument('dataset', help="CSV or columnar (.cbin) dataset")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="Directory for the arrays and attributions")
+    parser.add_argument('--model', default=None, help="Model artifact (default: resolved automatically)")
+    parser.add_argument('--start', type=int, default=0, help="First dataset row to explain")
+    parser.add_argument('--stop', type=int, default=None, help="Row to stop before (default: the end)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per task")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (0: one per CPU)")
+    parser.add_argument('--group-by', choices=('career', 'predicted'), default='career',
+                        help="Attribute each row to its labelled or its predicted career")
+    parser.add_argument('--overwrite', action='store_true', help="Discard the results of a different job in --output")
+    parser.add_argument('--aggregate-only', action='store_true', help="Only aggregate the results of a finished run")
+    args = parser.parse_args()
+
+    try:
+        if not args.aggregate_only:
+            explain_dataset(args.dataset, args.output, args.model, args.start, args.stop, args.chunk_rows,
+                            args.workers or os.cpu_count(), args.overwrite)
+        attributions = aggregate(args.output, args.group_by)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again with the same arguments to resume")
+        sys.exit(130)
+
+    path = os.path.join(args.output, ATTRIBUTIONS_FILE)
+    with open(path, 'w') as f:
+        json.dump(attributions, f, indent=2)
+    print_attributions(attributions)
+    print(f"\nAttributions written to {path}")
+
+
+if __name__ == '__main__':
+    main()
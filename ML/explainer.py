@@ -0,0 +1,182 @@
+"""SHAP explanations of career recommendations for the /explain endpoint.
+
+A ``shap.TreeExplainer`` is expensive to build, so one is built per model
+version and reused for every request until that version is retired. A batch
+of profiles is explained with a single ``shap_values`` call, and results are
+kept in a ``PredictionCache`` keyed on the canonical score vector, so repeated
+profiles skip SHAP entirely.
+
+Contributions are reported for the scaled model input, one per feature in the
+training order (including the engineered features). For forests they are in
+probability units; for boosted models they are in raw margin (log-odds) units.
+"""
+import threading
+
+import numpy as np
+
+from inference import DIRECT_SCORE_FEATURES, EXPECTED_FEATURES_ORDER, build_feature_frame
+from model_store import load_model_artifact
+from tree_engine import CompiledTreeEnsemble
+
+# Upper bound on the number of profiles explained in a single call; SHAP is far slower than predict_proba
+MAX_EXPLAIN_BATCH_SIZE = 100
+
+# Number of recommended careers explained and features reported per career by default
+DEFAULT_EXPLAIN_TOP_N = 3
+DEFAULT_TOP_FEATURES = 5
+
+# Explainers kept alive: the active model version and the rollback target
+MAX_EXPLAINERS = 2
+
+
+class ModelExplainer:
+    """A TreeExplainer built once for one model version."""
+
+    def __init__(self, predictor):
+        try:
+            import shap
+        except ImportError:
+            raise RuntimeError("Explanations need the 'shap' package; install it with 'pip install shap'")
+
+        self.version = predictor.version
+        self.model = explainable_model(predictor)
+        self.explainer = shap.TreeExplainer(self.model)
+        self.n_classes = predictor.n_classes
+        self.base_values = per_class_base_values(self.explainer.expected_value, self.n_classes)
+        if predictor.plan is not None:
+            self.feature_names = list(predictor.plan.feature_order)
+        else:
+            self.feature_names = list(EXPECTED_FEATURES_ORDER)
+
+    def shap_values(self, input_scaled):
+        """SHAP values for every row as an array of shape (n_rows, n_classes, n_features)."""
+        return per_class_values(self.explainer.shap_values(input_scaled), self.n_classes)
+
+
+def per_class_values(values, n_classes):
+    """Arrange shap_values output as (n_rows, n_classes, n_features), whatever the shap version and model."""
+    if isinstance(values, list):
+        # Older shap versions return one (n_rows, n_features) array per class
+        return np.stack(values, axis=1)
+    values = np.asarray(values)
+    if values.ndim == 2:
+        # Binary boosted models have a single margin: the log-odds of the positive class
+        if n_classes == 2:
+            return np.stack([-values, values], axis=1)
+        return values[:, np.newaxis, :]
+    return np.transpose(values, (0, 2, 1))
+
+
+def per_class_base_values(expected_value, n_classes):
+    """The explainer's expected value for every class, negating a single binary margin like per_class_values."""
+    base_values = np.atleast_1d(np.asarray(expected_value, dtype=float))
+    if len(base_values) == 1 and n_classes == 2:
+        return np.array([-base_values[0], base_values[0]])
+    return base_values
+
+
+def explainable_model(predictor):
+    """The original estimator behind predictor, which TreeExplainer needs.
+
+    Memory-mapped artifacts only carry the compiled trees, so their source
+    pickle (recorded in the manifest) is loaded instead.
+    """
+    model = predictor.pipeline['model']
+    if isinstance(model, CompiledTreeEnsemble):
+        model = load_model_artifact(predictor.path, prefer_pickle=True)['model']
+    if isinstance(model, CompiledTreeEnsemble):
+        raise RuntimeError(
+            "Explanations need the original estimator; the source pickle of this model artifact is not available"
+        )
+    return model
+
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def explainer_for(predictor):
+    """Return the ModelExplainer for predictor's model version, building it on first use."""
+    with _explainers_lock:
+        explainer = _explainers.get(predictor.version)
+        if explainer is None:
+            # Built under the lock so concurrent first requests do not build it twice
+            explainer = ModelExplainer(predictor)
+            _explainers[predictor.version] = explainer
+            while len(_explainers) > MAX_EXPLAINERS:
+                del _explainers[next(iter(_explainers))]
+        return explainer
+
+
+def explain_score_rows(predictor, score_rows, top_n=DEFAULT_EXPLAIN_TOP_N, top_features=DEFAULT_TOP_FEATURES):
+    """Explain the top_n recommended careers for each score dict in one SHAP pass.
+
+    Returns one dict per profile with the recommended careers, their
+    probabilities and the top_features features that moved each one most.
+    """
+    explainer = explainer_for(predictor)
+
+    if predictor.plan is not None:
+        features = predictor.plan.features_rows(score_rows)
+        raw = features.copy()
+        input_scaled = predictor.plan.scale(features)
+    else:
+        input_df = build_feature_frame(score_rows)
+        raw = input_df.to_numpy(dtype=float)
+        input_scaled = predictor.scaler.transform(input_df)
+
+    probabilities = predictor.model.predict_proba(input_scaled)
+    top_n_indices = np.argsort(probabilities, axis=1)[:, -top_n:][:, ::-1]
+    careers = predictor.encoder.inverse_transform(top_n_indices.ravel()).reshape(top_n_indices.shape)
+
+    shap_values = explainer.shap_values(input_scaled)
+    top_features = min(top_features, len(explainer.feature_names))
+
+    explanations = []
+    for row in range(len(score_rows)):
+        recommended = []
+        for rank, class_index in enumerate(top_n_indices[row]):
+            contributions = shap_values[row, class_index]
+            strongest = np.argsort(np.abs(contributions))[-top_features:][::-1]
+            recommended.append({
+                "career": str(careers[row, rank]),
+                "probability": float(probabilities[row, class_index]),
+                "base_value": float(explainer.base_values[class_index]),
+                "top_features": [
+                    {
+                        "feature": explainer.feature_names[feature],
+                        "value": float(raw[row, feature]),
+                        "impact": float(contributions[feature]),
+                    }
+                    for feature in strongest
+                ],
+            })
+        explanations.append({"careers": recommended})
+    return explanations
+
+
+def explain_cached(predictor, score_rows, top_n, top_features, cache=None):
+    """explain_score_rows with per-profile results reused from cache.
+
+    Only the profiles missing from the cache go through SHAP, together in one batch.
+    """
+    if cache is None:
+        return explain_score_rows(predictor, score_rows, top_n, top_features)
+
+    results = [None] * len(score_rows)
+    misses = []
+    for i, scores in enumerate(score_rows):
+        vector, canonical = cache.canonical_scores(scores)
+        if vector is None:
+            raise ValueError(f"Scores must be numeric for {DIRECT_SCORE_FEATURES}")
+        key = cache.make_key(vector, (top_n, top_features))
+        results[i] = cache.get(key, predictor.version)
+        if results[i] is None:
+            misses.append((i, key, canonical))
+
+    if misses:
+        computed = explain_score_rows(predictor, [canonical for _, _, canonical in misses], top_n, top_features)
+        for (i, key, _), explanation in zip(misses, computed):
+            cache.put(key, explanation, predictor.version)
+            results[i] = explanation
+    return results
@@ -0,0 +1,134 @@
+"""Import-time report and start-up budget for the service and CLI entry points.
+
+Each entry point is imported in a fresh interpreter with ``python -X importtime``
+so nothing is cached between runs. The report shows the total import time and
+the heaviest modules it pulled in. The run fails (exit code 1) when the median
+over the runs exceeds that entry point's budget, so it can gate CI or a deploy.
+
+Importing ``app`` and ``asgi_app`` also loads the model, as a worker does at
+start-up, so point CAREER_MODEL_PATH (or MODEL_DIR) at the artifact you want
+measured; a memory-mapped ``.model`` directory is what production loads.
+
+Usage:
+    python import_budget.py
+    python import_budget.py --entry app --entry model_service --runs 5
+    python import_budget.py --budget app=400 --json ../models/results/import_times.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(ML_DIR, '..')
+
+# Entry point: (directory put on sys.path, module imported, budget in milliseconds)
+ENTRY_POINTS = {
+    'app': (ML_DIR, 'app', 300),
+    'asgi_app': (ML_DIR, 'asgi_app', 600),
+    'model_service': (os.path.join(ROOT_DIR, 'backend', 'src', 'services'), 'model_service', 150),
+    'generate_career_dataset': (os.path.join(ROOT_DIR, 'src', 'data'), 'generate_career_dataset', 400),
+    'dataset_stats': (os.path.join(ROOT_DIR, 'src', 'data'), 'dataset_stats', 400),
+    'test_model': (os.path.join(ROOT_DIR, 'src', 'training'), 'test_model', 150),
+    'load_test': (ML_DIR, 'load_test', 400),
+}
+
+# Heaviest imports listed per entry point
+TOP_MODULES = 8
+
+
+def parse_importtime(stderr):
+    """Return [(depth, module, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(directory, module):
+    """Import module once in a new interpreter; return (entry module ms, heaviest top-level imports)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=directory, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        last_line = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'no output'
+        raise RuntimeError(f"Importing {module} failed: {last_line}")
+
+    rows = parse_importtime(completed.stderr)
+    entry = next((row for row in reversed(rows) if row[0] == 0 and row[1] == module), None)
+    if entry is None:
+        raise RuntimeError(f"No import time reported for {module}")
+    # Direct imports of the entry module are the rows one level deeper, before its own row
+    end = rows.index(entry)
+    start = end
+    while start > 0 and rows[start - 1][0] > 0:
+        start -= 1
+    children = [row for row in rows[start:end] if row[0] == 1]
+    children.sort(key=lambda row: row[3], reverse=True)
+    return entry[3] / 1000.0, [(name, cumulative / 1000.0) for _, name, _, cumulative in children[:TOP_MODULES]]
+
+
+def parse_budget(text):
+    name, _, milliseconds = text.partition('=')
+    if name not in ENTRY_POINTS or not milliseconds:
+        raise argparse.ArgumentTypeError(f"Expected NAME=MS with NAME one of {', '.join(ENTRY_POINTS)}")
+    return name, float(milliseconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import times and enforce start-up budgets")
+    parser.add_argument('--entry', action='append', choices=sorted(ENTRY_POINTS),
+                        help="Entry point to measure (repeatable; default: all)")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters per entry point; the median is used")
+    parser.add_argument('--budget', action='append', type=parse_budget, default=[],
+                        help="Override a budget, e.g. app=400")
+    parser.add_argument('--json', default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    overrides = dict(args.budget)
+    report = {}
+    failures = []
+    for name in args.entry or ENTRY_POINTS:
+        directory, module, budget = ENTRY_POINTS[name]
+        budget = overrides.get(name, budget)
+        try:
+            runs = [measure(directory, module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name}: {e}")
+            failures.append(name)
+            continue
+
+        median = statistics.median(total for total, _ in runs)
+        # Module breakdown from the run closest to the median
+        _, heaviest = min(runs, key=lambda run: abs(run[0] - median))
+        status = 'ok' if median <= budget else 'OVER BUDGET'
+        if median > budget:
+            failures.append(name)
+        report[name] = {'median_ms': median, 'budget_ms': budget, 'runs_ms': [total for total, _ in runs],
+                        'heaviest_imports_ms': dict(heaviest)}
+
+        print(f"{name:<24} {median:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+        for module_name, milliseconds in heaviest:
+            print(f"    {module_name:<36} {milliseconds:8.1f} ms")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if failures:
+        print(f"\nFailed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nAll entry points within budget")
+
+
+if __name__ == '__main__':
+    main()
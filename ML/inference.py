@@ -0,0 +1,291 @@
+"""Feature construction and scaling for the career prediction service.
+
+Two interchangeable paths turn raw score dicts into the scaled model input:
+
+* the reference path builds a pandas DataFrame, adds the engineered features
+  as columns and calls ``scaler.transform`` - this mirrors the notebook the
+  model was trained in;
+* the fast path uses an ``InferencePlan`` compiled once from the fitted scaler,
+  which fills a preallocated float array, computes the engineered products in
+  place and applies the scaling without any pandas objects.
+
+Both paths accept the same inputs: scores must be numbers, and strings are
+rejected even when they hold one. Run ``python inference.py --check-parity``
+to confirm both paths give identical probabilities for the loaded pipeline;
+test_inference.py checks the same on a small fitted pipeline.
+"""
+import argparse
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Define the expected features for the model input based on the notebook analysis
+# These are the direct scores used, excluding the engineered features initially
+DIRECT_SCORE_FEATURES = [
+    'cognition', 'reasoning', 'figural_memory', 'spatial_ability',
+    'verbal_ability', 'social_ability', 'numerical_ability', 'numerical_memory',
+    'knowledge', 'practical', 'artistic', 'social', 'power_coping'
+]
+
+# The full list of features including engineered ones, in the order expected by the model
+# This order is important for consistency if your scaler or model are sensitive to it
+EXPECTED_FEATURES_ORDER = [
+    'cognition', 'reasoning', 'figural_memory', 'spatial_ability',
+    'verbal_ability', 'social_ability', 'numerical_ability', 'numerical_memory',
+    'knowledge', 'practical', 'artistic', 'social', 'power_coping',
+    'analytical_skill', 'creative_practical'
+]
+
+# Engineered features and the two direct scores each one is the product of
+ENGINEERED_FEATURES = {
+    'analytical_skill': ('reasoning', 'numerical_ability'),
+    'creative_practical': ('artistic', 'practical'),
+}
+
+# Selectable ways of building the scaled model input
+INFERENCE_MODE_FAST = 'fast'
+INFERENCE_MODE_PANDAS = 'pandas'
+INFERENCE_MODES = (INFERENCE_MODE_FAST, INFERENCE_MODE_PANDAS)
+
+
+# --- Input validation shared by both paths ---
+
+def numeric_score(value):
+    """One score as a float; ValueError for strings, which NumPy would parse but pandas would not."""
+    if isinstance(value, (str, bytes)):
+        raise ValueError(f"Scores must be numbers, got the string {value!r}")
+    return float(value)
+
+
+def numeric_array(values):
+    """Nested lists of scores as a float array; ValueError if any of them is a string."""
+    array = np.asarray(values)
+    if array.dtype.kind in 'SU' or (
+            array.dtype == object and any(isinstance(value, (str, bytes)) for value in array.ravel())):
+        raise ValueError("Scores must be numbers, not strings")
+    return array.astype(np.float64, copy=False)
+
+
+# --- Reference (pandas) path ---
+
+def build_feature_frame(score_rows):
+    """Build the model input DataFrame for a list of score dicts."""
+    # pandas is only needed on this path, so the service starts without importing it
+    import pandas as pd
+
+    # Create one row per profile with the expected direct score features
+    # Use .get() with a default of 0 in case a score is missing
+    feature_data = [
+        {feature: scores.get(feature, 0) for feature in DIRECT_SCORE_FEATURES}
+        for scores in score_rows
+    ]
+    numeric_array([list(row.values()) for row in feature_data])
+    input_df = pd.DataFrame(feature_data, columns=DIRECT_SCORE_FEATURES)
+    return add_engineered_features(input_df)
+
+
+def build_feature_frame_from_matrix(matrix):
+    """Build the model input DataFrame from rows of scores in DIRECT_SCORE_FEATURES order."""
+    import pandas as pd
+
+    values = as_score_matrix(matrix)
+    input_df = pd.DataFrame(values, columns=DIRECT_SCORE_FEATURES)
+    return add_engineered_features(input_df)
+
+
+def add_engineered_features(input_df):
+    """Recreate the engineered features and order columns as the model was trained."""
+    # Recreate engineered features - must match notebook logic exactly
+    input_df['analytical_skill'] = input_df['reasoning'] * input_df['numerical_ability']
+    input_df['creative_practical'] = input_df['artistic'] * input_df['practical']
+
+    # Reorder columns to match the order the model was trained on
+    # This is crucial for ensuring correct input to the scaler and model
+    return input_df[EXPECTED_FEATURES_ORDER]
+
+
+def as_score_matrix(matrix):
+    """Validate a matrix of direct scores and return it as a 2D float array."""
+    values = numeric_array(matrix)
+    if values.ndim != 2 or values.shape[1] != len(DIRECT_SCORE_FEATURES):
+        raise ValueError(
+            f"Expected a matrix with {len(DIRECT_SCORE_FEATURES)} columns "
+            f"ordered as {DIRECT_SCORE_FEATURES}"
+        )
+    return values
+
+
+# --- Fast (compiled) path ---
+
+def is_standard_scaler(scaler):
+    """Whether scaler standardizes as (x - mean_) / scale_: a StandardScaler or its array-backed stand-in."""
+    # Imported here so the service does not load sklearn just to serve a memory-mapped artifact
+    from model_store import ArrayScaler
+    if isinstance(scaler, ArrayScaler):
+        return True
+    from sklearn.preprocessing import StandardScaler
+    return isinstance(scaler, StandardScaler) and hasattr(scaler, 'scale_')
+
+
+class InferencePlan:
+    """Precompiled feature construction and scaling for a fitted StandardScaler.
+
+    The plan resolves every column position once, so building the scaled input
+    for a request is a handful of array operations on a preallocated buffer.
+    The scaling subtracts the mean and divides by the scale exactly as
+    ``StandardScaler.transform`` does, keeping the result bit-for-bit equal to
+    the reference path.
+    """
+
+    def __init__(self, scaler, feature_order=EXPECTED_FEATURES_ORDER):
+        if not is_standard_scaler(scaler):
+            raise TypeError(
+                f"Cannot compile an inference plan for {type(scaler).__name__}; "
+                "expected a fitted StandardScaler"
+            )
+
+        self.feature_order = list(feature_order)
+        self.n_features = len(self.feature_order)
+        position = {name: i for i, name in enumerate(self.feature_order)}
+
+        missing = [f for f in DIRECT_SCORE_FEATURES + list(ENGINEERED_FEATURES) if f not in position]
+        if missing:
+            raise ValueError(f"Feature order is missing {missing}")
+
+        # Column positions for the direct scores and the engineered products
+        self.direct_index = np.array([position[f] for f in DIRECT_SCORE_FEATURES], dtype=np.intp)
+        self.engineered_index = [
+            (position[name], position[left], position[right])
+            for name, (left, right) in ENGINEERED_FEATURES.items()
+        ]
+
+        # Affine scaling parameters; None means the step is disabled on the scaler
+        mean = getattr(scaler, 'mean_', None) if getattr(scaler, 'with_mean', True) else None
+        scale = getattr(scaler, 'scale_', None) if getattr(scaler, 'with_std', True) else None
+        self.mean_ = None if mean is None else np.asarray(mean, dtype=np.float64).copy()
+        self.scale_ = None if scale is None else np.asarray(scale, dtype=np.float64).copy()
+
+        # Single-row buffers are per thread because Flask serves requests concurrently
+        self._local = threading.local()
+
+    def _row_buffer(self):
+        buffer = getattr(self._local, 'row', None)
+        if buffer is None:
+            buffer = np.empty((1, self.n_features), dtype=np.float64)
+            self._local.row = buffer
+        return buffer
+
+    def add_engineered(self, X):
+        """Fill the engineered product columns of X in place."""
+        for target, left, right in self.engineered_index:
+            np.multiply(X[:, left], X[:, right], out=X[:, target])
+        return X
+
+    def scale(self, X):
+        """Apply the scaler's affine transform to X in place."""
+        if self.mean_ is not None:
+            np.subtract(X, self.mean_, out=X)
+        if self.scale_ is not None:
+            np.divide(X, self.scale_, out=X)
+        return X
+
+    def features_scores(self, scores):
+        """Unscaled (1, n_features) input for a single score dict, in the per-thread buffer."""
+        X = self._row_buffer()
+        row = X[0]
+        for column, feature in zip(self.direct_index, DIRECT_SCORE_FEATURES):
+            value = scores.get(feature, 0)
+            if isinstance(value, (str, bytes)):
+                raise ValueError(f"Scores must be numbers, got the string {value!r}")
+            row[column] = value
+        return self.add_engineered(X)
+
+    def features_rows(self, score_rows):
+        """Unscaled input for a list of score dicts."""
+        X = np.empty((len(score_rows), self.n_features), dtype=np.float64)
+        X[:, self.direct_index] = numeric_array([
+            [scores.get(feature, 0) for feature in DIRECT_SCORE_FEATURES]
+            for scores in score_rows
+        ])
+        return self.add_engineered(X)
+
+    def features_matrix(self, matrix):
+        """Unscaled input for rows of scores in DIRECT_SCORE_FEATURES order."""
+        values = as_score_matrix(matrix)
+        X = np.empty((values.shape[0], self.n_features), dtype=np.float64)
+        X[:, self.direct_index] = values
+        return self.add_engineered(X)
+
+    def transform_scores(self, scores):
+        """Return the scaled (1, n_features) input for a single score dict.
+
+        The returned array is a reused per-thread buffer; consume it before the
+        next call on the same thread.
+        """
+        return self.scale(self.features_scores(scores))
+
+    def transform_rows(self, score_rows):
+        """Return the scaled input for a list of score dicts."""
+        return self.scale(self.features_rows(score_rows))
+
+    def transform_matrix(self, matrix):
+        """Return the scaled input for rows of scores in DIRECT_SCORE_FEATURES order."""
+        return self.scale(self.features_matrix(matrix))
+
+
+def check_parity(pipeline, score_matrix):
+    """Compare reference and fast path probabilities for every row of score_matrix.
+
+    Returns the largest absolute probability difference (0.0 means identical).
+    """
+    plan = InferencePlan(pipeline['scaler'])
+    model = pipeline['model']
+
+    reference_input = pipeline['scaler'].transform(build_feature_frame_from_matrix(score_matrix))
+    reference = model.predict_proba(reference_input)
+
+    fast_batch = model.predict_proba(plan.transform_matrix(score_matrix))
+
+    # Also exercise the single-row buffer on a sample of rows
+    fast_single = np.vstack([
+        model.predict_proba(plan.transform_scores(dict(zip(DIRECT_SCORE_FEATURES, row))))
+        for row in np.asarray(score_matrix, dtype=float)[:200]
+    ])
+
+    return max(
+        float(np.max(np.abs(reference - fast_batch))),
+        float(np.max(np.abs(reference[:len(fast_single)] - fast_single))),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference path utilities for the career model")
+    parser.add_argument('--check-parity', action='store_true',
+                        help="Verify the fast path gives the same probabilities as the pandas path")
+    parser.add_argument('--model', default=None,
+                        help="Path to the pickled model pipeline (default: resolved automatically)")
+    parser.add_argument('--dataset', default=os.path.join(os.path.dirname(__file__), '..', 'career_dataset.csv'),
+                        help="Dataset of score profiles to compare on (CSV or .cbin)")
+    args = parser.parse_args()
+
+    if not args.check_parity:
+        parser.print_help()
+        return
+
+    from dataset_store import load_score_matrix
+    from model_store import load_model_artifact
+    pipeline = load_model_artifact(args.model, prefer_pickle=True)
+    score_matrix = load_score_matrix(args.dataset, DIRECT_SCORE_FEATURES)
+
+    max_diff = check_parity(pipeline, score_matrix)
+    print(f"Compared {len(score_matrix)} profiles, max probability difference: {max_diff}")
+    if max_diff != 0.0:
+        print("Parity check FAILED: fast and pandas paths disagree")
+        sys.exit(1)
+    print("Parity check passed: fast and pandas paths are identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""Load generator for the career prediction service.
+
+Sends realistic score profiles, sampled from CAREER_PATTERNS in
+``src/data/generate_career_dataset.py``, to ``/predict`` and measures how the
+service holds up:
+
+* closed loop (``--concurrency 1,8,32``): N workers each send requests back to
+  back, which finds the saturation throughput;
+* open loop (``--rate 50,100,200``): requests are started on a fixed schedule
+  regardless of how fast earlier ones finish, and latency is measured from the
+  scheduled start so queueing delay is not hidden.
+
+Each comma-separated level is one step of ``--duration`` seconds. Every step
+reports throughput, p50/p95/p99 latency and the error rate, and the whole run
+is written to a JSON file so runs can be compared across model versions and
+server modes.
+
+Usage:
+    python load_test.py --concurrency 1,4,16 --duration 10
+    python load_test.py --rate 100,200,400 --url http://127.0.0.1:5001/predict
+    python load_test.py --in-process flask --concurrency 8 --label fast-compiled
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'data'))
+from generate_career_dataset import ABILITIES, CAREER_PATTERNS, ORIENTATIONS, generate_scores
+
+DEFAULT_URL = 'http://127.0.0.1:5001/predict'
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models', 'results')
+
+# Settings that change how the service answers, recorded with in-process runs
+SERVER_SETTINGS = (
+    'INFERENCE_MODE', 'MODEL_ENGINE', 'MICRO_BATCH', 'MICRO_BATCH_MAX_SIZE', 'MICRO_BATCH_WAIT_MS',
+    'PREDICTION_CACHE_SIZE', 'PREDICTION_CACHE_QUANTUM', 'INFERENCE_THREADS', 'CAREER_MODEL_PATH', 'MODEL_DIR',
+)
+
+
+def generate_profiles(count, seed=0):
+    """Score dicts drawn from CAREER_PATTERNS, one random career per profile."""
+    random.seed(seed)
+    careers = list(CAREER_PATTERNS)
+    profiles = []
+    for _ in range(count):
+        abilities, orientations = generate_scores(CAREER_PATTERNS[random.choice(careers)])
+        profiles.append(dict(zip(ABILITIES + ORIENTATIONS, abilities + orientations)))
+    return profiles
+
+
+# --- Targets ---
+
+class HttpTarget:
+    """POSTs to a running service, with one keep-alive session per worker thread."""
+
+    def __init__(self, url):
+        import requests
+        self.url = url
+        self.requests = requests
+        self._local = threading.local()
+
+    def describe(self):
+        return {'type': 'http', 'url': self.url}
+
+    def post(self, scores):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self.requests.Session()
+        response = session.post(self.url, json={'scores': scores}, timeout=30)
+        return response.status_code, response.json() if response.status_code == 200 else None
+
+
+class InProcessTarget:
+    """Calls the Flask or ASGI app in this process through its test client."""
+
+    def __init__(self, server):
+        self.server = server
+        self._local = threading.local()
+        if server == 'flask':
+            import app
+            self.app = app.app
+        else:
+            import asgi_app
+            from fastapi.testclient import TestClient
+            # One client whose event loop stays up for the whole run, as under uvicorn;
+            # the app's asyncio primitives are bound to that single loop
+            self.client = TestClient(asgi_app.app)
+            self.client.__enter__()
+
+    def describe(self):
+        return {
+            'type': 'in-process',
+            'server': self.server,
+            'settings': {name: os.environ[name] for name in SERVER_SETTINGS if name in os.environ},
+        }
+
+    def post(self, scores):
+        if self.server != 'flask':
+            response = self.client.post('/predict', json={'scores': scores})
+            return response.status_code, response.json() if response.status_code == 200 else None
+
+        # Flask test clients are cheap and not shared between threads
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post('/predict', json={'scores': scores})
+        return response.status_code, response.get_json() if response.status_code == 200 else None
+
+
+# --- Measurement ---
+
+class StepRecorder:
+    """Collects latencies and outcomes of one load step from many threads."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.model_versions = set()
+        self._lock = threading.Lock()
+
+    def record(self, latency, error=None, model_version=None):
+        with self._lock:
+            self.latencies.append(latency)
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            if model_version is not None:
+                self.model_versions.add(model_version)
+
+    def summary(self, elapsed, offered=None):
+        latencies = np.array(self.latencies) * 1000.0
+        count = len(latencies)
+        failed = sum(self.errors.values())
+        summary = {
+            'requests': count,
+            'elapsed_seconds': elapsed,
+            'throughput_rps': (count - failed) / elapsed if elapsed else 0.0,
+            'error_rate': failed / count if count else 0.0,
+            'errors': dict(self.errors),
+            'model_versions': sorted(self.model_versions),
+        }
+        if offered is not None:
+            summary['offered_rps'] = offered
+        if count:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary['latency_ms'] = {
+                'mean': float(latencies.mean()), 'p50': float(p50), 'p95': float(p95),
+                'p99': float(p99), 'max': float(latencies.max()),
+            }
+        return summary
+
+
+def send(target, scores, recorder, started):
+    try:
+        status, body = target.post(scores)
+    except Exception as e:
+        recorder.record(time.perf_counter() - started, error=type(e).__name__)
+        return
+    latency = time.perf_counter() - started
+    if status != 200:
+        recorder.record(latency, error=f'http_{status}')
+    else:
+        recorder.record(latency, model_version=(body or {}).get('model_version'))
+
+
+def run_closed_loop(target, profiles, concurrency, duration):
+    """concurrency workers send back-to-back requests for duration seconds."""
+    recorder = StepRecorder()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            send(target, profiles[i % len(profiles)], recorder, time.perf_counter())
+            i += concurrency
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.summary(time.perf_counter() - start)
+
+
+def run_open_loop(target, profiles, rate, duration, max_workers):
+    """Start rate requests per second on a fixed schedule for duration seconds.
+
+    Latency counts from the scheduled start, so time spent waiting for a free
+    worker (the service falling behind) shows up in the percentiles.
+    """
+    recorder = StepRecorder()
+    total = int(rate * duration)
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, target, profiles[i % len(profiles)], recorder, scheduled)
+    return recorder.summary(time.perf_counter() - start, offered=rate)
+
+
+def parse_levels(text):
+    return [float(level) if '.' in level else int(level) for level in text.split(',') if level]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the career prediction service")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--concurrency', type=parse_levels, help="Closed-loop worker counts, e.g. 1,4,16")
+    mode.add_argument('--rate', type=parse_levels, help="Open-loop request rates per second, e.g. 50,100,200")
+    parser.add_argument('--url', default=DEFAULT_URL, help="Endpoint of a running service")
+    parser.add_argument('--in-process', choices=('flask', 'asgi'), default=None,
+                        help="Drive the app in this process through its test client instead of --url")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per load level")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds of unmeasured load before the first level")
+    parser.add_argument('--profiles', type=int, default=5000, help="Distinct profiles to cycle through")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-workers', type=int, default=256, help="Threads available to the open-loop mode")
+    parser.add_argument('--label', default=None, help="Free-form name for this run, e.g. the server mode")
+    parser.add_argument('--output', default=None, help="JSON results file (default: models/results/load_test_<time>.json)")
+    args = parser.parse_args()
+
+    levels = args.rate or args.concurrency or [1, 4, 16]
+    open_loop = args.rate is not None
+
+    profiles = generate_profiles(args.profiles, args.seed)
+    target = InProcessTarget(args.in_process) if args.in_process else HttpTarget(args.url)
+
+    started = time.gmtime()
+    if args.warmup > 0:
+        run_closed_loop(target, profiles, min(4, max(int(levels[0]), 1)), args.warmup)
+
+    steps = []
+    for level in levels:
+        if open_loop:
+            summary = run_open_loop(target, profiles, level, args.duration, args.max_workers)
+            summary['rate'] = level
+        else:
+            summary = run_closed_loop(target, profiles, int(level), args.duration)
+            summary['concurrency'] = int(level)
+        steps.append(summary)
+
+        latency = summary.get('latency_ms', {})
+        print(f"{'rate' if open_loop else 'concurrency'}={level}: "
+              f"{summary['throughput_rps']:.1f} req/s, "
+              f"p50={latency.get('p50', 0):.2f}ms p95={latency.get('p95', 0):.2f}ms "
+              f"p99={latency.get('p99', 0):.2f}ms, errors={summary['error_rate']:.2%}")
+
+    results = {
+        'label': args.label,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%SZ', started),
+        'finished': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'target': target.describe(),
+        'mode': 'open-loop' if open_loop else 'closed-loop',
+        'config': {
+            'duration_seconds': args.duration, 'warmup_seconds': args.warmup,
+            'profiles': args.profiles, 'seed': args.seed,
+        },
+        'steps': steps,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test_{time.strftime('%Y%m%d_%H%M%S', started)}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
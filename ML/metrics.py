@@ -0,0 +1,267 @@
+"""Low-overhead counters and latency histograms for the prediction service.
+
+Metrics live in process memory and are rendered on ``/metrics`` in the
+Prometheus text exposition format, so any Prometheus-compatible scraper can
+collect them without an extra client library. Recording a value is a bisect
+into a short bucket list plus an increment under a lock, a few hundred
+nanoseconds, which is cheap enough to keep on in production.
+
+Requests are timed stage by stage with a ``StageTimer``: each ``lap(stage)``
+records the time since the previous lap into the stage histogram. Set
+METRICS=0 to hand out a no-op timer and skip recording entirely.
+
+Metrics are per process; with several uvicorn workers each one reports its own.
+"""
+import bisect
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency buckets, from 25 microseconds to 10 seconds
+LATENCY_BUCKETS = (
+    0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Upper bounds of the batch size buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 10000)
+
+# Content type of the text exposition format served on /metrics
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+METRICS_ENABLED = os.environ.get('METRICS', '1') != '0'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield self.name, list(zip(self.labelnames, labelvalues)), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down, set directly."""
+
+    kind = 'gauge'
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds, optionally split by label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label tuple: [bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labelvalues):
+        """Return (bucket counts, sum, count) for one label combination."""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                return [0] * (len(self.buckets) + 1), 0.0, 0
+            return list(series[0]), series[1], series[2]
+
+    def quantile(self, q, *labelvalues):
+        """Estimate the q-quantile from the buckets (upper bound of the bucket it falls in)."""
+        counts, _, count = self.snapshot(*labelvalues)
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(value[0]), value[1], value[2])) for key, value in self._series.items())
+        for labelvalues, (counts, total, count) in series:
+            labels = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket', labels + [('le', _format_value(bound))], cumulative
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, count
+
+
+class Metrics:
+    """A named set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Times consecutive stages of one request; lap(stage) records the time since the last lap."""
+
+    __slots__ = ('histogram', 'start', 'last')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, stage)
+        self.last = now
+
+    def skip(self):
+        """Restart the lap clock without recording, e.g. after waiting in a queue."""
+        self.last = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class NullTimer:
+    """Stand-in for StageTimer when metrics are disabled."""
+
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def skip(self):
+        pass
+
+    def elapsed(self):
+        return 0.0
+
+
+NULL_TIMER = NullTimer()
+
+
+# --- Prediction service metrics ---
+
+METRICS = Metrics()
+
+REQUESTS = METRICS.counter(
+    'career_requests_total', "Requests handled, by endpoint and HTTP status", ('endpoint', 'status'))
+ERRORS = METRICS.counter(
+    'career_errors_total', "Failed requests, by endpoint and error type", ('endpoint', 'type'))
+REQUEST_LATENCY = METRICS.histogram(
+    'career_request_duration_seconds', "End-to-end handler latency", ('endpoint',))
+STAGE_LATENCY = METRICS.histogram(
+    'career_stage_duration_seconds',
+    "Latency of each prediction stage: parse, features, scale, predict_proba, top_n, decode, explain", ('stage',))
+BATCH_SIZE = METRICS.histogram(
+    'career_batch_size', "Profiles scored per model call, by source", ('source',), buckets=BATCH_SIZE_BUCKETS)
+MODEL_INFO = METRICS.gauge(
+    'career_model_info', "Version of the model currently serving (value is always 1)", ('version',))
+
+
+def stage_timer():
+    """A new StageTimer for the prediction stages, or the no-op timer when metrics are off."""
+    return StageTimer(STAGE_LATENCY) if METRICS_ENABLED else NULL_TIMER
+
+
+def record_request(endpoint, status, elapsed, error=None):
+    """Count one finished request and its latency; error is the exception or error type name."""
+    if not METRICS_ENABLED:
+        return
+    REQUESTS.inc(endpoint, str(status))
+    REQUEST_LATENCY.observe(elapsed, endpoint)
+    if error is not None:
+        ERRORS.inc(endpoint, error if isinstance(error, str) else type(error).__name__)
+
+
+def record_batch(source, size):
+    if METRICS_ENABLED:
+        BATCH_SIZE.observe(size, source)
+
+
+def render(model_version=None):
+    """Render the service metrics, refreshing the model version gauge first."""
+    MODEL_INFO.clear()
+    if model_version is not None:
+        MODEL_INFO.set(1, model_version)
+    return METRICS.render()
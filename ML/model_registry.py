@@ -0,0 +1,265 @@
+"""Versioned model registry with background hot reload and instant rollback.
+
+The registry owns the ``Predictor`` that serves requests. New versions are
+loaded on a background thread, warmed with a few predictions and then swapped
+in by replacing a single reference, so requests that already picked up the old
+predictor finish on it undisturbed. The previous predictor stays loaded, which
+makes a rollback a reference swap with no reload.
+
+New versions come from either an admin call (``reload``) or a watcher thread
+that polls a models directory for ``*.model`` artifact directories and
+``*.pkl`` pipelines and loads the newest one when it changes. An artifact
+directory exported from a pickle in the same directory is skipped unless
+``MODEL_ENGINE=compiled`` asks for the engine it is served with.
+"""
+import hmac
+import os
+import threading
+import time
+
+import numpy as np
+
+from inference import DIRECT_SCORE_FEATURES
+from model_store import (ARTIFACT_SUFFIX, artifact_preferred, artifact_version, is_artifact_dir, is_lfs_pointer,
+                         read_manifest, resolve_model_path)
+from predictor import Predictor, load_pipeline
+
+# Profiles scored right after loading so the first real request does not pay for cold caches
+WARMUP_ROWS = 32
+
+# A file in the models directory must be unchanged this long before it is picked up
+SETTLE_SECONDS = 2.0
+
+# Number of load/swap events kept for the status report
+HISTORY_LENGTH = 20
+
+
+class ModelRegistry:
+    """Holds the active and previous predictors and swaps between them atomically."""
+
+    def __init__(self, models_dir=None, poll_interval=0.0, predictor_factory=Predictor):
+        self.models_dir = models_dir
+        self.poll_interval = poll_interval
+        self.predictor_factory = predictor_factory
+
+        self._active = None
+        self._previous = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loading = None
+        self._failed = {}
+        self._history = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+        """The predictor new requests should use; read once per request."""
+        return self._active
+
+    @property
+    def previous(self):
+        return self._previous
+
+    # --- Discovery ---
+
+    def candidates(self):
+        """Model artifacts in the models directory as (mtime, path), newest last."""
+        if not self.models_dir or not os.path.isdir(self.models_dir):
+            return []
+        found = []
+        for name in os.listdir(self.models_dir):
+            path = os.path.join(self.models_dir, name)
+            if name.startswith('.'):
+                continue
+            if name.endswith(ARTIFACT_SUFFIX) and is_artifact_dir(path):
+                found.append((os.path.getmtime(os.path.join(path, 'manifest.json')), path))
+            elif name.endswith('.pkl') and os.path.isfile(path) and not is_lfs_pointer(path):
+                found.append((os.path.getmtime(path), path))
+        if not artifact_preferred():
+            pickles = {os.path.basename(path) for _, path in found if path.endswith('.pkl')}
+            found = [(mtime, path) for mtime, path in found
+                     if not path.endswith(ARTIFACT_SUFFIX) or artifact_source(path) not in pickles]
+        return sorted(found)
+
+    def newest_candidate(self):
+        """Path of the most recently written artifact that has settled, or None."""
+        settled = [path for mtime, path in self.candidates() if time.time() - mtime >= SETTLE_SECONDS]
+        return settled[-1] if settled else None
+
+    def initial_path(self):
+        """Artifact to serve at start-up: the newest in the models directory, else the default model."""
+        candidates = self.candidates()
+        return candidates[-1][1] if candidates else resolve_model_path()
+
+    # --- Loading and swapping ---
+
+    def _record(self, event, **details):
+        self._history.append({'event': event, 'time': time.time(), **details})
+        del self._history[:-HISTORY_LENGTH]
+
+    def load(self, path):
+        """Load, warm and return a Predictor for path without activating it."""
+        pipeline = load_pipeline(path)
+        if pipeline is None:
+            raise RuntimeError(f"Could not load model from {path}")
+        predictor = self.predictor_factory(pipeline, version=artifact_version(path), path=path)
+        warm_up(predictor)
+        return predictor
+
+    def activate(self, predictor):
+        """Make predictor the active version; the old active one becomes the rollback target."""
+        with self._lock:
+            self._previous, self._active = self._active, predictor
+            self._record('activate', version=predictor.version, path=predictor.path)
+
+    def load_and_activate(self, path):
+        """Load path and swap it in, unless it is already the active version."""
+        with self._load_lock:
+            version = artifact_version(path)
+            if self._active is not None and self._active.version == version:
+                return self._active
+            self._loading = path
+            try:
+                predictor = self.load(path)
+            except Exception as e:
+                self._failed[path] = version
+                self._record('load_failed', version=version, path=path, error=str(e))
+                raise
+            finally:
+                self._loading = None
+            self._failed.pop(path, None)
+            self.activate(predictor)
+            return predictor
+
+    def resolve_name(self, name):
+        """Path of the artifact called name inside the models directory.
+
+        Admin callers pick versions by name only, so they cannot make the
+        service unpickle files from arbitrary locations.
+        """
+        if not self.models_dir:
+            raise ValueError("No models directory is configured (set MODEL_DIR)")
+        path = os.path.join(self.models_dir, os.path.basename(name))
+        if not os.path.exists(path):
+            raise ValueError(f"No model artifact named {name!r} in {self.models_dir}")
+        return path
+
+    def reload(self, path=None, background=True):
+        """Load path (default: the newest artifact in the models directory) and swap it in.
+
+        With background=True the load runs on a separate thread and this returns
+        immediately; the outcome shows up in status().
+        """
+        path = path or self.newest_candidate() or resolve_model_path()
+        if not background:
+            return self.load_and_activate(path)
+        thread = threading.Thread(target=self._reload_quietly, args=(path,), name='model-reload', daemon=True)
+        thread.start()
+        return None
+
+    def _reload_quietly(self, path):
+        try:
+            self.load_and_activate(path)
+        except Exception as e:
+            print(f"Error loading model version from {path}: {e}")
+
+    def rollback(self):
+        """Swap the previous version back in; no loading is involved."""
+        with self._lock:
+            if self._previous is None:
+                raise RuntimeError("No previous model version to roll back to")
+            self._active, self._previous = self._previous, self._active
+            self._record('rollback', version=self._active.version, path=self._active.path)
+            return self._active
+
+    # --- Watching ---
+
+    def start_watching(self):
+        """Poll the models directory every poll_interval seconds for new versions."""
+        if self._watcher is not None or not self.models_dir or self.poll_interval <= 0:
+            return
+        self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            path = self.newest_candidate()
+            if path is None:
+                continue
+            try:
+                version = artifact_version(path)
+            except OSError:
+                continue
+            known = {p.version for p in (self._active, self._previous) if p is not None}
+            if version in known or self._failed.get(path) == version:
+                continue
+            self._reload_quietly(path)
+
+    def status(self):
+        def describe(predictor):
+            if predictor is None:
+                return None
+            return {
+                'version': predictor.version,
+                'path': predictor.path,
+                'loaded_at': predictor.loaded_at,
+                'engine': predictor.engine,
+                'inference_mode': predictor.inference_mode,
+            }
+
+        return {
+            'active': describe(self._active),
+            'previous': describe(self._previous),
+            'loading': self._loading,
+            'models_dir': self.models_dir,
+            'watching': self._watcher is not None,
+            'history': list(self._history),
+        }
+
+
+def artifact_source(path):
+    """File name of the pickle an artifact directory was exported from, or None."""
+    try:
+        source = read_manifest(path).get('source')
+    except (OSError, ValueError):
+        return None
+    return os.path.basename(source) if source else None
+
+
+def warm_up(predictor, rows=WARMUP_ROWS):
+    """Score a few synthetic profiles so code paths and mapped pages are hot."""
+    scores = np.random.default_rng(0).uniform(1, 100, size=(rows, len(DIRECT_SCORE_FEATURES)))
+    predictor.predict_top_n(predictor.scale_score_matrix(scores))
+    predictor.predict_score_rows([dict(zip(DIRECT_SCORE_FEATURES, scores[0]))])
+
+
+def registry_from_env():
+    """Build the registry and load the initial version.
+
+    MODEL_DIR is the directory watched for new versions, MODEL_WATCH_INTERVAL
+    the polling period in seconds (0 disables watching). Without MODEL_DIR the
+    single default model is served and only admin reloads change it.
+    """
+    registry = ModelRegistry(
+        models_dir=os.environ.get('MODEL_DIR'),
+        poll_interval=float(os.environ.get('MODEL_WATCH_INTERVAL', '0')),
+    )
+    try:
+        registry.load_and_activate(registry.initial_path())
+    except Exception as e:
+        print(f"Serving without a model: {e}")
+    registry.start_watching()
+    return registry
+
+
+def admin_allowed(token):
+    """True if token matches ADMIN_TOKEN; admin endpoints are disabled while it is unset."""
+    expected = os.environ.get('ADMIN_TOKEN')
+    return bool(expected) and hmac.compare_digest(expected, token or '')
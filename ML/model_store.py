@@ -0,0 +1,371 @@
+"""Memory-mappable on-disk format for the career model pipeline.
+
+``export_pipeline`` writes a pickled ``{model, scaler, encoder, feature_names}``
+pipeline into a directory of uncompressed ``.npy`` arrays plus a versioned
+``manifest.json``::
+
+    career_model_pipeline.model/
+        manifest.json           format version, model parameters, array index
+        scaler_mean.npy         StandardScaler statistics
+        scaler_scale.npy
+        encoder_classes.npy     career names, fixed-width unicode
+        model_*.npy             flattened tree arrays from tree_engine.py
+
+``load_model_artifact`` opens such a directory with ``np.load(mmap_mode='r')``,
+so loading is near-instant and every worker process on a host maps the same
+physical pages. It also still loads plain pickles, which is what code that
+needs the original estimator (e.g. SHAP) asks for.
+
+An artifact directory can only be served by the compiled tree engine, so the
+services only pick it over its pickle when ``MODEL_ENGINE=compiled`` is set.
+
+Usage:
+    python model_store.py export --model career_model_pipeline.pkl
+    python model_store.py info career_model_pipeline.model
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from tree_engine import ENGINE_COMPILED, CompiledTreeEnsemble, compile_model
+
+# Name and version of the on-disk layout; bump the major version on breaking changes
+ARTIFACT_FORMAT = 'career-model-mmap'
+ARTIFACT_FORMAT_VERSION = 1
+
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_SUFFIX = '.model'
+
+# Base name of the model artifact, matched case-insensitively
+MODEL_BASENAME = 'career_model_pipeline'
+
+# Directories searched for the model artifact, in order
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_SEARCH_DIRS = [ML_DIR, os.path.join(ML_DIR, '..', 'models')]
+
+# Tree arrays stored for a compiled ensemble
+MODEL_ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots')
+
+
+class ArrayScaler:
+    """StandardScaler replacement backed by (possibly memory-mapped) arrays."""
+
+    def __init__(self, mean, scale, with_mean=True, with_std=True, feature_names=None):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.with_mean = with_mean
+        self.with_std = with_std
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(scale if scale is not None else mean)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if self.with_mean and self.mean_ is not None:
+            X -= self.mean_
+        if self.with_std and self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+class ArrayLabelEncoder:
+    """LabelEncoder replacement over a sorted array of class names."""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def transform(self, y):
+        y = np.asarray(y)
+        indices = np.searchsorted(self.classes_, y)
+        indices = np.clip(indices, 0, len(self.classes_) - 1)
+        if not np.all(self.classes_[indices] == y):
+            raise ValueError("y contains previously unseen labels")
+        return indices
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y, dtype=np.intp)]
+
+
+def is_lfs_pointer(path):
+    """True if path is a Git LFS pointer file rather than the real artifact."""
+    with open(path, 'rb') as f:
+        return f.read(40).startswith(b'version https://git-lfs')
+
+
+def artifact_preferred():
+    """True when memory-mapped artifact directories are served in place of pickles."""
+    # The artifact only holds the compiled ensemble, so it is only picked for that engine
+    return os.environ.get('MODEL_ENGINE') == ENGINE_COMPILED
+
+
+def resolve_model_path(path=None):
+    """Find the model artifact to load.
+
+    An explicit path or CAREER_MODEL_PATH wins. Otherwise the search directories
+    are scanned for ``career_model_pipeline.pkl`` and then
+    ``career_model_pipeline.model`` (memory-mappable; searched first with
+    ``MODEL_ENGINE=compiled``), ignoring case, so ``Career_model_pipeline.pkl``
+    and ``career_model_pipeline.pkl`` both resolve. Returns the path of the
+    expected pickle when nothing is found, so error messages stay meaningful.
+    """
+    path = path or os.environ.get('CAREER_MODEL_PATH')
+    if path:
+        return path
+
+    suffixes = (ARTIFACT_SUFFIX, '.pkl') if artifact_preferred() else ('.pkl', ARTIFACT_SUFFIX)
+    for suffix in suffixes:
+        wanted = (MODEL_BASENAME + suffix).lower()
+        for directory in MODEL_SEARCH_DIRS:
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.lower() == wanted:
+                    return os.path.normpath(os.path.join(directory, name))
+    return os.path.join(ML_DIR, MODEL_BASENAME + '.pkl')
+
+
+def is_artifact_dir(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact format version {manifest.get('format_version')} "
+            f"(this loader reads version {ARTIFACT_FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def export_pipeline(pipeline, output_path, source=None):
+    """Write pipeline into a memory-mappable artifact directory at output_path.
+
+    The artifact is assembled in a hidden directory next to output_path, and
+    output_path is a symlink that is switched to it with one atomic rename, so
+    readers always find either the previous export or the complete new one.
+    """
+    scaler = pipeline['scaler']
+    encoder = pipeline['encoder']
+    compiled = compile_model(pipeline['model'])
+    feature_names = pipeline.get('feature_names')
+    if feature_names is None:
+        feature_names = getattr(scaler, 'feature_names_in_', [])
+    feature_names = [str(name) for name in feature_names]
+
+    arrays = {
+        'encoder_classes': np.asarray(encoder.classes_),
+        'model_classes': np.asarray(compiled.classes_),
+    }
+    with_mean = bool(getattr(scaler, 'with_mean', True)) and getattr(scaler, 'mean_', None) is not None
+    with_std = bool(getattr(scaler, 'with_std', True)) and getattr(scaler, 'scale_', None) is not None
+    if with_mean:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+    if with_std:
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+    for name in MODEL_ARRAYS:
+        arrays['model_' + name] = np.ascontiguousarray(getattr(compiled, name))
+    if compiled.aggregation == 'sum':
+        arrays['model_tree_class'] = np.asarray(compiled.tree_class, dtype=np.int32)
+        arrays['model_base_margin'] = np.asarray(compiled.base_margin, dtype=np.float64)
+
+    output_path = os.path.abspath(output_path)
+    parent = os.path.dirname(output_path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=_version_prefix(output_path), dir=parent)
+    try:
+        digest = hashlib.sha1()
+        index = {}
+        for name, array in arrays.items():
+            if array.dtype == object:
+                array = array.astype(str)
+            np.save(os.path.join(staging, name + '.npy'), array, allow_pickle=False)
+            digest.update(name.encode())
+            digest.update(array.tobytes())
+            index[name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'artifact_id': digest.hexdigest()[:12],
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'source': source,
+            'source_model_type': type(pipeline['model']).__name__,
+            'feature_names': feature_names,
+            'scaler': {'with_mean': with_mean, 'with_std': with_std},
+            'model': {
+                'aggregation': compiled.aggregation,
+                'link': compiled.link,
+                'input_dtype': compiled.input_dtype.str,
+                'strict_less': compiled.strict_less,
+                'max_depth': compiled.max_depth,
+                'n_trees': compiled.n_trees,
+                'n_nodes': compiled.n_nodes,
+            },
+            'arrays': index,
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        _publish(staging, output_path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _version_prefix(output_path):
+    # Hidden, so the registry's directory scan skips the versions behind the symlink
+    return '.' + os.path.basename(output_path) + '.'
+
+
+def _publish(version_dir, output_path):
+    """Atomically point the output_path symlink at version_dir and remove versions no longer needed."""
+    parent = os.path.dirname(output_path)
+    previous = None
+    if os.path.islink(output_path):
+        previous = os.path.join(parent, os.readlink(output_path))
+    elif os.path.isdir(output_path):
+        # A plain directory from before exports were symlinked: moved aside once, then
+        # replaced by the symlink (the only export with a moment without an artifact)
+        previous = tempfile.mkdtemp(prefix=_version_prefix(output_path), dir=parent)
+        os.rmdir(previous)
+        os.replace(output_path, previous)
+
+    link = os.path.join(parent, f'.{os.path.basename(output_path)}.link-{os.getpid()}')
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, output_path)
+
+    # The version just replaced is kept, since a reader may have resolved the link a moment
+    # ago and still be opening its arrays; older ones go
+    keep = {os.path.abspath(version_dir), os.path.abspath(previous) if previous else None}
+    prefix = _version_prefix(output_path)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        stale = (name.startswith(prefix) and os.path.isdir(path) and not os.path.islink(path)
+                 and os.path.abspath(path) not in keep)
+        if stale:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_artifact_dir(path, mmap=True):
+    """Open an exported artifact directory as a pipeline dict backed by memory-mapped arrays."""
+    manifest = read_manifest(path)
+    mode = 'r' if mmap else None
+
+    def array(name):
+        if name not in manifest['arrays']:
+            return None
+        return np.load(os.path.join(path, name + '.npy'), mmap_mode=mode, allow_pickle=False)
+
+    model_params = manifest['model']
+    model = CompiledTreeEnsemble(
+        **{name: array('model_' + name) for name in MODEL_ARRAYS},
+        classes=array('model_classes'),
+        max_depth=model_params['max_depth'],
+        aggregation=model_params['aggregation'],
+        input_dtype=model_params['input_dtype'],
+        strict_less=model_params['strict_less'],
+        tree_class=array('model_tree_class'),
+        base_margin=array('model_base_margin'),
+        link=model_params['link'],
+    )
+    scaler = ArrayScaler(
+        array('scaler_mean'), array('scaler_scale'),
+        with_mean=manifest['scaler']['with_mean'], with_std=manifest['scaler']['with_std'],
+        feature_names=manifest['feature_names'] or None,
+    )
+    return {
+        'model': model,
+        'scaler': scaler,
+        'encoder': ArrayLabelEncoder(array('encoder_classes')),
+        'feature_names': manifest['feature_names'],
+        'manifest': manifest,
+    }
+
+
+def load_model_artifact(path=None, prefer_pickle=False):
+    """Load the model pipeline from an artifact directory or a pickle.
+
+    With prefer_pickle, a pickle next to a resolved artifact directory is used
+    instead, for callers that need the original estimator object.
+    """
+    path = resolve_model_path(path)
+    if prefer_pickle and is_artifact_dir(path):
+        manifest = read_manifest(path)
+        if manifest.get('source') and os.path.isfile(manifest['source']):
+            path = manifest['source']
+    if is_artifact_dir(path):
+        return load_artifact_dir(path)
+    if os.path.isfile(path) and is_lfs_pointer(path):
+        raise ValueError(f"{path} is a Git LFS pointer, not a model; run 'git lfs pull'")
+
+    import joblib
+    return joblib.load(path)
+
+
+def artifact_version(path):
+    """Stable identifier of a model artifact.
+
+    Exported directories carry a content hash in their manifest; for pickles the
+    path, size and modification time are hashed instead.
+    """
+    if is_artifact_dir(path):
+        return read_manifest(path)['artifact_id']
+    stat = os.stat(path)
+    digest = hashlib.sha1(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and inspect memory-mappable model artifacts")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Convert a pickled pipeline into an artifact directory")
+    export_parser.add_argument('--model', default=None, help="Pickled pipeline (default: resolved automatically)")
+    export_parser.add_argument('--output', default=None,
+                               help="Artifact directory (default: next to the pickle, with a .model suffix)")
+
+    info_parser = subparsers.add_parser('info', help="Print the manifest of an artifact directory")
+    info_parser.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(read_manifest(args.path), indent=2))
+        return
+
+    import joblib
+    source = resolve_model_path(args.model)
+    if is_artifact_dir(source):
+        parser.error(f"{source} is already an exported artifact")
+    output = args.output or os.path.join(os.path.dirname(source), MODEL_BASENAME + ARTIFACT_SUFFIX)
+
+    start = time.perf_counter()
+    pipeline = joblib.load(source)
+    load_seconds = time.perf_counter() - start
+
+    manifest = export_pipeline(pipeline, output, source=os.path.abspath(source))
+
+    start = time.perf_counter()
+    load_artifact_dir(output)
+    mmap_seconds = time.perf_counter() - start
+
+    print(f"Exported {source} -> {output} (artifact {manifest['artifact_id']}, "
+          f"{manifest['model']['n_trees']} trees, {manifest['model']['n_nodes']} nodes)")
+    print(f"Pickle load: {load_seconds:.3f}s, memory-mapped load: {mmap_seconds:.4f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""In-process cache of /predict results keyed on canonical score vectors.
+
+Keys are built from the DIRECT_SCORE_FEATURES vector, optionally rounded to a
+quantum so near-identical profiles share an entry, plus the requested top_n.
+When quantization is on the prediction is computed from the rounded vector,
+so a cached answer never depends on which profile happened to arrive first.
+
+Entries are keyed by the version of the model that produced them as well, so
+a result is never served for another version. When a version the cache has not
+seen before asks (a newly swapped-in model), the entries of earlier versions
+are dropped. Requests still in flight on an older predictor after a hot swap,
+or after a rollback to it, look up and store entries under their own version
+without clearing anyone else's; entries nobody asks for age out of the LRU.
+Only the KNOWN_VERSIONS most recently used versions are remembered, which
+covers the registry's active and previous predictors.
+"""
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from inference import DIRECT_SCORE_FEATURES, numeric_score
+
+# Model versions remembered as seen; the least recently used is forgotten and counts as new again
+KNOWN_VERSIONS = 4
+
+
+class PredictionCache:
+    """Bounded LRU cache with a time-to-live and model-version invalidation."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600.0, quantum=0.0):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.quantum = float(quantum)
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._model_version = None
+        self._versions = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def canonical_scores(self, scores):
+        """Return (key_vector, canonical score dict) or (None, scores) if scores are not numeric."""
+        try:
+            vector = np.array([numeric_score(scores.get(feature, 0)) for feature in DIRECT_SCORE_FEATURES])
+        except (AttributeError, TypeError, ValueError):
+            return None, scores
+        if self.quantum > 0:
+            vector = np.round(vector / self.quantum) * self.quantum
+        # Adding 0.0 folds -0.0 into 0.0 so both hash the same
+        vector += 0.0
+        return vector, dict(zip(DIRECT_SCORE_FEATURES, vector.tolist()))
+
+    @staticmethod
+    def make_key(vector, top_n):
+        return vector.tobytes(), top_n
+
+    def _bind(self, model_version):
+        """Drop the entries of earlier versions the first time model_version is seen."""
+        # Called with the lock held
+        if model_version in self._versions:
+            self._versions.move_to_end(model_version)
+            return
+        self._versions[model_version] = None
+        while len(self._versions) > KNOWN_VERSIONS:
+            self._versions.popitem(last=False)
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._model_version = model_version
+
+    def get(self, key, model_version):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            self._bind(model_version)
+            key = (model_version, key)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, model_version):
+        """Store value for key, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._bind(model_version)
+            key = (model_version, key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, scores, top_n, model_version, compute, version_of=None):
+        """Return the cached result for scores, calling compute(canonical_scores) on a miss.
+
+        version_of(value), when given, names the model version that actually
+        produced a computed value, which may differ from model_version if the
+        model was swapped while it was being computed.
+        """
+        vector, canonical = self.canonical_scores(scores)
+        if vector is None:
+            return compute(scores)
+        key = self.make_key(vector, top_n)
+        value = self.get(key, model_version)
+        if value is None:
+            value = compute(canonical)
+            self.put(key, value, version_of(value) if version_of else model_version)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'config': {
+                    'max_entries': self.max_entries,
+                    'ttl_seconds': self.ttl,
+                    'quantum': self.quantum,
+                },
+                'size': len(self._entries),
+                'model_version': self._model_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+def cache_from_env(prefix='PREDICTION_CACHE', default_size=10000):
+    """Build a PredictionCache from the environment, or return None when it is disabled.
+
+    PREDICTION_CACHE_SIZE=0 disables the cache; PREDICTION_CACHE_TTL sets the entry
+    lifetime in seconds and PREDICTION_CACHE_QUANTUM the rounding step of the key
+    (0 keeps exact keys). Other caches read the same settings under their own prefix.
+    """
+    max_entries = int(os.environ.get(f'{prefix}_SIZE', str(default_size)))
+    if max_entries <= 0:
+        return None
+    return PredictionCache(
+        max_entries=max_entries,
+        ttl_seconds=float(os.environ.get(f'{prefix}_TTL', '3600')),
+        quantum=float(os.environ.get(f'{prefix}_QUANTUM', '0')),
+    )
@@ -0,0 +1,163 @@
+"""Model loading and prediction core shared by the Flask and ASGI services.
+
+A ``Predictor`` wraps one loaded ``{model, scaler, encoder}`` pipeline together
+with the compiled inference plan and the model engine chosen for it, so both
+servers build features, scale, score and decode in exactly the same way.
+"""
+import os
+import time
+
+import numpy as np
+
+from inference import (
+    INFERENCE_MODE_FAST, INFERENCE_MODE_PANDAS, INFERENCE_MODES,
+    InferencePlan, build_feature_frame, build_feature_frame_from_matrix,
+)
+from metrics import NULL_TIMER
+from model_store import artifact_version, load_model_artifact, resolve_model_path
+from tree_engine import ENGINE_NATIVE, ENGINES, select_model
+
+# How the scaled model input is built: 'fast' uses the compiled InferencePlan,
+# 'pandas' keeps the original DataFrame path as a reference
+INFERENCE_MODE = os.environ.get('INFERENCE_MODE', INFERENCE_MODE_FAST)
+if INFERENCE_MODE not in INFERENCE_MODES:
+    raise ValueError(f"INFERENCE_MODE must be one of {INFERENCE_MODES}, got {INFERENCE_MODE!r}")
+
+# Which engine evaluates the model: 'native' calls the library's predict_proba,
+# 'compiled' uses the flattened NumPy tree engine from tree_engine.py; it is never picked
+# automatically, check with tree_engine.py --benchmark that it is faster for the model first
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', ENGINE_NATIVE)
+if MODEL_ENGINE not in ENGINES:
+    raise ValueError(f"MODEL_ENGINE must be one of {ENGINES}, got {MODEL_ENGINE!r}")
+
+# Number of careers returned per profile when the request does not ask for a specific count
+DEFAULT_TOP_N = 5
+
+# Upper bound on the number of profiles accepted by a batch prediction in a single call
+MAX_BATCH_SIZE = 10000
+
+
+class Predictor:
+    """A loaded pipeline with its inference plan and model engine resolved once."""
+
+    def __init__(self, pipeline, inference_mode=INFERENCE_MODE, engine=MODEL_ENGINE, version=None,
+                 path=None):
+        self.pipeline = pipeline
+        # Identifies the model artifact; reported in responses, and caches drop their entries when it changes
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+        self.scaler = pipeline['scaler']
+        self.encoder = pipeline['encoder']
+        self.n_classes = len(self.encoder.classes_)
+
+        # Compile the fast path up front so the first request does not pay for it
+        self.inference_mode = inference_mode
+        self.plan = None
+        if inference_mode == INFERENCE_MODE_FAST:
+            try:
+                self.plan = InferencePlan(self.scaler)
+            except (TypeError, ValueError) as e:
+                print(f"Could not compile inference plan, using the pandas path: {e}")
+                self.inference_mode = INFERENCE_MODE_PANDAS
+
+        # Compile the tree ensemble when the compiled engine is requested
+        self.engine = engine
+        try:
+            self.model = select_model(pipeline['model'], engine)
+        except TypeError as e:
+            print(f"Could not compile model, using the native engine: {e}")
+            self.engine = ENGINE_NATIVE
+            self.model = pipeline['model']
+
+    def scale_score_rows(self, score_rows, timer=NULL_TIMER):
+        """Build and scale the model input for a list of score dicts.
+
+        timer.lap() marks the end of the 'features' and 'scale' stages.
+        """
+        if self.plan is None:
+            input_df = build_feature_frame(score_rows)
+            timer.lap('features')
+            input_scaled = self.scaler.transform(input_df)
+        else:
+            if len(score_rows) == 1:
+                X = self.plan.features_scores(score_rows[0])
+            else:
+                X = self.plan.features_rows(score_rows)
+            timer.lap('features')
+            input_scaled = self.plan.scale(X)
+        timer.lap('scale')
+        return input_scaled
+
+    def scale_score_matrix(self, matrix, timer=NULL_TIMER):
+        """Build and scale the model input for rows ordered as DIRECT_SCORE_FEATURES."""
+        if self.plan is None:
+            input_df = build_feature_frame_from_matrix(matrix)
+            timer.lap('features')
+            input_scaled = self.scaler.transform(input_df)
+        else:
+            X = self.plan.features_matrix(matrix)
+            timer.lap('features')
+            input_scaled = self.plan.scale(X)
+        timer.lap('scale')
+        return input_scaled
+
+    def predict_top_n(self, input_scaled, top_n=DEFAULT_TOP_N, timer=NULL_TIMER):
+        """Score every row of the scaled input in one pass and return the top N careers per row.
+
+        Returns a tuple of (careers, probabilities), both arrays of shape (n_rows, top_n).
+        timer.lap() marks the end of the 'predict_proba', 'top_n' and 'decode' stages.
+        """
+        top_n_indices, top_n_probabilities = self.top_n_indices(input_scaled, top_n, timer)
+
+        # Decode every selected label with a single call to the encoder
+        predicted_careers = self.encoder.inverse_transform(top_n_indices.ravel())
+        timer.lap('decode')
+        return predicted_careers.reshape(top_n_indices.shape), top_n_probabilities
+
+    def top_n_indices(self, input_scaled, top_n=DEFAULT_TOP_N, timer=NULL_TIMER):
+        """Return (class indices, probabilities) of the top N careers per row, best first."""
+        probabilities = self.model.predict_proba(input_scaled)
+        timer.lap('predict_proba')
+
+        # Get the indices of the top N probabilities for each row
+        top_n_indices = np.argsort(probabilities, axis=1)[:, -top_n:][:, ::-1]
+        top_n_probabilities = np.take_along_axis(probabilities, top_n_indices, axis=1)
+        timer.lap('top_n')
+        return top_n_indices, top_n_probabilities
+
+    def predict_score_rows(self, score_rows, top_n=DEFAULT_TOP_N, timer=NULL_TIMER):
+        """Scale and score a list of score dicts."""
+        return self.predict_top_n(self.scale_score_rows(score_rows, timer), top_n, timer)
+
+    def clamp_top_n(self, top_n):
+        """Validate a requested top_n and limit it to the number of known careers."""
+        if isinstance(top_n, bool) or not isinstance(top_n, int) or top_n < 1:
+            raise ValueError("top_n must be a positive integer")
+        return min(top_n, self.n_classes)
+
+
+def load_pipeline(path):
+    """Load the pipeline artifact at path, printing the outcome like the original service did."""
+    try:
+        pipeline = load_model_artifact(path)
+        print(f"Successfully loaded model pipeline from {path}.")
+        return pipeline
+    except FileNotFoundError:
+        print(f"Error: Model file not found at {path}")
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        print("Ensure you have the correct versions of joblib, scikit-learn, and lightgbm installed.")
+    return None
+
+
+def load_predictor(path=None):
+    """Load the model artifact and wrap it in a Predictor, or return None on failure.
+
+    Without a path the artifact is found by model_store.resolve_model_path.
+    """
+    path = resolve_model_path(path)
+    pipeline = load_pipeline(path)
+    if pipeline is None:
+        return None
+    return Predictor(pipeline, version=artifact_version(path), path=path)
@@ -1,15 +1,16 @@
-import joblib
 import os
-import sklearn
-import lightgbm
 import requests
 import json
+from importlib.metadata import version
 
-model_path = "Career_model_pipeline.pkl"
+from model_store import load_model_artifact, resolve_model_path
+
+# Finds career_model_pipeline.model or .pkl regardless of filename case
+model_path = resolve_model_path()
 
 try:
-    # Use joblib.load() to load the model saved with joblib.dump()
-    pipeline = joblib.load(model_path)
+    # Loads a memory-mapped artifact directory or a pickle saved with joblib.dump()
+    pipeline = load_model_artifact(model_path)
     print(f"Successfully loaded model pipeline from {model_path}")
 
     # You can now access the components like this:
@@ -20,9 +21,10 @@ try:
     print("Model, scaler, and encoder extracted from the pipeline.")
     # You can add code here to use the loaded model for predictions
 
-    print(f"scikit-learn version: {sklearn.__version__}")
-    print(f"joblib version: {joblib.__version__}")
-    print(f"lightgbm version: {lightgbm.__version__}")
+    # Read versions from package metadata instead of importing the libraries
+    print(f"scikit-learn version: {version('scikit-learn')}")
+    print(f"joblib version: {version('joblib')}")
+    print(f"lightgbm version: {version('lightgbm')}")
 
 except FileNotFoundError:
     print(f"Error: Model file not found at {model_path}")
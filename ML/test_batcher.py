@@ -0,0 +1,47 @@
+"""Tests for MicroBatcher error isolation.
+
+Usage:
+    python -m pytest test_batcher.py
+"""
+import numpy as np
+import pytest
+
+from batcher import MicroBatcher
+from inference import DIRECT_SCORE_FEATURES
+
+# Score the fake model refuses, standing in for any row that makes predict_proba raise
+POISON = -1.0
+
+
+def fake_predict_batch(score_rows, top_n):
+    """Return each row's cognition score as its 'career', failing the whole call on a POISON row."""
+    if any(scores['cognition'] == POISON for scores in score_rows):
+        raise RuntimeError("model rejected a row")
+    careers = np.array([[scores['cognition']] * top_n for scores in score_rows])
+    probabilities = np.ones((len(score_rows), top_n))
+    return careers, probabilities, 'v1'
+
+
+def profile(cognition):
+    return {feature: 50 for feature in DIRECT_SCORE_FEATURES} | {'cognition': cognition}
+
+
+@pytest.fixture
+def batcher():
+    # A long fixed wait window makes every request below land in the same batch
+    batcher = MicroBatcher(fake_predict_batch, max_batch_size=8, max_wait_ms=200, adaptive=False)
+    yield batcher
+    batcher.close()
+
+
+@pytest.mark.parametrize('bad_scores, error', [
+    (profile('not a number'), ValueError),
+    (profile(POISON), RuntimeError),
+])
+def test_malformed_request_fails_only_its_own_future(batcher, bad_scores, error):
+    futures = [batcher.submit(profile(10), 1), batcher.submit(bad_scores, 1), batcher.submit(profile(30), 1)]
+
+    assert futures[0].result(timeout=5)[0].tolist() == [10.0]
+    with pytest.raises(error):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5)[0].tolist() == [30.0]
@@ -0,0 +1,74 @@
+"""Tests for the counterfactual search's time budget.
+
+Usage:
+    python -m pytest test_counterfactual.py
+"""
+import time
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from counterfactual import find_counterfactual
+from inference import DIRECT_SCORE_FEATURES, EXPECTED_FEATURES_ORDER, build_feature_frame_from_matrix
+from predictor import Predictor
+
+# Time the search may run past its budget, for the Python work after its last model call
+TOLERANCE_MS = 5.0
+
+
+class SlowModel:
+    """Wraps a model so every predict_proba call costs a fixed overhead plus a time per row."""
+
+    def __init__(self, model, call_seconds=0.002, row_seconds=2e-5):
+        self.model = model
+        self.call_seconds = call_seconds
+        self.row_seconds = row_seconds
+        self.classes_ = model.classes_
+
+    def predict_proba(self, X):
+        time.sleep(self.call_seconds + self.row_seconds * len(X))
+        return self.model.predict_proba(X)
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(40, 100, size=(600, len(DIRECT_SCORE_FEATURES)))
+    careers = np.array(['Analyst', 'Artist', 'Engineer', 'Teacher', 'Writer', 'Nurse'])
+    # Careers follow the strongest of a few scores, so reaching another one takes a real change
+    labels = careers[np.argmax(scores[:, :len(careers)], axis=1)]
+    X = build_feature_frame_from_matrix(scores)
+    scaler = StandardScaler().fit(X)
+    encoder = LabelEncoder().fit(labels)
+    model = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0)
+    model.fit(scaler.transform(X), encoder.transform(labels))
+    return {'model': model, 'scaler': scaler, 'encoder': encoder, 'feature_names': EXPECTED_FEATURES_ORDER}
+
+
+@pytest.mark.parametrize('budget_ms', [5, 20, 60])
+def test_search_stays_within_its_budget(pipeline, budget_ms):
+    predictor = Predictor({**pipeline, 'model': SlowModel(pipeline['model'])})
+    profile = {feature: 50.0 for feature in DIRECT_SCORE_FEATURES} | {'cognition': 90.0}
+
+    started = time.perf_counter()
+    result = find_counterfactual(predictor, profile, 'Nurse', top_n=1, time_budget_ms=budget_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+    assert elapsed_ms <= budget_ms + TOLERANCE_MS
+    assert result['elapsed_ms'] <= budget_ms + TOLERANCE_MS
+
+
+def test_result_reports_the_candidates_probabilities(pipeline):
+    predictor = Predictor(pipeline)
+    profile = {feature: 50.0 for feature in DIRECT_SCORE_FEATURES} | {'cognition': 90.0}
+
+    result = find_counterfactual(predictor, profile, 'Nurse', top_n=2, time_budget_ms=200)
+
+    matrix = np.array([[result['counterfactual_scores'][feature] for feature in DIRECT_SCORE_FEATURES]])
+    careers, probabilities = predictor.predict_top_n(predictor.scale_score_matrix(matrix), 2)
+    assert result['reachable']
+    assert 'Nurse' in result['predicted_careers']
+    assert result['predicted_careers'] == careers[0].tolist()
+    np.testing.assert_allclose(result['probabilities'], probabilities[0])
@@ -0,0 +1,84 @@
+"""Round-trip tests of the .cbin columnar format against the CSV export.
+
+Usage:
+    python -m pytest test_dataset_store.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import (LABEL_COLUMN, ColumnarDataset, convert_csv, export_csv, is_columnar, load_dataset,
+                           load_score_matrix, write_columnar)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src/data'))
+from generate_career_dataset import FEATURES, generate_dataset
+
+ROWS = 600
+
+
+@pytest.fixture(scope='module')
+def csv_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dataset') / 'career_dataset.csv'
+    generate_dataset(ROWS, seed=7).to_csv(path, index=False)
+    return str(path)
+
+
+def assert_matches_csv(frame, csv_frame):
+    """Labels match exactly, scores match the CSV rounded to the stored float32."""
+    assert list(frame.columns) == list(csv_frame.columns)
+    assert frame[LABEL_COLUMN].tolist() == csv_frame[LABEL_COLUMN].tolist()
+    expected = csv_frame[FEATURES].to_numpy().astype(np.float32)
+    np.testing.assert_array_equal(frame[FEATURES].to_numpy(dtype=np.float32), expected)
+
+
+@pytest.mark.parametrize('chunk_rows', [ROWS, 97])
+def test_converted_dataset_reads_back_as_the_csv(csv_path, tmp_path, chunk_rows):
+    csv_frame = pd.read_csv(csv_path)
+    path = str(tmp_path / 'career_dataset.cbin')
+    convert_csv(csv_path, path, chunk_rows=chunk_rows)
+
+    dataset = ColumnarDataset(path)
+    assert is_columnar(path)
+    assert len(dataset) == ROWS
+    assert dataset.label_column == LABEL_COLUMN
+    assert dataset.categories == sorted(csv_frame[LABEL_COLUMN].unique())
+    assert_matches_csv(dataset.to_frame(), csv_frame)
+    assert_matches_csv(pd.concat(dataset.iter_frames(chunk_rows=chunk_rows), ignore_index=True), csv_frame)
+    np.testing.assert_array_equal(load_score_matrix(path, FEATURES[:3]),
+                                  csv_frame[FEATURES[:3]].to_numpy().astype(np.float32))
+
+
+def test_write_columnar_matches_convert_csv(csv_path, tmp_path):
+    written, converted = str(tmp_path / 'written.cbin'), str(tmp_path / 'converted.cbin')
+    write_columnar(written, pd.read_csv(csv_path))
+    convert_csv(csv_path, converted)
+
+    with open(written, 'rb') as a, open(converted, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_export_csv_round_trips(csv_path, tmp_path):
+    path, exported = str(tmp_path / 'career_dataset.cbin'), str(tmp_path / 'exported.csv')
+    convert_csv(csv_path, path)
+    export_csv(path, exported, chunk_rows=97)
+
+    assert_matches_csv(pd.read_csv(exported), pd.read_csv(csv_path))
+
+
+def test_load_dataset_selects_columns(csv_path, tmp_path):
+    path = str(tmp_path / 'career_dataset.cbin')
+    convert_csv(csv_path, path)
+    columns = [LABEL_COLUMN, FEATURES[0]]
+
+    frame = load_dataset(path, columns)
+    assert list(frame.columns) == columns
+    assert frame[LABEL_COLUMN].tolist() == load_dataset(csv_path, columns)[LABEL_COLUMN].tolist()
+
+
+def test_other_files_are_rejected(csv_path):
+    assert not is_columnar(csv_path)
+    with pytest.raises(ValueError):
+        ColumnarDataset(csv_path)
@@ -0,0 +1,86 @@
+"""Tests that explanations come out per class for every shape shap_values can return.
+
+Usage:
+    python -m pytest test_explainer.py
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from explainer import ModelExplainer, per_class_base_values, per_class_values
+from inference import DIRECT_SCORE_FEATURES, EXPECTED_FEATURES_ORDER, build_feature_frame_from_matrix
+from predictor import Predictor
+
+pytest.importorskip('shap')
+
+
+def fitted_predictor(model, n_classes):
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(40, 100, size=(300, len(DIRECT_SCORE_FEATURES)))
+    careers = np.array(['Analyst', 'Artist', 'Engineer', 'Teacher'])[:n_classes]
+    labels = careers[np.argmax(scores[:, :n_classes], axis=1)]
+    X = build_feature_frame_from_matrix(scores)
+    scaler = StandardScaler().fit(X)
+    encoder = LabelEncoder().fit(labels)
+    model.fit(scaler.transform(X), encoder.transform(labels))
+    pipeline = {'model': model, 'scaler': scaler, 'encoder': encoder, 'feature_names': EXPECTED_FEATURES_ORDER}
+    return Predictor(pipeline), scores[:20]
+
+
+def test_list_and_3d_outputs_give_the_same_layout():
+    values = np.arange(2 * 3 * 4, dtype=float).reshape(2, 4, 3)
+    per_class = per_class_values(values, 3)
+
+    assert per_class.shape == (2, 3, 4)
+    np.testing.assert_array_equal(per_class_values([values[:, :, k] for k in range(3)], 3), per_class)
+
+
+def test_binary_margin_is_split_into_both_classes():
+    values = np.arange(8, dtype=float).reshape(2, 4)
+    per_class = per_class_values(values, 2)
+
+    np.testing.assert_array_equal(per_class[:, 1], values)
+    np.testing.assert_array_equal(per_class[:, 0], -values)
+    np.testing.assert_array_equal(per_class_base_values(0.25, 2), [-0.25, 0.25])
+    np.testing.assert_array_equal(per_class_base_values([0.4, 0.6], 2), [0.4, 0.6])
+
+
+def lightgbm_model():
+    lightgbm = pytest.importorskip('lightgbm')
+    return lightgbm.LGBMClassifier(n_estimators=10, num_leaves=7, verbose=-1)
+
+
+# shap explains sklearn's gradient boosting for binary problems only
+MODELS = {
+    'gradient_boosting': lambda: GradientBoostingClassifier(n_estimators=10, max_depth=3, random_state=0),
+    'random_forest': lambda: RandomForestClassifier(n_estimators=10, max_depth=5, random_state=0),
+    'lightgbm': lightgbm_model,
+}
+
+
+@pytest.mark.parametrize('name, n_classes', [
+    ('gradient_boosting', 2),
+    ('random_forest', 2),
+    ('random_forest', 4),
+    ('lightgbm', 2),
+    ('lightgbm', 4),
+])
+def test_contributions_add_up_to_each_class_output(name, n_classes):
+    model = MODELS[name]()
+    predictor, scores = fitted_predictor(model, n_classes)
+    explainer = ModelExplainer(predictor)
+    input_scaled = predictor.scale_score_matrix(scores)
+
+    values = explainer.shap_values(input_scaled)
+    assert values.shape == (len(scores), n_classes, len(explainer.feature_names))
+
+    explained = values.sum(axis=2) + explainer.base_values
+    if name == 'random_forest':
+        expected = model.predict_proba(input_scaled)
+    else:
+        expected = model.predict_proba(input_scaled, raw_score=True) if name == 'lightgbm' \
+            else model.decision_function(input_scaled)
+        if n_classes == 2:
+            expected = np.column_stack([-expected, expected])
+    np.testing.assert_allclose(explained, expected, atol=1e-6)
@@ -0,0 +1,25 @@
+"""Start-up budget test for the entry points that import without loading a model.
+
+app and asgi_app load the model when imported, so they are left to
+import_budget.py runs pointed at a real artifact.
+
+Usage:
+    python -m pytest test_import_budget.py
+"""
+import statistics
+
+import pytest
+
+from import_budget import ENTRY_POINTS, measure
+
+MODEL_FREE_ENTRY_POINTS = ['model_service', 'test_model', 'generate_career_dataset', 'dataset_stats']
+
+# Fresh interpreters per entry point; the median is compared with the budget, as import_budget.py does
+RUNS = 3
+
+
+@pytest.mark.parametrize('name', MODEL_FREE_ENTRY_POINTS)
+def test_import_time_is_within_budget(name):
+    directory, module, budget_ms = ENTRY_POINTS[name]
+    median_ms = statistics.median(measure(directory, module)[0] for _ in range(RUNS))
+    assert median_ms <= budget_ms, f"Importing {module} took {median_ms:.1f} ms, over its {budget_ms} ms budget"
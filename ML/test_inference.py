@@ -0,0 +1,70 @@
+"""Tests that the compiled InferencePlan and the pandas reference path are interchangeable.
+
+Usage:
+    python -m pytest test_inference.py
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from inference import (DIRECT_SCORE_FEATURES, InferencePlan, build_feature_frame, build_feature_frame_from_matrix,
+                       check_parity)
+
+
+def fitted_pipeline(model):
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(40, 100, size=(400, len(DIRECT_SCORE_FEATURES)))
+    labels = np.argmax(scores[:, :4], axis=1)
+    X = build_feature_frame_from_matrix(scores)
+    scaler = StandardScaler().fit(X)
+    model.fit(scaler.transform(X), labels)
+    return {'model': model, 'scaler': scaler}, scores
+
+
+@pytest.fixture(scope='module', params=['random_forest', 'gradient_boosting'])
+def pipeline(request):
+    model = {
+        'random_forest': RandomForestClassifier(n_estimators=10, random_state=0),
+        'gradient_boosting': GradientBoostingClassifier(n_estimators=10, random_state=0),
+    }[request.param]
+    return fitted_pipeline(model)
+
+
+def test_fast_path_matches_pandas_path(pipeline):
+    pipeline, scores = pipeline
+    plan = InferencePlan(pipeline['scaler'])
+    score_rows = [dict(zip(DIRECT_SCORE_FEATURES, row)) for row in scores.tolist()]
+    expected = pipeline['scaler'].transform(build_feature_frame(score_rows))
+
+    np.testing.assert_array_equal(plan.transform_rows(score_rows), expected)
+    np.testing.assert_array_equal(plan.transform_matrix(scores), expected)
+    for row, expected_row in zip(score_rows[:20], expected):
+        np.testing.assert_array_equal(plan.transform_scores(row)[0], expected_row)
+    assert check_parity(pipeline, scores) == 0.0
+
+
+def test_missing_scores_count_as_zero_on_both_paths(pipeline):
+    pipeline, _ = pipeline
+    plan = InferencePlan(pipeline['scaler'])
+    scores = {'cognition': 80, 'artistic': 65.5}
+    expected = pipeline['scaler'].transform(build_feature_frame([scores]))
+
+    np.testing.assert_array_equal(plan.transform_scores(scores), expected)
+    np.testing.assert_array_equal(plan.transform_rows([scores]), expected)
+
+
+@pytest.mark.parametrize('value', ['80', '8e1', ' 80 ', 'high', b'80', [80]])
+def test_non_numeric_scores_are_rejected_on_both_paths(pipeline, value):
+    pipeline, _ = pipeline
+    plan = InferencePlan(pipeline['scaler'])
+    scores = {feature: 50 for feature in DIRECT_SCORE_FEATURES} | {'reasoning': value}
+
+    with pytest.raises(ValueError):
+        pipeline['scaler'].transform(build_feature_frame([scores]))
+    with pytest.raises(ValueError):
+        plan.transform_scores(scores)
+    with pytest.raises(ValueError):
+        plan.transform_rows([scores])
+    with pytest.raises(ValueError):
+        plan.transform_matrix([[scores[feature] for feature in DIRECT_SCORE_FEATURES]])
@@ -0,0 +1,166 @@
+"""Tests for the model registry's discovery, reload, rollback and admin checks.
+
+Pipelines are small pickled dicts and the registry builds StubPredictors from
+them, so no real model is trained or loaded.
+
+Usage:
+    python -m pytest test_model_registry.py
+"""
+import json
+import os
+import time
+
+import joblib
+import pytest
+
+from model_registry import SETTLE_SECONDS, ModelRegistry, admin_allowed
+from model_store import ARTIFACT_FORMAT, ARTIFACT_FORMAT_VERSION, MANIFEST_NAME
+
+
+class StubPredictor:
+    """Records the pipeline it was built from and answers the warm-up calls."""
+
+    engine = 'native'
+    inference_mode = 'stub'
+
+    def __init__(self, pipeline, version=None, path=None):
+        self.pipeline = pipeline
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+        self.warm_calls = 0
+
+    def scale_score_matrix(self, scores):
+        return scores
+
+    def predict_top_n(self, X, top_n=3):
+        self.warm_calls += 1
+
+    def predict_score_rows(self, score_rows, top_n=3):
+        self.warm_calls += 1
+
+
+def write_pickle(models_dir, name, age=SETTLE_SECONDS + 10):
+    """Pickle a stub pipeline named after the file, modified age seconds ago."""
+    path = os.path.join(models_dir, name)
+    joblib.dump({'name': name}, path)
+    backdate(path, age)
+    return path
+
+
+def write_artifact(models_dir, name, source, age=SETTLE_SECONDS + 10):
+    """Create an artifact directory whose manifest says it was exported from source."""
+    path = os.path.join(models_dir, name)
+    os.mkdir(path)
+    manifest = {'format': ARTIFACT_FORMAT, 'format_version': ARTIFACT_FORMAT_VERSION,
+                'artifact_id': name, 'source': source}
+    with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f)
+    backdate(os.path.join(path, MANIFEST_NAME), age)
+    return path
+
+
+def backdate(path, age):
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(models_dir=str(tmp_path), predictor_factory=StubPredictor)
+
+
+def test_newest_candidate_waits_for_files_to_settle(registry):
+    older = write_pickle(registry.models_dir, 'a.pkl', age=SETTLE_SECONDS + 20)
+    write_pickle(registry.models_dir, 'b.pkl', age=0)
+
+    assert [path for _, path in registry.candidates()][-1].endswith('b.pkl')
+    assert registry.newest_candidate() == older
+
+
+def test_newest_candidate_is_none_while_nothing_has_settled(registry):
+    write_pickle(registry.models_dir, 'a.pkl', age=0)
+    assert registry.newest_candidate() is None
+
+
+def test_artifact_exported_from_a_sibling_pickle_is_skipped(registry, monkeypatch):
+    pickle_path = write_pickle(registry.models_dir, 'a.pkl', age=SETTLE_SECONDS + 20)
+    artifact = write_artifact(registry.models_dir, 'a.model', pickle_path)
+
+    monkeypatch.delenv('MODEL_ENGINE', raising=False)
+    assert registry.newest_candidate() == pickle_path
+    monkeypatch.setenv('MODEL_ENGINE', 'compiled')
+    assert registry.newest_candidate() == artifact
+
+
+def test_reload_activates_the_newest_version(registry):
+    write_pickle(registry.models_dir, 'a.pkl', age=SETTLE_SECONDS + 20)
+    newest = write_pickle(registry.models_dir, 'b.pkl')
+
+    predictor = registry.reload(background=False)
+
+    assert registry.active is predictor
+    assert predictor.path == newest
+    assert predictor.pipeline == {'name': 'b.pkl'}
+    assert predictor.warm_calls == 2
+    assert registry.status()['history'][-1]['event'] == 'activate'
+
+
+def test_reloading_the_active_version_is_a_no_op(registry):
+    path = write_pickle(registry.models_dir, 'a.pkl')
+    first = registry.reload(path, background=False)
+
+    assert registry.reload(path, background=False) is first
+    assert registry.previous is None
+
+
+def test_rollback_swaps_back_without_reloading(registry):
+    first = registry.reload(write_pickle(registry.models_dir, 'a.pkl'), background=False)
+    second = registry.reload(write_pickle(registry.models_dir, 'b.pkl'), background=False)
+
+    assert registry.rollback() is first
+    assert registry.active is first
+    assert registry.previous is second
+    last = registry.status()['history'][-1]
+    assert (last['event'], last['version']) == ('rollback', first.version)
+
+
+def test_rollback_without_a_previous_version_fails(registry):
+    registry.reload(write_pickle(registry.models_dir, 'a.pkl'), background=False)
+    with pytest.raises(RuntimeError):
+        registry.rollback()
+
+
+def test_failed_load_keeps_the_active_version(registry):
+    first = registry.reload(write_pickle(registry.models_dir, 'a.pkl'), background=False)
+    broken = os.path.join(registry.models_dir, 'broken.pkl')
+    with open(broken, 'wb') as f:
+        f.write(b'not a pickle')
+
+    with pytest.raises(RuntimeError):
+        registry.reload(broken, background=False)
+    assert registry.active is first
+    assert registry.status()['history'][-1]['event'] == 'load_failed'
+
+
+def test_resolve_name_stays_inside_the_models_directory(registry):
+    write_pickle(registry.models_dir, 'a.pkl')
+
+    assert registry.resolve_name('../../a.pkl') == os.path.join(registry.models_dir, 'a.pkl')
+    with pytest.raises(ValueError):
+        registry.resolve_name('missing.pkl')
+
+
+@pytest.mark.parametrize('configured, token, allowed', [
+    (None, 'secret', False),
+    ('', '', False),
+    ('secret', None, False),
+    ('secret', 'wrong', False),
+    ('secret', 'secret', True),
+])
+def test_admin_allowed(monkeypatch, configured, token, allowed):
+    if configured is None:
+        monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    else:
+        monkeypatch.setenv('ADMIN_TOKEN', configured)
+    assert admin_allowed(token) is allowed
@@ -0,0 +1,120 @@
+"""Tests for PredictionCache expiry, eviction, key canonicalisation and version isolation.
+
+Usage:
+    python -m pytest test_prediction_cache.py
+"""
+import pytest
+
+import prediction_cache
+from inference import DIRECT_SCORE_FEATURES, numeric_score
+from prediction_cache import KNOWN_VERSIONS, PredictionCache
+
+
+class Clock:
+    """Stands in for time.monotonic so expiry can be tested without sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', clock)
+    return clock
+
+
+def key_of(cache, scores, top_n=3):
+    vector, _ = cache.canonical_scores(scores)
+    return cache.make_key(vector, top_n)
+
+
+def profile(**scores):
+    return {feature: 50.0 for feature in DIRECT_SCORE_FEATURES} | scores
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = PredictionCache(ttl_seconds=10.0)
+    cache.put('a', 1, 'v1')
+
+    clock.now += 9.9
+    assert cache.get('a', 'v1') == 1
+    clock.now += 0.2
+    assert cache.get('a', 'v1') is None
+    assert cache.expirations == 1
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', 1, 'v1')
+    cache.put('b', 2, 'v1')
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a', 'v1') == 1
+    cache.put('c', 3, 'v1')
+
+    assert cache.get('b', 'v1') is None
+    assert cache.get('a', 'v1') == 1
+    assert cache.get('c', 'v1') == 3
+    assert cache.evictions == 1
+
+
+def test_negative_zero_shares_a_key_with_zero():
+    cache = PredictionCache()
+    assert key_of(cache, profile(reasoning=-0.0)) == key_of(cache, profile(reasoning=0.0))
+
+
+def test_quantum_rounds_nearby_profiles_to_one_key():
+    cache = PredictionCache(quantum=1.0)
+    _, canonical = cache.canonical_scores(profile(reasoning=79.6))
+
+    assert key_of(cache, profile(reasoning=79.6)) == key_of(cache, profile(reasoning=80.4))
+    assert key_of(cache, profile(reasoning=79.6)) != key_of(cache, profile(reasoning=80.6))
+    assert canonical['reasoning'] == 80.0
+    assert key_of(cache, profile(reasoning=80.0), top_n=3) != key_of(cache, profile(reasoning=80.0), top_n=5)
+
+
+def test_non_numeric_scores_bypass_the_cache():
+    cache = PredictionCache()
+    scores = profile(reasoning='80')
+
+    assert cache.canonical_scores(scores) == (None, scores)
+    with pytest.raises(ValueError):
+        cache.get_or_compute(scores, 3, 'v1', lambda s: numeric_score(s['reasoning']))
+    assert cache.stats()['size'] == 0
+
+
+def test_new_version_drops_earlier_entries():
+    cache = PredictionCache()
+    cache.put('a', 1, 'v1')
+
+    assert cache.get('a', 'v2') is None
+    assert cache.get('a', 'v1') is None
+    assert cache.invalidations == 1
+    assert cache.stats()['model_version'] == 'v2'
+
+
+def test_stale_version_put_keeps_current_entries():
+    cache = PredictionCache()
+    cache.put('a', 1, 'v1')
+    cache.put('a', 2, 'v2')
+    # A request that started on v1 finishes after the swap to v2
+    cache.put('b', 3, 'v1')
+
+    assert cache.get('a', 'v2') == 2
+    assert cache.get('b', 'v1') == 3
+    assert cache.get('b', 'v2') is None
+    assert cache.stats()['model_version'] == 'v2'
+
+
+def test_remembered_versions_stay_bounded():
+    cache = PredictionCache()
+    for version in range(100):
+        cache.put('a', version, f'v{version}')
+
+    assert len(cache._versions) == KNOWN_VERSIONS
+    assert cache.get('a', 'v99') == 99
+    assert cache.invalidations == 99
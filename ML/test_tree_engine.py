@@ -0,0 +1,98 @@
+"""Parity tests of the compiled tree engine against each library's own predict_proba.
+
+Usage:
+    python -m pytest test_tree_engine.py
+"""
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+import tree_engine
+from tree_engine import compile_model
+
+N_FEATURES = 15
+
+# XGBoost sums its margins in float32, so it only agrees to about single precision
+TOLERANCE = {'xgboost': 1e-6}
+
+
+def make_data(n_classes, n_rows=600, missing=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, N_FEATURES))
+    y = np.argmax(X[:, :n_classes] + 0.5 * rng.normal(size=(n_rows, n_classes)), axis=1) if n_classes > 2 \
+        else (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+    if missing:
+        X[rng.random(X.shape) < missing] = np.nan
+    return X, y
+
+
+def lightgbm_model():
+    lightgbm = pytest.importorskip('lightgbm')
+    return lightgbm.LGBMClassifier(n_estimators=15, num_leaves=15, min_child_samples=5, verbose=-1)
+
+
+def xgboost_model():
+    xgboost = pytest.importorskip('xgboost')
+    return xgboost.XGBClassifier(n_estimators=15, max_depth=4, n_jobs=1)
+
+
+MODELS = {
+    'random_forest': lambda: RandomForestClassifier(n_estimators=15, random_state=0),
+    'extra_trees': lambda: ExtraTreesClassifier(n_estimators=15, max_depth=8, random_state=0),
+    'decision_tree': lambda: DecisionTreeClassifier(max_depth=6, random_state=0),
+    'gradient_boosting': lambda: GradientBoostingClassifier(n_estimators=10, max_depth=3, random_state=0),
+    'lightgbm': lightgbm_model,
+    'xgboost': xgboost_model,
+}
+
+# Models that learn a direction for missing values when trained on rows with NaN
+NAN_MODELS = ['random_forest', 'decision_tree', 'lightgbm', 'xgboost']
+
+
+def assert_parity(name, model, X):
+    compiled = compile_model(model)
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    assert actual.shape == expected.shape
+    assert_allclose(actual, expected, rtol=0, atol=TOLERANCE.get(name, 1e-12))
+    assert_array_equal(compiled.classes_, model.classes_)
+
+
+@pytest.mark.parametrize('n_classes', [2, 5])
+@pytest.mark.parametrize('name', MODELS)
+def test_compiled_matches_native(name, n_classes):
+    X, y = make_data(n_classes)
+    model = MODELS[name]().fit(X, y)
+    assert_parity(name, model, X)
+
+
+@pytest.mark.parametrize('name', NAN_MODELS)
+def test_missing_values_follow_the_learned_direction(name):
+    X, y = make_data(5, missing=0.2)
+    model = MODELS[name]().fit(X, y)
+    assert_parity(name, model, X)
+
+
+@pytest.mark.parametrize('name', ['random_forest', 'lightgbm'])
+def test_small_walk_chunks_give_the_same_result(name, monkeypatch):
+    X, y = make_data(5)
+    model = MODELS[name]().fit(X, y)
+    # Forces several walk chunks and leaf gathers per call
+    monkeypatch.setattr(tree_engine, 'WALK_CHUNK_CELLS', 1000)
+    monkeypatch.setattr(tree_engine, 'GATHER_CHUNK_CELLS', 1000)
+    assert_parity(name, model, X)
+
+
+def test_apply_returns_leaves_in_tree_order():
+    X, y = make_data(5)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    compiled = compile_model(model)
+    offsets = compiled.roots.astype(np.int64)
+    assert_array_equal(compiled.apply(X) - offsets, model.apply(X.astype(np.float32)))
+
+
+def test_unsupported_model_raises_type_error():
+    with pytest.raises(TypeError):
+        compile_model(object())
@@ -0,0 +1,560 @@
+"""Pure-NumPy inference for the tree ensembles used by the career model.
+
+``compile_model`` flattens a fitted ensemble into contiguous node arrays
+(feature index, threshold, children, leaf values) and returns a
+``CompiledTreeEnsemble`` whose ``predict_proba`` walks every tree for a whole
+batch at once. It supports:
+
+* scikit-learn RandomForest/ExtraTrees/DecisionTree classifiers,
+* scikit-learn GradientBoostingClassifier,
+* LightGBM LGBMClassifier (binary and multiclass objectives),
+* XGBoost XGBClassifier (binary:logistic and multi:softprob).
+
+Each walk step only advances the (tree, row) pairs that have not reached a
+leaf yet, so shallow paths stop early in deep ensembles.
+
+The services keep the library's own ``predict_proba`` unless
+``MODEL_ENGINE=compiled`` is set. Run ``python tree_engine.py --validate`` to
+compare the compiled engine with the original model on career_dataset.csv,
+and ``--benchmark`` to time both engines at the batch sizes the services see.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Engine names accepted by the services
+ENGINE_NATIVE = 'native'
+ENGINE_COMPILED = 'compiled'
+ENGINES = (ENGINE_NATIVE, ENGINE_COMPILED)
+
+# Rows x trees walked per chunk; small enough for the walk arrays to stay in cache
+WALK_CHUNK_CELLS = 1 << 18
+
+# Rows x trees x classes of forest leaf distributions gathered at once; small enough to stay in cache
+GATHER_CHUNK_CELLS = 1 << 17
+
+# The walk drops pairs that reached a leaf once fewer than this share of them are still at a split
+WALK_COMPACT_FRACTION = 0.5
+
+# Batch sizes --benchmark times both engines at: one request, a micro-batch and a bulk call
+BENCHMARK_SIZES = (1, 32, 1024)
+
+# Each benchmark measurement repeats until it has run this long (and at least 3 times)
+BENCHMARK_SECONDS = 0.5
+
+
+class TreeBuilder:
+    """Accumulates trees into the flat node arrays of a compiled ensemble."""
+
+    def __init__(self, n_outputs):
+        self.n_outputs = n_outputs
+        self.parts = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'missing_left', 'value')}
+        self.roots = []
+        self.n_nodes = 0
+        self.max_depth = 0
+
+    def add_tree(self, feature, threshold, left, right, missing_left, value, depth):
+        """Append one tree given its local node arrays (leaves have left == -1)."""
+        offset = self.n_nodes
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        is_leaf = left < 0
+        local = np.arange(len(left))
+
+        # Leaves point at themselves so extra walk steps keep rows in place
+        self.parts['feature'].append(np.where(is_leaf, 0, feature).astype(np.int32))
+        self.parts['threshold'].append(np.where(is_leaf, 0.0, threshold).astype(np.float64))
+        self.parts['left'].append((np.where(is_leaf, local, left) + offset).astype(np.int32))
+        self.parts['right'].append((np.where(is_leaf, local, right) + offset).astype(np.int32))
+        self.parts['missing_left'].append(np.asarray(missing_left, dtype=bool))
+        self.parts['value'].append(np.asarray(value, dtype=np.float64).reshape(len(left), self.n_outputs))
+        self.roots.append(offset)
+        self.n_nodes += len(left)
+        self.max_depth = max(self.max_depth, depth)
+
+    def arrays(self):
+        arrays = {name: np.concatenate(parts) for name, parts in self.parts.items()}
+        arrays['roots'] = np.asarray(self.roots, dtype=np.int32)
+        return arrays
+
+
+class CompiledTreeEnsemble:
+    """A tree ensemble flattened into contiguous NumPy arrays.
+
+    ``aggregation`` is either 'mean' (forests: average the per-tree class
+    distributions) or 'sum' (boosting: add each tree's scalar leaf to the margin
+    of ``tree_class[t]`` and apply ``link``).
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots,
+                 classes, max_depth, aggregation, input_dtype='float64', strict_less=False,
+                 tree_class=None, base_margin=None, link='identity'):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation
+        self.input_dtype = np.dtype(input_dtype)
+        self.strict_less = bool(strict_less)
+        self.tree_class = tree_class
+        self.base_margin = base_margin
+        self.link = link
+
+        self.n_trees = len(roots)
+        self.n_classes = len(self.classes_)
+
+        # Walk tables: leaves point at themselves, and a node's children sit side by side
+        # so one gather at 2 * node + goes_right picks the next node
+        self._is_leaf = np.asarray(left) == np.arange(len(left))
+        self._children = np.column_stack([left, right]).ravel().astype(np.intp)
+        self._feature = np.asarray(feature, dtype=np.intp)
+        self._missing_right = ~np.asarray(missing_left, dtype=bool)
+
+        if aggregation == 'sum':
+            # Trees are walked grouped by class, so each class margin is one np.add.reduceat segment
+            self._tree_order = np.argsort(tree_class, kind='stable')
+            self._margin_classes, self._class_starts = np.unique(
+                np.asarray(tree_class)[self._tree_order], return_index=True)
+        else:
+            self._tree_order = np.arange(self.n_trees)
+        self._ordered_roots = np.asarray(roots, dtype=np.intp)[self._tree_order]
+        self._chunk_rows = max(1, WALK_CHUNK_CELLS // max(1, self.n_trees))
+        self._gather_rows = max(1, GATHER_CHUNK_CELLS // max(1, self.n_trees * self.value.shape[1]))
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _chunks(self, X):
+        """Yield (row slice, leaves) per chunk of X; leaves has shape (n_trees, chunk rows)."""
+        # Match the precision the original library compares in
+        X = np.asarray(X).astype(self.input_dtype).astype(np.float64)
+        for start in range(0, X.shape[0], self._chunk_rows):
+            rows = slice(start, start + self._chunk_rows)
+            yield rows, self._walk(X[rows])
+
+    def _walk(self, X):
+        """Leaf reached by every (tree, row) pair, trees in walk order, shape (n_trees, n_rows)."""
+        X = np.ascontiguousarray(X)
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        has_missing = np.isnan(X_flat).any()
+
+        # One entry per (tree, row) pair still walking; a pair at a leaf stays there on further steps,
+        # and finished pairs are dropped once enough of them have piled up
+        current = np.repeat(self._ordered_roots, n_rows)
+        offsets = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        active = np.arange(current.size)
+        leaves = np.empty_like(current)
+        while True:
+            x = X_flat[offsets + self._feature[current]]
+            threshold = self.threshold[current]
+            goes_right = x >= threshold if self.strict_less else x > threshold
+            if has_missing:
+                missing = np.isnan(x)
+                goes_right[missing] = self._missing_right[current[missing]]
+            current = self._children[2 * current + goes_right]
+            at_split = ~self._is_leaf[current]
+            n_at_split = np.count_nonzero(at_split)
+            if n_at_split == 0:
+                leaves[active] = current
+                return leaves.reshape(self.n_trees, n_rows)
+            if n_at_split < WALK_COMPACT_FRACTION * current.size:
+                leaves[active] = current
+                keep = np.flatnonzero(at_split)
+                active = active[keep]
+                current = current[keep]
+                offsets = offsets[keep]
+
+    def apply(self, X):
+        """Return the leaf node index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.asarray(X)
+        leaves = np.empty((X.shape[0], self.n_trees), dtype=np.int32)
+        for rows, chunk_leaves in self._chunks(X):
+            leaves[rows, self._tree_order] = chunk_leaves.T
+        return leaves
+
+    def decision_function(self, X):
+        """Return the raw class margins for boosted ensembles."""
+        if self.aggregation != 'sum':
+            raise ValueError("decision_function is only defined for boosted ensembles")
+        X = np.asarray(X)
+        margin = np.tile(np.asarray(self.base_margin, dtype=np.float64), (X.shape[0], 1))
+        for rows, leaves in self._chunks(X):
+            margin[rows, self._margin_classes] += np.add.reduceat(
+                self.value[leaves, 0], self._class_starts, axis=0).T
+        return margin
+
+    def predict_proba(self, X):
+        """Return class probabilities with columns ordered as ``classes_``."""
+        if self.aggregation == 'mean':
+            X = np.asarray(X)
+            proba = np.empty((X.shape[0], self.n_classes), dtype=np.float64)
+            for rows, leaves in self._chunks(X):
+                chunk = proba[rows]
+                for start in range(0, leaves.shape[1], self._gather_rows):
+                    block = slice(start, start + self._gather_rows)
+                    chunk[block] = self.value[leaves[:, block]].sum(axis=0)
+            proba /= self.n_trees
+            return proba
+
+        margin = self.decision_function(X)
+        if self.link == 'softmax':
+            margin -= margin.max(axis=1, keepdims=True)
+            np.exp(margin, out=margin)
+            margin /= margin.sum(axis=1, keepdims=True)
+            return margin
+        if self.link == 'sigmoid':
+            positive = 1.0 / (1.0 + np.exp(-margin[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raise ValueError(f"Unknown link function {self.link!r}")
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+# --- Exporters ---
+
+def _sklearn_tree_arrays(tree):
+    """Local node arrays for a fitted sklearn ``tree_`` object."""
+    left = tree.children_left
+    missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+    if missing_go_to_left is None:
+        missing_go_to_left = np.zeros(tree.node_count, dtype=bool)
+    return tree.feature, tree.threshold, left, tree.children_right, missing_go_to_left.astype(bool), tree.max_depth
+
+
+def _normalized_leaf_distribution(tree):
+    """Per-node class distribution, normalized as DecisionTreeClassifier.predict_proba does."""
+    proba = tree.value[:, 0, :].astype(np.float64)
+    normalizer = proba.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    return proba / normalizer
+
+
+def _compile_sklearn_forest(model):
+    estimators = getattr(model, 'estimators_', [model])
+    n_classes = len(model.classes_)
+    builder = TreeBuilder(n_classes)
+    for estimator in estimators:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise TypeError("Multi-output trees are not supported")
+        feature, threshold, left, right, missing_left, depth = _sklearn_tree_arrays(tree)
+        builder.add_tree(feature, threshold, left, right, missing_left,
+                         _normalized_leaf_distribution(tree), depth)
+    return CompiledTreeEnsemble(
+        **builder.arrays(), classes=model.classes_, max_depth=builder.max_depth,
+        aggregation='mean', input_dtype='float32',
+    )
+
+
+def _compile_sklearn_gradient_boosting(model):
+    init = model.init_
+    if init != 'zero' and type(init).__name__ != 'DummyClassifier':
+        raise TypeError(f"Unsupported GradientBoosting init estimator {type(init).__name__}")
+    n_features = model.n_features_in_
+    base_margin = model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0].astype(np.float64)
+
+    builder = TreeBuilder(1)
+    tree_class = []
+    for stage in model.estimators_:
+        for k, regressor in enumerate(stage):
+            tree = regressor.tree_
+            feature, threshold, left, right, missing_left, depth = _sklearn_tree_arrays(tree)
+            builder.add_tree(feature, threshold, left, right, missing_left,
+                             model.learning_rate * tree.value[:, 0, 0], depth)
+            tree_class.append(k)
+    return CompiledTreeEnsemble(
+        **builder.arrays(), classes=model.classes_, max_depth=builder.max_depth,
+        aggregation='sum', input_dtype='float32', tree_class=np.asarray(tree_class, dtype=np.int32),
+        base_margin=base_margin, link='softmax' if len(base_margin) > 1 else 'sigmoid',
+    )
+
+
+def _flatten_nested_tree(root, children, read_split, read_leaf):
+    """Number the nodes of a nested tree dump breadth-first and return local arrays."""
+    feature, threshold, left, right, missing_left, value = [], [], [], [], [], []
+    queue = [(root, 0)]
+    max_depth = 0
+    head = 0
+    while head < len(queue):
+        node, depth = queue[head]
+        head += 1
+        max_depth = max(max_depth, depth)
+        child_nodes = children(node)
+        if child_nodes is None:
+            feature.append(0)
+            threshold.append(0.0)
+            left.append(-1)
+            right.append(-1)
+            missing_left.append(False)
+            value.append(read_leaf(node))
+            continue
+        split_feature, split_threshold, split_missing_left = read_split(node)
+        feature.append(split_feature)
+        threshold.append(split_threshold)
+        missing_left.append(split_missing_left)
+        value.append(0.0)
+        left.append(len(queue))
+        queue.append((child_nodes[0], depth + 1))
+        right.append(len(queue))
+        queue.append((child_nodes[1], depth + 1))
+    return feature, threshold, left, right, missing_left, value, max_depth
+
+
+def _compile_lightgbm(model):
+    booster = model.booster_
+    best_iteration = booster.best_iteration if booster.best_iteration > 0 else None
+    dump = booster.dump_model(num_iteration=best_iteration)
+    objective = dump['objective'].split()[0]
+    if dump.get('average_output'):
+        raise TypeError("LightGBM random forest mode is not supported")
+    if objective not in ('multiclass', 'binary'):
+        raise TypeError(f"Unsupported LightGBM objective {objective!r}")
+
+    def children(node):
+        if 'leaf_value' in node:
+            return None
+        return node['left_child'], node['right_child']
+
+    def read_split(node):
+        if node['decision_type'] != '<=':
+            raise TypeError("Categorical LightGBM splits are not supported")
+        if node['missing_type'] == 'Zero':
+            raise TypeError("LightGBM zero-as-missing splits are not supported")
+        threshold = float(node['threshold'])
+        # Without a missing type LightGBM treats NaN as 0.0
+        missing_left = node['default_left'] if node['missing_type'] == 'NaN' else 0.0 <= threshold
+        return node['split_feature'], threshold, bool(missing_left)
+
+    n_outputs = dump['num_tree_per_iteration']
+    builder = TreeBuilder(1)
+    tree_class = []
+    for i, tree_info in enumerate(dump['tree_info']):
+        if tree_info.get('num_cat', 0):
+            raise TypeError("Categorical LightGBM splits are not supported")
+        arrays = _flatten_nested_tree(tree_info['tree_structure'], children, read_split,
+                                      lambda node: node['leaf_value'])
+        builder.add_tree(*arrays[:6], depth=arrays[6])
+        tree_class.append(i % n_outputs)
+
+    return CompiledTreeEnsemble(
+        **builder.arrays(), classes=model.classes_, max_depth=builder.max_depth,
+        aggregation='sum', input_dtype='float64', tree_class=np.asarray(tree_class, dtype=np.int32),
+        base_margin=np.zeros(n_outputs), link='softmax' if objective == 'multiclass' else 'sigmoid',
+    )
+
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    if objective not in ('multi:softprob', 'multi:softmax', 'binary:logistic'):
+        raise TypeError(f"Unsupported XGBoost objective {objective!r}")
+
+    n_classes = len(model.classes_)
+    n_outputs = n_classes if objective.startswith('multi') else 1
+    base_score = np.asarray(
+        json.loads(config['learner']['learner_model_param']['base_score']), dtype=np.float64
+    ).reshape(-1)
+    base_margin = np.broadcast_to(base_score, (n_outputs,)).astype(np.float64)
+    if objective == 'binary:logistic':
+        base_margin = np.log(base_margin / (1.0 - base_margin))
+
+    feature_names = booster.feature_names
+    feature_index = {name: i for i, name in enumerate(feature_names)} if feature_names else {}
+
+    def children(node):
+        if 'leaf' in node:
+            return None
+        by_id = {child['nodeid']: child for child in node['children']}
+        return by_id[node['yes']], by_id[node['no']]
+
+    def read_split(node):
+        name = node['split']
+        index = feature_index[name] if name in feature_index else int(name.lstrip('f'))
+        # XGBoost compares in float32
+        threshold = float(np.float32(node['split_condition']))
+        return index, threshold, node['missing'] == node['yes']
+
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        best_iteration = None
+    dumps = booster.get_dump(dump_format='json')
+    if best_iteration is not None:
+        dumps = dumps[:(best_iteration + 1) * n_outputs]
+    if config['learner']['gradient_booster'].get('gbtree_model_param', {}).get('num_parallel_tree', '1') != '1':
+        raise TypeError("XGBoost models with num_parallel_tree > 1 are not supported")
+
+    builder = TreeBuilder(1)
+    tree_class = []
+    for i, tree_json in enumerate(dumps):
+        arrays = _flatten_nested_tree(json.loads(tree_json), children, read_split,
+                                      lambda node: node['leaf'])
+        builder.add_tree(*arrays[:6], depth=arrays[6])
+        tree_class.append(i % n_outputs)
+
+    return CompiledTreeEnsemble(
+        **builder.arrays(), classes=model.classes_, max_depth=builder.max_depth,
+        aggregation='sum', input_dtype='float32', strict_less=True,
+        tree_class=np.asarray(tree_class, dtype=np.int32), base_margin=base_margin,
+        link='softmax' if n_outputs > 1 else 'sigmoid',
+    )
+
+
+def compile_model(model):
+    """Flatten a fitted tree ensemble into a CompiledTreeEnsemble.
+
+    Raises TypeError when the model type or one of its features is not supported.
+    """
+    if isinstance(model, CompiledTreeEnsemble):
+        return model
+    name = type(model).__name__
+    if name in ('RandomForestClassifier', 'ExtraTreesClassifier', 'DecisionTreeClassifier',
+                'ExtraTreeClassifier'):
+        return _compile_sklearn_forest(model)
+    if name == 'GradientBoostingClassifier':
+        return _compile_sklearn_gradient_boosting(model)
+    if name == 'LGBMClassifier':
+        return _compile_lightgbm(model)
+    if name == 'XGBClassifier':
+        return _compile_xgboost(model)
+    raise TypeError(f"Cannot compile model of type {name}")
+
+
+def select_model(model, engine=ENGINE_NATIVE):
+    """Return the model to call predict_proba on for the requested engine."""
+    if engine not in ENGINES:
+        raise ValueError(f"Model engine must be one of {ENGINES}, got {engine!r}")
+    if engine == ENGINE_COMPILED:
+        return compile_model(model)
+    return model
+
+
+def validate(pipeline, score_matrix, top_n=5):
+    """Compare the compiled engine with the original model on score_matrix."""
+    from inference import InferencePlan
+
+    X = InferencePlan(pipeline['scaler']).transform_matrix(score_matrix)
+    model = pipeline['model']
+
+    start = time.perf_counter()
+    compiled = compile_model(model)
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = model.predict_proba(X)
+    native_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = compiled.predict_proba(X)
+    compiled_seconds = time.perf_counter() - start
+
+    expected_top = np.argsort(expected, axis=1)[:, -top_n:][:, ::-1]
+    actual_top = np.argsort(actual, axis=1)[:, -top_n:][:, ::-1]
+    return {
+        'model_type': type(model).__name__,
+        'rows': int(X.shape[0]),
+        'trees': compiled.n_trees,
+        'nodes': compiled.n_nodes,
+        'max_abs_diff': float(np.max(np.abs(expected - actual))),
+        'top1_agreement': float(np.mean(expected_top[:, 0] == actual_top[:, 0])),
+        f'top{top_n}_agreement': float(np.mean(np.all(expected_top == actual_top, axis=1))),
+        'compile_seconds': compile_seconds,
+        'native_seconds': native_seconds,
+        'compiled_seconds': compiled_seconds,
+    }
+
+
+def time_predict_proba(model, X, min_seconds=BENCHMARK_SECONDS):
+    """Median milliseconds of model.predict_proba(X)."""
+    model.predict_proba(X)
+    timings = []
+    deadline = time.perf_counter() + min_seconds
+    while len(timings) < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        model.predict_proba(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+
+def benchmark(pipeline, score_matrix, sizes=BENCHMARK_SIZES, min_seconds=BENCHMARK_SECONDS):
+    """Time the native and compiled engines on the first rows of score_matrix at every size."""
+    from inference import InferencePlan
+
+    X = InferencePlan(pipeline['scaler']).transform_matrix(score_matrix)
+    model = pipeline['model']
+    compiled = compile_model(model)
+    results = []
+    for size in sizes:
+        # Smaller datasets are tiled up to the requested size
+        rows = np.resize(X, (size, X.shape[1]))
+        native_ms = time_predict_proba(model, rows, min_seconds)
+        compiled_ms = time_predict_proba(compiled, rows, min_seconds)
+        results.append({'rows': size, 'native_ms': native_ms, 'compiled_ms': compiled_ms,
+                        'speedup': native_ms / compiled_ms})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled tree-ensemble engine for the career model")
+    parser.add_argument('--validate', action='store_true',
+                        help="Compare the compiled engine with the original model")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Time the compiled engine against the original model")
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')],
+                        default=list(BENCHMARK_SIZES), help="Comma-separated batch sizes for --benchmark")
+    parser.add_argument('--model', default=None,
+                        help="Path to the pickled model pipeline (default: resolved automatically)")
+    parser.add_argument('--dataset', default=os.path.join(os.path.dirname(__file__), '..', 'career_dataset.csv'),
+                        help="Dataset of score profiles to validate on (CSV or .cbin)")
+    # XGBoost accumulates margins in float32, so exact equality is not expected there
+    parser.add_argument('--tolerance', type=float, default=1e-6,
+                        help="Largest allowed absolute probability difference")
+    args = parser.parse_args()
+
+    if not args.validate and not args.benchmark:
+        parser.print_help()
+        return
+
+    from inference import DIRECT_SCORE_FEATURES
+    from dataset_store import load_score_matrix
+    from model_store import load_model_artifact
+
+    pipeline = load_model_artifact(args.model, prefer_pickle=True)
+    score_matrix = load_score_matrix(args.dataset, DIRECT_SCORE_FEATURES)
+
+    if args.benchmark:
+        print(f"{'rows':>6}  {'native ms':>10}  {'compiled ms':>11}  {'speedup':>7}")
+        results = benchmark(pipeline, score_matrix, args.sizes)
+        for result in results:
+            print(f"{result['rows']:>6}  {result['native_ms']:>10.3f}  {result['compiled_ms']:>11.3f}  "
+                  f"{result['speedup']:>6.2f}x")
+        slower = [result['rows'] for result in results if result['speedup'] < 1.0]
+        if slower:
+            print(f"The compiled engine is slower than the original model at {slower} rows; keep MODEL_ENGINE=native")
+        if not args.validate:
+            return
+
+    report = validate(pipeline, score_matrix)
+    for key, value in report.items():
+        print(f"{key:20s}: {value}")
+    if report['max_abs_diff'] > args.tolerance:
+        print("Validation FAILED: compiled engine disagrees with the original model")
+        sys.exit(1)
+    print("Validation passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,10 @@
 import { Router, Request, Response } from 'express';
 import { auth } from '../middleware/auth.middleware';
 import User from '../models/user.model'; // Import the User model
-import axios from 'axios'; // Import axios for making HTTP requests
 import * as fs from 'fs'; // Import fs module
 import * as path from 'path'; // Import path module
 import NodeCache from 'node-cache';
+import { getModelWorker, toModelScores } from '../services/modelWorker';
 
 const router = Router();
 const cache = new NodeCache({ stdTTL: 3600 }); // Cache for 1 hour
@@ -169,28 +169,10 @@ const getRecommendations = async (req: Request, res: Response): Promise<void> =>
       return;
     }
 
-    // Prepare scores for the ML model (assuming the ML model expects snake_case keys)
-    const mlInputScores = {
-      cognition: scores.abilities.cognition,
-      reasoning: scores.abilities.reasoning,
-      figural_memory: scores.abilities.figuralMemory,
-      spatial_ability: scores.abilities.spatialAbility,
-      verbal_ability: scores.abilities.verbalAbility,
-      social_ability: scores.abilities.socialAbility,
-      numerical_ability: scores.abilities.numericalAbility,
-      numerical_memory: scores.abilities.numericalMemory,
-      knowledge: scores.orientations.knowledge,
-      practical: scores.orientations.practical,
-      artistic: scores.orientations.artistic,
-      social: scores.orientations.social,
-      power_coping: scores.orientations.powerCopingStyle,
-    };
-
-    // Call the external ML model prediction service
-    const ML_MODEL_PREDICT_URL = 'http://127.0.0.1:5001/predict'; // Define the ML model URL
-    const mlResponse = await axios.post(ML_MODEL_PREDICT_URL, { scores: mlInputScores });
-
-    const predictedCareerTitles: string[] = mlResponse.data?.predicted_careers || [];
+    // Score the profile on the persistent model worker (same feature schema as the ML service)
+    const [prediction] = await getModelWorker().predict([toModelScores(scores)]);
+
+    const predictedCareerTitles: string[] = prediction?.predicted_careers || [];
 
     // Save the predicted careers to the user's recommendedCareers, taking top 5 and avoiding duplicates
     if (predictedCareerTitles.length > 0) {
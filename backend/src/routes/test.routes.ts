@@ -1,7 +1,7 @@
 import { Router, Request, Response } from 'express';
 import { auth } from '../middleware/auth.middleware';
 import User from '../models/user.model';
-import axios from 'axios';
+import { getModelWorker, toModelScores } from '../services/modelWorker';
 
 const router = Router();
 
@@ -69,9 +69,9 @@ const getResults = async (req: Request, res: Response): Promise<void> => {
     // If scores exist, call the Python ML service
     if (psychometricScores) {
       try {
-        const mlServiceUrl = 'http://127.0.0.1:5001/predict'; // URL of your Python Flask service
-        const response = await axios.post(mlServiceUrl, { scores: psychometricScores });
-        predictedCareers = response.data?.predicted_careers || [];
+        // Persistent model worker; replaces the HTTP call to the Flask service
+        const [prediction] = await getModelWorker().predict([toModelScores(psychometricScores)]);
+        predictedCareers = prediction?.predicted_careers || [];
         console.log('ML service prediction successful:', predictedCareers);
       } catch (mlError) {
         console.error('Error calling ML service:', mlError);
@@ -0,0 +1,215 @@
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import * as net from 'net';
+import * as path from 'path';
+
+// Client for the persistent Python prediction worker (model_service.py).
+// Frames are little-endian: uint32 length, uint8 type, uint32 request id, payload.
+// See model_service.py for the payload layouts.
+
+const MESSAGE_INFO = 'I'.charCodeAt(0);
+const MESSAGE_PREDICT = 'P'.charCodeAt(0);
+const MESSAGE_ERROR = 'E'.charCodeAt(0);
+const FRAME_HEADER_SIZE = 9;
+const PREDICT_HEADER_SIZE = 6;
+
+export interface CareerPrediction {
+  predicted_careers: string[];
+  probabilities: number[];
+}
+
+interface WorkerInfo {
+  model_version: string | null;
+  careers: string[];
+  features: string[];
+  default_top_n: number;
+}
+
+interface PendingRequest {
+  resolve: (payload: Buffer) => void;
+  reject: (error: Error) => void;
+}
+
+type Transport = {
+  write: (data: Buffer) => void;
+  onData: (listener: (chunk: Buffer) => void) => void;
+  onClose: (listener: (error?: Error) => void) => void;
+  close: () => void;
+};
+
+function spawnTransport(): Transport {
+  const python = process.env.MODEL_WORKER_PYTHON || 'python3';
+  // Resolve from the sources so the same path works under ts-node (src/) and after tsc (dist/)
+  const script = path.join(__dirname, '..', '..', 'src', 'services', 'model_service.py');
+  const child: ChildProcessWithoutNullStreams = spawn(python, [script], { stdio: ['pipe', 'pipe', 'pipe'] });
+  child.stderr.on('data', (chunk: Buffer) => process.stderr.write(`[model worker] ${chunk}`));
+  return {
+    write: (data) => child.stdin.write(data),
+    onData: (listener) => child.stdout.on('data', listener),
+    onClose: (listener) => {
+      child.on('exit', (code) => listener(new Error(`Model worker exited with code ${code}`)));
+      child.on('error', listener);
+      // EPIPE and friends when the worker dies mid-write; without a listener they crash the server
+      child.stdin.on('error', listener);
+    },
+    close: () => child.kill(),
+  };
+}
+
+function socketTransport(socketPath: string): Transport {
+  const socket = net.createConnection(socketPath);
+  return {
+    write: (data) => socket.write(data),
+    onData: (listener) => socket.on('data', listener),
+    onClose: (listener) => {
+      socket.on('close', () => listener(new Error('Model worker connection closed')));
+      socket.on('error', listener);
+    },
+    close: () => socket.destroy(),
+  };
+}
+
+export class ModelWorker {
+  private transport: Transport;
+  private buffer = Buffer.alloc(0);
+  private nextId = 1;
+  private pending = new Map<number, PendingRequest>();
+  private info: Promise<WorkerInfo>;
+  closed = false;
+
+  constructor(socketPath: string | undefined = process.env.MODEL_WORKER_SOCKET) {
+    this.transport = socketPath ? socketTransport(socketPath) : spawnTransport();
+    this.transport.onData((chunk) => this.receive(chunk));
+    this.transport.onClose((error) => this.fail(error || new Error('Model worker closed')));
+    this.info = this.request(MESSAGE_INFO, Buffer.alloc(0)).then((payload) => JSON.parse(payload.toString('utf8')));
+  }
+
+  private request(type: number, payload: Buffer): Promise<Buffer> {
+    if (this.closed) {
+      return Promise.reject(new Error('Model worker is not running'));
+    }
+    const id = this.nextId;
+    this.nextId = (this.nextId % 0xffffffff) + 1;
+    const header = Buffer.alloc(FRAME_HEADER_SIZE);
+    header.writeUInt32LE(payload.length + FRAME_HEADER_SIZE - 4, 0);
+    header.writeUInt8(type, 4);
+    header.writeUInt32LE(id, 5);
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.transport.write(Buffer.concat([header, payload]));
+    });
+  }
+
+  private receive(chunk: Buffer): void {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+    while (this.buffer.length >= 4) {
+      const frameSize = this.buffer.readUInt32LE(0) + 4;
+      if (this.buffer.length < frameSize) {
+        return;
+      }
+      const type = this.buffer.readUInt8(4);
+      const id = this.buffer.readUInt32LE(5);
+      const payload = this.buffer.subarray(FRAME_HEADER_SIZE, frameSize);
+      this.buffer = this.buffer.subarray(frameSize);
+
+      const pending = this.pending.get(id);
+      if (!pending) {
+        continue;
+      }
+      this.pending.delete(id);
+      if (type === MESSAGE_ERROR) {
+        pending.reject(new Error(payload.toString('utf8')));
+      } else {
+        pending.resolve(Buffer.from(payload));
+      }
+    }
+  }
+
+  // Reject everything in flight and stop the worker; getModelWorker starts a fresh one on the next call
+  private fail(error: Error): void {
+    if (!this.closed) {
+      this.closed = true;
+      this.transport.close();
+    }
+    for (const pending of this.pending.values()) {
+      pending.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  // Predict the top careers for each profile; scores are keyed like the ML service (snake_case)
+  async predict(profiles: Record<string, unknown>[], topN?: number): Promise<CareerPrediction[]> {
+    const info = await this.info;
+    const features = info.features;
+    const payload = Buffer.alloc(PREDICT_HEADER_SIZE + profiles.length * features.length * 8);
+    payload.writeUInt16LE(topN ?? info.default_top_n, 0);
+    payload.writeUInt32LE(profiles.length, 2);
+    let offset = PREDICT_HEADER_SIZE;
+    for (const scores of profiles) {
+      for (const feature of features) {
+        // Missing scores default to 0 and anything else must be a number, as in the ML service
+        const value = scores[feature] ?? 0;
+        if (typeof value !== 'number' || !Number.isFinite(value)) {
+          throw new Error(`Score for ${feature} must be a number, got ${JSON.stringify(value)}`);
+        }
+        payload.writeDoubleLE(value, offset);
+        offset += 8;
+      }
+    }
+
+    const reply = await this.request(MESSAGE_PREDICT, payload);
+    const replyTopN = reply.readUInt16LE(0);
+    const rows = reply.readUInt32LE(2);
+    const probabilitiesOffset = PREDICT_HEADER_SIZE + rows * replyTopN * 2;
+    const predictions: CareerPrediction[] = [];
+    for (let row = 0; row < rows; row++) {
+      const prediction: CareerPrediction = { predicted_careers: [], probabilities: [] };
+      for (let rank = 0; rank < replyTopN; rank++) {
+        const cell = row * replyTopN + rank;
+        prediction.predicted_careers.push(info.careers[reply.readUInt16LE(PREDICT_HEADER_SIZE + cell * 2)]);
+        prediction.probabilities.push(reply.readFloatLE(probabilitiesOffset + cell * 4));
+      }
+      predictions.push(prediction);
+    }
+    return predictions;
+  }
+
+  close(): void {
+    this.closed = true;
+    this.transport.close();
+  }
+}
+
+// Map the stored test scores (camelCase, grouped into abilities and orientations)
+// onto the snake_case feature names used by the ML service
+export function toModelScores(scores: any): Record<string, unknown> {
+  if (!scores?.abilities && !scores?.orientations) {
+    return scores || {};
+  }
+  const abilities = scores.abilities || {};
+  const orientations = scores.orientations || {};
+  return {
+    cognition: abilities.cognition,
+    reasoning: abilities.reasoning,
+    figural_memory: abilities.figuralMemory,
+    spatial_ability: abilities.spatialAbility,
+    verbal_ability: abilities.verbalAbility,
+    social_ability: abilities.socialAbility,
+    numerical_ability: abilities.numericalAbility,
+    numerical_memory: abilities.numericalMemory,
+    knowledge: orientations.knowledge,
+    practical: orientations.practical,
+    artistic: orientations.artistic,
+    social: orientations.social,
+    power_coping: orientations.powerCopingStyle,
+  };
+}
+
+let worker: ModelWorker | null = null;
+
+// Shared worker, restarted on the next call if it has died
+export function getModelWorker(): ModelWorker {
+  if (!worker || worker.closed) {
+    worker = new ModelWorker();
+  }
+  return worker;
+}
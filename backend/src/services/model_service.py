@@ -1,54 +1,191 @@
-import numpy as np
-import joblib
+"""Long-lived career prediction worker for the Node backend.
+
+The worker loads the model once and answers predictions over a compact framed
+binary protocol, either on stdin/stdout (when spawned by the backend) or on a
+Unix domain socket. It uses the same ``Predictor`` and feature schema as
+``ML/app.py``, so results match the HTTP service exactly.
+
+Every frame, in both directions, is little-endian::
+
+    uint32 length       bytes that follow (type + request id + payload)
+    uint8  type         b'I' info, b'P' predict, b'E' error (replies only)
+    uint32 request_id   echoed back so the client can pipeline requests
+    payload
+
+Payloads:
+
+* ``I`` request: empty. Reply: UTF-8 JSON with the model version, the career
+  names indexed by class and the feature order of predict rows.
+* ``P`` request: ``uint16 top_n, uint32 n_rows, float64[n_rows * 13]`` with the
+  scores of each row in ``DIRECT_SCORE_FEATURES`` order. Reply:
+  ``uint16 top_n, uint32 n_rows, uint16[n_rows * top_n]`` class indices, best
+  first, then ``float32[n_rows * top_n]`` probabilities.
+* ``E`` reply: UTF-8 error message.
+
+Usage:
+    python model_service.py                 # serve on stdin/stdout
+    python model_service.py --socket PATH   # serve on a Unix domain socket
+"""
+import argparse
+import json
 import os
-from typing import List, Dict
+import socketserver
+import struct
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Share the prediction core with the ML service
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../ML'))
+from inference import DIRECT_SCORE_FEATURES
+from predictor import DEFAULT_TOP_N, MAX_BATCH_SIZE, load_predictor
+
+FRAME_HEADER = struct.Struct('<IBI')
+PREDICT_HEADER = struct.Struct('<HI')
+
+MESSAGE_INFO = ord('I')
+MESSAGE_PREDICT = ord('P')
+MESSAGE_ERROR = ord('E')
+
+# Largest frame accepted from a client: a full batch of float64 rows plus headers
+MAX_FRAME_BYTES = PREDICT_HEADER.size + MAX_BATCH_SIZE * len(DIRECT_SCORE_FEATURES) * 8 + 64
+
 
 class ModelService:
-    def __init__(self):
-        # Load the model from the saved file
-        model_path = os.path.join(os.path.dirname(__file__), '../../models/career_model_pipeline.pkl')
-        self.model = joblib.load(model_path)
-        
-        # Define the career categories
-        self.career_categories = [
-            'Software Engineer', 'Data Scientist', 'Product Manager',
-            'Business Analyst', 'UX Designer', 'Project Manager',
-            'Marketing Manager', 'Financial Analyst', 'HR Manager',
-            'Sales Representative'
-        ]
-
-    def predict_careers(self, scores: Dict[str, float]) -> List[str]:
+    def __init__(self, model_path: str = None):
+        # Load the model once; MODEL_ENGINE and INFERENCE_MODE apply as in the ML service
+        self.predictor = load_predictor(model_path)
+        if self.predictor is None:
+            raise RuntimeError("Model could not be loaded")
+
+        # Career names straight from the fitted encoder, indexed by class
+        self.career_categories = [str(career) for career in self.predictor.encoder.classes_]
+
+    def info(self) -> Dict:
+        return {
+            'model_version': self.predictor.version,
+            'engine': self.predictor.engine,
+            'careers': self.career_categories,
+            'features': DIRECT_SCORE_FEATURES,
+            'default_top_n': DEFAULT_TOP_N,
+        }
+
+    def predict_careers(self, scores: Dict[str, float], top_n: int = DEFAULT_TOP_N) -> List[str]:
         """
         Predict career recommendations based on test scores.
-        
+
         Args:
-            scores: Dictionary containing ability and orientation scores
-            
+            scores: Dictionary of direct scores keyed like the ML service (snake_case)
+            top_n: Number of careers to return
+
         Returns:
-            List of recommended careers
+            List of recommended careers, best first
         """
-        # Extract scores in the correct order
-        input_vector = np.array([
-            scores['cognition'],
-            scores['reasoning'],
-            scores['figuralMemory'],
-            scores['spatialAbility'],
-            scores['verbalAbility'],
-            scores['numericalAbility'],
-            scores['numericalMemory'],
-            scores['socialAbility'],
-            scores['knowledge'],
-            scores['practical'],
-            scores['artistic'],
-            scores['social'],
-            scores['powerCopingStyle']
-        ]).reshape(1, -1)
-
-        # Get model predictions
-        predictions = self.model.predict_proba(input_vector)[0]
-        
-        # Get top 3 career recommendations
-        top_indices = np.argsort(predictions)[-3:][::-1]
-        recommendations = [self.career_categories[i] for i in top_indices]
-        
-        return recommendations
\ No newline at end of file
+        careers, _ = self.predictor.predict_score_rows([scores], self.predictor.clamp_top_n(top_n))
+        return careers[0].tolist()
+
+    def predict_matrix(self, matrix: np.ndarray, top_n: int = DEFAULT_TOP_N) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (class indices, probabilities) of the top_n careers for each row of scores."""
+        input_scaled = self.predictor.scale_score_matrix(matrix)
+        return self.predictor.top_n_indices(input_scaled, self.predictor.clamp_top_n(top_n))
+
+    # --- Framed protocol ---
+
+    def handle(self, message_type: int, payload: bytes) -> Tuple[int, bytes]:
+        """Answer one request frame; returns the reply type and payload."""
+        if message_type == MESSAGE_INFO:
+            return MESSAGE_INFO, json.dumps(self.info()).encode()
+
+        if message_type == MESSAGE_PREDICT:
+            top_n, n_rows = PREDICT_HEADER.unpack_from(payload)
+            if n_rows > MAX_BATCH_SIZE:
+                raise ValueError(f"Batch size exceeds the limit of {MAX_BATCH_SIZE}")
+            expected = PREDICT_HEADER.size + n_rows * len(DIRECT_SCORE_FEATURES) * 8
+            if len(payload) != expected:
+                raise ValueError(f"Predict payload is {len(payload)} bytes, expected {expected}")
+            matrix = np.frombuffer(payload, dtype='<f8', offset=PREDICT_HEADER.size)
+            matrix = matrix.reshape(n_rows, len(DIRECT_SCORE_FEATURES))
+
+            indices, probabilities = self.predict_matrix(matrix, top_n)
+            return MESSAGE_PREDICT, b''.join([
+                PREDICT_HEADER.pack(indices.shape[1], n_rows),
+                indices.astype('<u2').tobytes(),
+                probabilities.astype('<f4').tobytes(),
+            ])
+
+        raise ValueError(f"Unknown message type {message_type!r}")
+
+    def serve_stream(self, reader, writer) -> None:
+        """Answer frames from reader on writer until the client closes the stream."""
+        while True:
+            header = read_exactly(reader, FRAME_HEADER.size)
+            if header is None:
+                return
+            length, message_type, request_id = FRAME_HEADER.unpack(header)
+            payload_length = length - (FRAME_HEADER.size - 4)
+            if not 0 <= payload_length <= MAX_FRAME_BYTES:
+                write_frame(writer, MESSAGE_ERROR, request_id, b"Frame too large")
+                return
+            payload = read_exactly(reader, payload_length)
+            if payload is None:
+                return
+
+            try:
+                reply_type, reply = self.handle(message_type, payload)
+            except Exception as e:
+                reply_type, reply = MESSAGE_ERROR, str(e).encode()
+            write_frame(writer, reply_type, request_id, reply)
+
+
+def read_exactly(reader, size: int):
+    """Read size bytes, or return None at end of stream."""
+    chunks = []
+    while size:
+        chunk = reader.read(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def write_frame(writer, message_type: int, request_id: int, payload: bytes) -> None:
+    writer.write(FRAME_HEADER.pack(len(payload) + FRAME_HEADER.size - 4, message_type, request_id) + payload)
+    writer.flush()
+
+
+def serve_socket(service: ModelService, path: str) -> None:
+    """Serve the framed protocol on a Unix domain socket, one thread per connection."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            service.serve_stream(self.rfile, self.wfile)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        print(f"Model worker listening on {path}", file=sys.stderr)
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent career prediction worker")
+    parser.add_argument('--socket', default=os.environ.get('MODEL_WORKER_SOCKET'),
+                        help="Unix domain socket to listen on (default: serve on stdin/stdout)")
+    parser.add_argument('--model', default=None, help="Model artifact (default: resolved automatically)")
+    args = parser.parse_args()
+
+    # Frames own stdout in stdio mode, so everything printed goes to stderr
+    frames_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
+
+    service = ModelService(args.model)
+    if args.socket:
+        serve_socket(service, args.socket)
+    else:
+        service.serve_stream(sys.stdin.buffer, frames_out)
+
+
+if __name__ == '__main__':
+    main()
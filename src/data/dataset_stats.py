@@ -0,0 +1,227 @@
+"""Single-pass statistics over the career dataset, for datasets larger than memory.
+
+``StreamingStats`` takes the dataset one chunk at a time and keeps:
+
+* the pooled mean, minimum, maximum and co-moment matrix of the score columns,
+  from which the covariance and correlation matrices follow;
+* the count, mean and second moment of every score per career.
+
+Each chunk is summarised with vectorized NumPy calls and folded in with the
+pairwise update of Chan, Golub and LeVeque, which stays numerically stable over
+any number of chunks. Two ``StreamingStats`` built from different parts of a
+dataset (e.g. in worker processes) can be merged the same way.
+
+Usage:
+    python dataset_stats.py ../../career_dataset.csv
+    python dataset_stats.py ../../career_dataset.cbin --threshold 0.4 --top 5
+"""
+import argparse
+import os
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../ML'))
+from dataset_store import CHUNK_ROWS, LABEL_COLUMN, ColumnarDataset, is_columnar
+
+
+class StreamingStats:
+    """Correlations of the score columns and per-career score statistics, accumulated chunk by chunk."""
+
+    def __init__(self, features: List[str], categories: Iterable[str] = ()):
+        self.features = list(features)
+        n_features = len(self.features)
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        # Sum of outer products of the deviations from the mean
+        self.m2 = np.zeros((n_features, n_features))
+        self.minimum = np.full(n_features, np.inf)
+        self.maximum = np.full(n_features, -np.inf)
+
+        self.categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.career_count = np.zeros(0, dtype=np.int64)
+        self.career_mean = np.zeros((0, n_features))
+        self.career_m2 = np.zeros((0, n_features))
+        self.add_categories(categories)
+
+    def add_categories(self, categories: Iterable[str]) -> None:
+        new = [str(category) for category in dict.fromkeys(categories) if str(category) not in self._codes]
+        if not new:
+            return
+        for category in new:
+            self._codes[category] = len(self.categories)
+            self.categories.append(category)
+        padding = np.zeros((len(new), len(self.features)))
+        self.career_count = np.concatenate([self.career_count, np.zeros(len(new), dtype=np.int64)])
+        self.career_mean = np.vstack([self.career_mean, padding])
+        self.career_m2 = np.vstack([self.career_m2, padding])
+
+    # --- Accumulation ---
+
+    def update(self, matrix: np.ndarray, codes: np.ndarray) -> None:
+        """Add a chunk: a (rows, features) score matrix and each row's index into self.categories."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        codes = np.asarray(codes, dtype=np.intp)
+        if len(matrix) == 0:
+            return
+
+        chunk_mean = matrix.mean(axis=0)
+        centred = matrix - chunk_mean
+        self._merge_pooled(len(matrix), chunk_mean, centred.T @ centred)
+        self.minimum = np.minimum(self.minimum, matrix.min(axis=0))
+        self.maximum = np.maximum(self.maximum, matrix.max(axis=0))
+
+        n_categories = len(self.categories)
+        counts = np.bincount(codes, minlength=n_categories)
+        sums = np.stack([np.bincount(codes, weights=column, minlength=n_categories) for column in matrix.T], axis=1)
+        means = sums / np.maximum(counts, 1)[:, None]
+        deviations = matrix - means[codes]
+        m2 = np.stack([np.bincount(codes, weights=column * column, minlength=n_categories)
+                       for column in deviations.T], axis=1)
+        self._merge_careers(counts, means, m2)
+
+    def update_frame(self, df: pd.DataFrame, label_column: str = LABEL_COLUMN) -> None:
+        """Add a chunk given as a DataFrame with the score columns and the career label."""
+        labels = df[label_column].astype(str)
+        self.add_categories(labels.unique())
+        self.update(df[self.features].to_numpy(), labels.map(self._codes).to_numpy())
+
+    def merge(self, other: 'StreamingStats') -> None:
+        """Fold in statistics accumulated separately over other rows of the same dataset."""
+        if other.features != self.features:
+            raise ValueError("Cannot merge statistics over different features")
+        self._merge_pooled(other.count, other.mean, other.m2)
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+
+        self.add_categories(other.categories)
+        index = np.array([self._codes[category] for category in other.categories], dtype=np.intp)
+        counts = np.zeros_like(self.career_count)
+        means = np.zeros_like(self.career_mean)
+        m2 = np.zeros_like(self.career_m2)
+        counts[index] = other.career_count
+        means[index] = other.career_mean
+        m2[index] = other.career_m2
+        self._merge_careers(counts, means, m2)
+
+    def _merge_pooled(self, count: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + np.outer(delta, delta) * (self.count * count / total)
+        self.count = total
+
+    def _merge_careers(self, counts: np.ndarray, means: np.ndarray, m2: np.ndarray) -> None:
+        total = self.career_count + counts
+        weight = (counts / np.maximum(total, 1))[:, None]
+        delta = means - self.career_mean
+        self.career_mean = self.career_mean + delta * weight
+        self.career_m2 = self.career_m2 + m2 + delta * delta * (self.career_count[:, None] * weight)
+        self.career_count = total
+
+    # --- Results ---
+
+    def covariance(self) -> pd.DataFrame:
+        return pd.DataFrame(self.m2 / max(self.count - 1, 1), index=self.features, columns=self.features)
+
+    def correlation(self) -> pd.DataFrame:
+        std = np.sqrt(np.diag(self.m2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = self.m2 / np.outer(std, std)
+        return pd.DataFrame(correlation, index=self.features, columns=self.features)
+
+    def strong_correlations(self, threshold: float = 0.5) -> List[Tuple[str, str, float]]:
+        """Feature pairs with |correlation| above threshold, strongest first."""
+        correlation = self.correlation().to_numpy()
+        rows, columns = np.triu_indices(len(self.features), k=1)
+        values = correlation[rows, columns]
+        strong = np.flatnonzero(np.abs(values) > threshold)
+        strong = strong[np.argsort(-np.abs(values[strong]), kind='stable')]
+        return [(self.features[rows[i]], self.features[columns[i]], float(values[i])) for i in strong]
+
+    def career_counts(self) -> pd.Series:
+        """Rows per career, most frequent first."""
+        present = self.career_count > 0
+        counts = pd.Series(self.career_count[present], index=np.array(self.categories)[present], name='count')
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def career_means(self) -> pd.DataFrame:
+        present = self.career_count > 0
+        return pd.DataFrame(self.career_mean[present], index=np.array(self.categories)[present],
+                            columns=self.features)
+
+    def career_std(self) -> pd.DataFrame:
+        """Per-career sample standard deviations (NaN for careers with a single row), as pandas computes them."""
+        present = self.career_count > 0
+        count = self.career_count[present][:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = np.where(count > 1, self.career_m2[present] / (count - 1), np.nan)
+        return pd.DataFrame(np.sqrt(variance), index=np.array(self.categories)[present], columns=self.features)
+
+
+def top_careers(values: pd.DataFrame, k: int = 3) -> Dict[str, pd.Series]:
+    """The k largest careers of every column, in one argsort (ties keep the first career, like nlargest)."""
+    matrix = values.to_numpy()
+    # NaN sorts last, so careers without a value only appear when fewer than k have one
+    order = np.argsort(-matrix, axis=0, kind='stable')[:k]
+    return {
+        feature: pd.Series(matrix[order[:, j], j], index=values.index[order[:, j]]).dropna()
+        for j, feature in enumerate(values.columns)
+    }
+
+
+def stats_from_dataset(path: str, features: List[str] = None, chunk_rows: int = CHUNK_ROWS) -> StreamingStats:
+    """Accumulate statistics over a CSV or columnar dataset in one pass, chunk_rows rows at a time."""
+    if is_columnar(path):
+        dataset = ColumnarDataset(path)
+        label_column = dataset.label_column
+        features = features or [column for column in dataset.columns if column != label_column]
+        stats = StreamingStats(features, dataset.categories)
+        # Columnar labels are already codes into the dataset's dictionary
+        codes = dataset.column(label_column)
+        for start in range(0, len(dataset), chunk_rows):
+            stats.update(dataset.matrix(features, start, start + chunk_rows), codes[start:start + chunk_rows])
+        return stats
+
+    if features is None:
+        features = [column for column in pd.read_csv(path, nrows=0).columns if column != LABEL_COLUMN]
+    stats = StreamingStats(features)
+    for chunk in pd.read_csv(path, usecols=features + [LABEL_COLUMN], chunksize=chunk_rows):
+        stats.update_frame(chunk)
+    return stats
+
+
+def print_report(stats: StreamingStats, threshold: float = 0.5, top: int = 3) -> None:
+    print(f"\n{stats.count} rows, {int((stats.career_count > 0).sum())} careers")
+
+    print("\nCorrelation Matrix:")
+    print(stats.correlation())
+
+    print(f"\nStrong Correlations (|correlation| > {threshold}):")
+    for feature1, feature2, correlation in stats.strong_correlations(threshold):
+        print(f"{feature1} - {feature2}: {correlation:.3f}")
+
+    for feature, careers in top_careers(stats.career_means(), top).items():
+        print(f"\nTop {top} careers for {feature}:")
+        for career, score in careers.items():
+            print(f"  {career}: {score:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-pass statistics over a career dataset")
+    parser.add_argument('dataset', help="CSV or columnar (.cbin) dataset")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Report correlations stronger than this")
+    parser.add_argument('--top', type=int, default=3, help="Careers listed per feature")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    print_report(stats_from_dataset(args.dataset, chunk_rows=args.chunk_rows), args.threshold, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,19 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
 import random
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+# Share the dataset file format with the ML service
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../ML'))
+from dataset_store import ColumnarWriter, is_columnar, write_columnar
+from dataset_stats import StreamingStats, top_careers
 
 # Define abilities and orientations
 ABILITIES = [
@@ -27,389 +37,335 @@ CORRELATED_PAIRS = [
     ('social_ability', 'power_coping', 0.3)
 ]
 
-# Define career categories and their required patterns
+FEATURES = ABILITIES + ORIENTATIONS
+
+# Scores a career requires are drawn within +-REQUIRED_SPREAD of the required level,
+# the others from UNREQUIRED_RANGE, and everything is kept inside SCORE_RANGE
+REQUIRED_SPREAD = 10.0
+UNREQUIRED_RANGE = (40.0, 80.0)
+SCORE_RANGE = (1.0, 100.0)
+
+DEFAULT_SEED = 42
+
+# Rows generated, shuffled and written at a time when streaming
+DEFAULT_CHUNK_SIZE = 100000
+
+# Define the careers' required patterns; their categories are in ML/career_categories.py
 CAREER_PATTERNS = {
     # Traditional Indian Government Careers
     'IAS Officer': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'verbal_ability': 0.7, 'social_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'power_coping': 0.7},
-        'category': 'Government'
+        'orientations': {'knowledge': 0.8, 'power_coping': 0.7}
     },
     'IPS Officer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'social_ability': 0.8, 'power_coping': 0.8},
-        'orientations': {'practical': 0.8, 'power_coping': 0.8},
-        'category': 'Government'
+        'orientations': {'practical': 0.8, 'power_coping': 0.8}
     },
     'IFS Officer': {
         'abilities': {'verbal_ability': 0.8, 'social_ability': 0.8, 'cognition': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.8},
-        'category': 'Government'
+        'orientations': {'knowledge': 0.8, 'social': 0.8}
     },
     'IRS Officer': {
         'abilities': {'numerical_ability': 0.8, 'reasoning': 0.7, 'cognition': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Government'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'IES Officer': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Government'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     
     # IT/Software Careers
     'Software Engineer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'numerical_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'IT'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Data Scientist': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'IT'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'AI Engineer': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'IT'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Cloud Architect': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'spatial_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'IT'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'DevOps Engineer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'practical': 0.8},
-        'orientations': {'practical': 0.9, 'knowledge': 0.7},
-        'category': 'IT'
+        'orientations': {'practical': 0.9, 'knowledge': 0.7}
     },
     
     # Healthcare Careers
     'Medical Doctor': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'social_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.7},
-        'category': 'Healthcare'
+        'orientations': {'knowledge': 0.8, 'social': 0.7}
     },
     'Ayurvedic Doctor': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'social_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.7},
-        'category': 'Healthcare'
+        'orientations': {'knowledge': 0.8, 'social': 0.7}
     },
     'Homeopathic Doctor': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'social_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.7},
-        'category': 'Healthcare'
+        'orientations': {'knowledge': 0.8, 'social': 0.7}
     },
     'Dental Surgeon': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'spatial_ability': 0.8},
-        'orientations': {'practical': 0.8, 'social': 0.7},
-        'category': 'Healthcare'
+        'orientations': {'practical': 0.8, 'social': 0.7}
     },
     'Ayurvedic Pharmacist': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'figural_memory': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Healthcare'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     
     # Finance Careers
     'Chartered Accountant': {
         'abilities': {'numerical_ability': 0.8, 'reasoning': 0.7, 'cognition': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Finance'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Investment Banker': {
         'abilities': {'numerical_ability': 0.8, 'reasoning': 0.8, 'social_ability': 0.7},
-        'orientations': {'practical': 0.8, 'power_coping': 0.7},
-        'category': 'Finance'
+        'orientations': {'practical': 0.8, 'power_coping': 0.7}
     },
     'Actuary': {
         'abilities': {'numerical_ability': 0.9, 'reasoning': 0.8, 'cognition': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Finance'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Financial Analyst': {
         'abilities': {'numerical_ability': 0.8, 'reasoning': 0.7, 'cognition': 0.7},
-        'orientations': {'practical': 0.7, 'knowledge': 0.7},
-        'category': 'Finance'
+        'orientations': {'practical': 0.7, 'knowledge': 0.7}
     },
     'Stock Market Trader': {
         'abilities': {'numerical_ability': 0.8, 'reasoning': 0.8, 'power_coping': 0.8},
-        'orientations': {'practical': 0.8, 'power_coping': 0.8},
-        'category': 'Finance'
+        'orientations': {'practical': 0.8, 'power_coping': 0.8}
     },
     
     # Creative Careers
     'UX Designer': {
         'abilities': {'spatial_ability': 0.7, 'social_ability': 0.7, 'cognition': 0.6},
-        'orientations': {'artistic': 0.8, 'practical': 0.7},
-        'category': 'Creative'
+        'orientations': {'artistic': 0.8, 'practical': 0.7}
     },
     'Digital Artist': {
         'abilities': {'spatial_ability': 0.8, 'figural_memory': 0.7, 'artistic': 0.8},
-        'orientations': {'artistic': 0.9, 'practical': 0.6},
-        'category': 'Creative'
+        'orientations': {'artistic': 0.9, 'practical': 0.6}
     },
     'Animation Artist': {
         'abilities': {'spatial_ability': 0.8, 'figural_memory': 0.8, 'artistic': 0.8},
-        'orientations': {'artistic': 0.9, 'practical': 0.7},
-        'category': 'Creative'
+        'orientations': {'artistic': 0.9, 'practical': 0.7}
     },
     'Fashion Designer': {
         'abilities': {'spatial_ability': 0.8, 'artistic': 0.8, 'social_ability': 0.6},
-        'orientations': {'artistic': 0.9, 'practical': 0.7},
-        'category': 'Creative'
+        'orientations': {'artistic': 0.9, 'practical': 0.7}
     },
     'Interior Designer': {
         'abilities': {'spatial_ability': 0.8, 'artistic': 0.7, 'social_ability': 0.6},
-        'orientations': {'artistic': 0.8, 'practical': 0.7},
-        'category': 'Creative'
+        'orientations': {'artistic': 0.8, 'practical': 0.7}
     },
     
     # Emerging Careers
     'Blockchain Developer': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Robotics Engineer': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'spatial_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'AR/VR Developer': {
         'abilities': {'spatial_ability': 0.8, 'cognition': 0.7, 'artistic': 0.6},
-        'orientations': {'practical': 0.8, 'artistic': 0.7},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'artistic': 0.7}
     },
     'Drone Pilot': {
         'abilities': {'spatial_ability': 0.8, 'cognition': 0.7, 'practical': 0.8},
-        'orientations': {'practical': 0.9, 'knowledge': 0.7},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.9, 'knowledge': 0.7}
     },
     'Space Scientist': {
         'abilities': {'cognition': 0.9, 'reasoning': 0.8, 'numerical_ability': 0.8},
-        'orientations': {'knowledge': 0.9, 'practical': 0.7},
-        'category': 'Emerging'
+        'orientations': {'knowledge': 0.9, 'practical': 0.7}
     },
     
     # Lesser-known Careers
     'Ethical Hacker': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'IT'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Forensic Scientist': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'figural_memory': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Science'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Food Technologist': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'practical': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Science'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Gemologist': {
         'abilities': {'spatial_ability': 0.8, 'figural_memory': 0.8, 'practical': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Science'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Meteorologist': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'numerical_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'practical': 0.7},
-        'category': 'Science'
+        'orientations': {'knowledge': 0.8, 'practical': 0.7}
     },
     
     # Traditional Indian Careers
     'Vedic Scholar': {
         'abilities': {'verbal_ability': 0.8, 'cognition': 0.7, 'figural_memory': 0.7},
-        'orientations': {'knowledge': 0.9, 'social': 0.7},
-        'category': 'Traditional'
+        'orientations': {'knowledge': 0.9, 'social': 0.7}
     },
     'Yoga Instructor': {
         'abilities': {'spatial_ability': 0.7, 'social_ability': 0.8, 'practical': 0.8},
-        'orientations': {'social': 0.8, 'practical': 0.8},
-        'category': 'Traditional'
+        'orientations': {'social': 0.8, 'practical': 0.8}
     },
     'Astrologer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'numerical_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.7},
-        'category': 'Traditional'
+        'orientations': {'knowledge': 0.8, 'social': 0.7}
     },
     'Ayurvedic Therapist': {
         'abilities': {'social_ability': 0.8, 'practical': 0.8, 'cognition': 0.6},
-        'orientations': {'social': 0.8, 'practical': 0.8},
-        'category': 'Traditional'
+        'orientations': {'social': 0.8, 'practical': 0.8}
     },
     'Vastu Consultant': {
         'abilities': {'spatial_ability': 0.8, 'reasoning': 0.7, 'social_ability': 0.6},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Traditional'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     
     # Education Careers
     'School Teacher': {
         'abilities': {'verbal_ability': 0.8, 'social_ability': 0.8, 'cognition': 0.7},
-        'orientations': {'social': 0.8, 'knowledge': 0.7},
-        'category': 'Education'
+        'orientations': {'social': 0.8, 'knowledge': 0.7}
     },
     'Professor': {
         'abilities': {'cognition': 0.8, 'verbal_ability': 0.8, 'knowledge': 0.8},
-        'orientations': {'knowledge': 0.9, 'social': 0.7},
-        'category': 'Education'
+        'orientations': {'knowledge': 0.9, 'social': 0.7}
     },
     'Educational Counselor': {
         'abilities': {'social_ability': 0.8, 'verbal_ability': 0.7, 'cognition': 0.7},
-        'orientations': {'social': 0.8, 'knowledge': 0.7},
-        'category': 'Education'
+        'orientations': {'social': 0.8, 'knowledge': 0.7}
     },
     'Special Educator': {
         'abilities': {'social_ability': 0.9, 'verbal_ability': 0.7, 'cognition': 0.7},
-        'orientations': {'social': 0.9, 'practical': 0.7},
-        'category': 'Education'
+        'orientations': {'social': 0.9, 'practical': 0.7}
     },
     'Career Counselor': {
         'abilities': {'social_ability': 0.8, 'verbal_ability': 0.7, 'cognition': 0.7},
-        'orientations': {'social': 0.8, 'knowledge': 0.7},
-        'category': 'Education'
+        'orientations': {'social': 0.8, 'knowledge': 0.7}
     },
     
     # Legal Careers
     'Lawyer': {
         'abilities': {'verbal_ability': 0.8, 'reasoning': 0.8, 'cognition': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.7},
-        'category': 'Legal'
+        'orientations': {'knowledge': 0.8, 'social': 0.7}
     },
     'Judge': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.9, 'verbal_ability': 0.8},
-        'orientations': {'knowledge': 0.9, 'power_coping': 0.8},
-        'category': 'Legal'
+        'orientations': {'knowledge': 0.9, 'power_coping': 0.8}
     },
     'Legal Advisor': {
         'abilities': {'verbal_ability': 0.8, 'reasoning': 0.7, 'social_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'social': 0.7},
-        'category': 'Legal'
+        'orientations': {'knowledge': 0.8, 'social': 0.7}
     },
     'Corporate Lawyer': {
         'abilities': {'verbal_ability': 0.8, 'reasoning': 0.8, 'social_ability': 0.7},
-        'orientations': {'knowledge': 0.8, 'power_coping': 0.7},
-        'category': 'Legal'
+        'orientations': {'knowledge': 0.8, 'power_coping': 0.7}
     },
     'Criminal Lawyer': {
         'abilities': {'verbal_ability': 0.8, 'reasoning': 0.8, 'social_ability': 0.8},
-        'orientations': {'knowledge': 0.8, 'power_coping': 0.8},
-        'category': 'Legal'
+        'orientations': {'knowledge': 0.8, 'power_coping': 0.8}
     },
     
     # Agriculture Careers
     'Agricultural Scientist': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'practical': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Agriculture'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Horticulturist': {
         'abilities': {'spatial_ability': 0.7, 'practical': 0.8, 'cognition': 0.6},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Agriculture'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Agricultural Engineer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.7, 'practical': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Agriculture'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Organic Farmer': {
         'abilities': {'practical': 0.8, 'cognition': 0.6, 'social_ability': 0.6},
-        'orientations': {'practical': 0.9, 'knowledge': 0.6},
-        'category': 'Agriculture'
+        'orientations': {'practical': 0.9, 'knowledge': 0.6}
     },
     'Agricultural Economist': {
         'abilities': {'numerical_ability': 0.7, 'reasoning': 0.7, 'cognition': 0.7},
-        'orientations': {'practical': 0.7, 'knowledge': 0.7},
-        'category': 'Agriculture'
+        'orientations': {'practical': 0.7, 'knowledge': 0.7}
     },
     
     # Defense Careers
     'Army Officer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'power_coping': 0.9},
-        'orientations': {'practical': 0.8, 'power_coping': 0.9},
-        'category': 'Defense'
+        'orientations': {'practical': 0.8, 'power_coping': 0.9}
     },
     'Navy Officer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'spatial_ability': 0.8},
-        'orientations': {'practical': 0.8, 'power_coping': 0.8},
-        'category': 'Defense'
+        'orientations': {'practical': 0.8, 'power_coping': 0.8}
     },
     'Air Force Officer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'spatial_ability': 0.8},
-        'orientations': {'practical': 0.8, 'power_coping': 0.8},
-        'category': 'Defense'
+        'orientations': {'practical': 0.8, 'power_coping': 0.8}
     },
     'Defense Scientist': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Defense'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Military Engineer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'practical': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Defense'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
 
     # Emerging Tech Careers
     'AI/ML Specialist': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'numerical_ability': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Quantum Computing Engineer': {
         'abilities': {'cognition': 0.9, 'reasoning': 0.8, 'numerical_ability': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.9},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.9}
     },
     'Cybersecurity Analyst': {
         'abilities': {'cognition': 0.8, 'reasoning': 0.8, 'figural_memory': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.8},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.8}
     },
     'Digital Health Specialist': {
         'abilities': {'cognition': 0.7, 'social_ability': 0.8, 'numerical_ability': 0.7},
-        'orientations': {'practical': 0.8, 'social': 0.8},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'social': 0.8}
     },
     'Green Energy Engineer': {
         'abilities': {'cognition': 0.7, 'reasoning': 0.8, 'practical': 0.8},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     
     # Emerging Business Careers
     'Digital Marketing Strategist': {
         'abilities': {'social_ability': 0.8, 'verbal_ability': 0.7, 'numerical_ability': 0.6},
-        'orientations': {'practical': 0.7, 'artistic': 0.6},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.7, 'artistic': 0.6}
     },
     'E-commerce Specialist': {
         'abilities': {'numerical_ability': 0.7, 'social_ability': 0.7, 'cognition': 0.6},
-        'orientations': {'practical': 0.8, 'knowledge': 0.6},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.6}
     },
     'Sustainability Consultant': {
         'abilities': {'cognition': 0.7, 'social_ability': 0.7, 'practical': 0.7},
-        'orientations': {'practical': 0.8, 'social': 0.7},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'social': 0.7}
     },
     'FinTech Specialist': {
         'abilities': {'numerical_ability': 0.8, 'cognition': 0.7, 'reasoning': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     },
     'Business Intelligence Analyst': {
         'abilities': {'numerical_ability': 0.8, 'cognition': 0.7, 'reasoning': 0.7},
-        'orientations': {'practical': 0.8, 'knowledge': 0.7},
-        'category': 'Emerging'
+        'orientations': {'practical': 0.8, 'knowledge': 0.7}
     }
 }
 
 def generate_scores(career_pattern: Dict) -> Tuple[List[float], List[float]]:
-    """Generate realistic scores based on career pattern and correlations."""
+    """Generate realistic scores for one profile with the global random module.
+
+    Used for single profiles; datasets are drawn in bulk by sample_career_scores.
+    """
     abilities_scores = []
     orientations_scores = []
     
@@ -458,55 +414,227 @@ def generate_scores(career_pattern: Dict) -> Tuple[List[float], List[float]]:
     
     return abilities_scores, orientations_scores
 
-def generate_dataset(num_samples: int = 29000) -> pd.DataFrame:
-    """Generate the complete dataset."""
-    data = []
-    
-    # Calculate samples per career for balanced distribution
+def score_correlation_matrix() -> np.ndarray:
+    """Latent Gaussian correlation matrix that gives the scores the CORRELATED_PAIRS correlations.
+
+    Scores are drawn through a Gaussian copula, whose uniform marginals have Pearson
+    correlation (6 / pi) * asin(rho / 2) for a latent correlation rho, so each stated
+    correlation r is entered as 2 * sin(pi * r / 6).
+    """
+    index = {feature: i for i, feature in enumerate(FEATURES)}
+    matrix = np.eye(len(FEATURES))
+    for feature1, feature2, correlation in CORRELATED_PAIRS:
+        rho = 2 * np.sin(np.pi * correlation / 6)
+        matrix[index[feature1], index[feature2]] = matrix[index[feature2], index[feature1]] = rho
+
+    # Pairs are specified independently; clip to the nearest positive definite matrix if they conflict
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    if eigenvalues.min() < 1e-6:
+        matrix = eigenvectors @ np.diag(np.clip(eigenvalues, 1e-6, None)) @ eigenvectors.T
+        scale = np.sqrt(np.diag(matrix))
+        matrix = matrix / np.outer(scale, scale)
+    return matrix
+
+SCORE_CORRELATION = score_correlation_matrix()
+_SCORE_CHOLESKY = np.linalg.cholesky(SCORE_CORRELATION)
+
+def career_score_ranges(career_pattern: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Lower and upper bounds of the uniform score marginals of one career, in FEATURES order.
+
+    Each range has the mean and variance of the score ``generate_scores`` produces:
+    its draws are independent uniforms which the CORRELATED_PAIRS adjustments mix
+    linearly, so the adjustments are replayed on the mixing coefficients.
+    """
+    index = {feature: i for i, feature in enumerate(FEATURES)}
+    draw_means = np.empty(len(FEATURES))
+    draw_half_widths = np.empty(len(FEATURES))
+    for group, features in (('abilities', ABILITIES), ('orientations', ORIENTATIONS)):
+        for feature in features:
+            if feature in career_pattern[group]:
+                draw_means[index[feature]] = career_pattern[group][feature] * 100
+                draw_half_widths[index[feature]] = REQUIRED_SPREAD
+            else:
+                draw_means[index[feature]] = sum(UNREQUIRED_RANGE) / 2
+                draw_half_widths[index[feature]] = (UNREQUIRED_RANGE[1] - UNREQUIRED_RANGE[0]) / 2
+
+    # Row i holds the weights of the independent draws in score i, in the order generate_scores applies them
+    mixing = np.eye(len(FEATURES))
+    for targets in (ABILITIES, ORIENTATIONS):
+        for feature1, feature2, correlation in CORRELATED_PAIRS:
+            if feature1 in ABILITIES and feature2 in targets:
+                i, j = index[feature1], index[feature2]
+                mixing[j] += (mixing[i] - mixing[j]) * correlation
+
+    centre = mixing @ draw_means
+    # A uniform of half-width h has variance h^2 / 3
+    half_width = np.sqrt(mixing ** 2 @ draw_half_widths ** 2)
+    return np.maximum(centre - half_width, SCORE_RANGE[0]), np.minimum(centre + half_width, SCORE_RANGE[1])
+
+def sample_career_scores(career_pattern: Dict, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw num_samples score rows for one career in a single vectorized call, in FEATURES order."""
+    # scipy takes longer to import than a small dataset takes to generate, so load it on first use
+    from scipy.special import ndtr
+
+    low, high = career_score_ranges(career_pattern)
+    latent = rng.standard_normal((num_samples, len(FEATURES))) @ _SCORE_CHOLESKY.T
+    return low + ndtr(latent) * (high - low)
+
+def career_sample_counts(num_samples: int) -> List[int]:
+    """Rows per career: an even split, with the remainder going to the first careers."""
+    samples_per_career, remaining_samples = divmod(num_samples, len(CAREER_PATTERNS))
+    return [samples_per_career + (1 if i < remaining_samples else 0) for i in range(len(CAREER_PATTERNS))]
+
+def chunk_plan(num_samples: int, seed: int = DEFAULT_SEED, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield (career counts, seed sequence) for each chunk of the dataset.
+
+    How many rows of each career land in a chunk follows a sequential multivariate
+    hypergeometric draw over the remaining rows, which is exactly how a uniform
+    shuffle of the whole dataset would split it into chunks, so shuffling within
+    each chunk gives a fully shuffled dataset without holding it in memory.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    layout_seed, chunks_seed = np.random.SeedSequence(seed).spawn(2)
+    layout_rng = np.random.default_rng(layout_seed)
+    remaining = np.array(career_sample_counts(num_samples), dtype=np.int64)
+    for start in range(0, num_samples, chunk_size):
+        size = min(chunk_size, num_samples - start)
+        counts = layout_rng.multivariate_hypergeometric(remaining, size)
+        remaining -= counts
+        yield counts, chunks_seed.spawn(1)[0]
+
+def generate_chunk(counts: np.ndarray, chunk_seed: np.random.SeedSequence) -> pd.DataFrame:
+    """Generate and shuffle one chunk: counts[i] rows of the i-th career.
+
+    Every career draws its rows at once from its own random stream, spawned from
+    chunk_seed, and the rows are shuffled with one more stream.
+    """
     careers = list(CAREER_PATTERNS.keys())
-    samples_per_career = num_samples // len(careers)
-    remaining_samples = num_samples % len(careers)
-    
-    for career in careers:
-        num_career_samples = samples_per_career + (1 if remaining_samples > 0 else 0)
-        remaining_samples -= 1
-        
-        for _ in range(num_career_samples):
-            abilities_scores, orientations_scores = generate_scores(CAREER_PATTERNS[career])
-            row = abilities_scores + orientations_scores + [career]
-            data.append(row)
-    
-    # Create DataFrame
-    columns = ABILITIES + ORIENTATIONS + ['career']
-    df = pd.DataFrame(data, columns=columns)
-    
-    # Shuffle the dataset
-    df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-    
+    *career_seeds, shuffle_seed = chunk_seed.spawn(len(careers) + 1)
+
+    scores = np.concatenate([
+        sample_career_scores(CAREER_PATTERNS[career], count, np.random.default_rng(career_seed))
+        for career, count, career_seed in zip(careers, counts, career_seeds)
+    ])
+    labels = np.repeat(np.array(careers, dtype=object), counts)
+
+    order = np.random.default_rng(shuffle_seed).permutation(len(scores))
+    df = pd.DataFrame(scores[order], columns=FEATURES)
+    df['career'] = labels[order]
     return df
 
-def analyze_correlations(df: pd.DataFrame):
+def iter_dataset_chunks(num_samples: int, seed: int = DEFAULT_SEED, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield the dataset as shuffled DataFrames of up to chunk_size rows.
+
+    Memory depends on chunk_size only; the same seed and chunk_size give the same rows.
+    """
+    for counts, chunk_seed in chunk_plan(num_samples, seed, chunk_size):
+        yield generate_chunk(counts, chunk_seed)
+
+def generate_dataset(num_samples: int = 29000, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """Generate the complete dataset in memory, reproducibly from seed."""
+    chunks = list(iter_dataset_chunks(num_samples, seed, max(num_samples, 1)))
+    return chunks[0] if chunks else pd.DataFrame(columns=FEATURES + ['career'])
+
+def chunk_stats(chunk: pd.DataFrame) -> StreamingStats:
+    stats = StreamingStats(FEATURES, CAREER_PATTERNS)
+    stats.update_frame(chunk)
+    return stats
+
+def render_chunk_csv(task: Tuple[np.ndarray, np.random.SeedSequence], with_stats: bool = False):
+    """Generate one chunk of chunk_plan; return (rows, CSV text without header, StreamingStats or None)."""
+    chunk = generate_chunk(*task)
+    return len(chunk), chunk.to_csv(header=False, index=False), chunk_stats(chunk) if with_stats else None
+
+def render_chunk_frame(task: Tuple[np.ndarray, np.random.SeedSequence], with_stats: bool = False):
+    """Generate one chunk of chunk_plan; return (rows, DataFrame, StreamingStats or None)."""
+    chunk = generate_chunk(*task)
+    return len(chunk), chunk, chunk_stats(chunk) if with_stats else None
+
+def generate_in_order(render, num_samples: int, seed: int, chunk_size: int, workers: int = 1):
+    """Yield render(task) for every chunk of chunk_plan, in order.
+
+    With workers > 1 chunks are rendered in a process pool, at most 2 * workers
+    at a time so memory stays bounded; every chunk has its own seed, so the
+    results do not depend on the number of workers.
+    """
+    tasks = chunk_plan(num_samples, seed, chunk_size)
+    if workers <= 1:
+        yield from map(render, tasks)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(pool.submit(render, task))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+def report_progress(written: int, num_samples: int, start: float) -> None:
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed else 0.0
+    eta = (num_samples - written) / rate if rate else 0.0
+    print(f"  {written:,} / {num_samples:,} rows ({written / num_samples:.0%}), "
+          f"{rate:,.0f} rows/s, ETA {eta:.0f}s", file=sys.stderr, flush=True)
+
+def write_dataset_csv(path: str, num_samples: int, seed: int = DEFAULT_SEED,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1, progress: bool = True,
+                      stats: StreamingStats = None) -> None:
+    """Stream the dataset to a CSV file chunk by chunk, with bounded memory.
+
+    The file is byte-identical for any number of workers. When stats is given,
+    the statistics of every chunk are merged into it on the way.
+    """
+    start = time.perf_counter()
+    written = 0
+    render = partial(render_chunk_csv, with_stats=stats is not None)
+    with open(path, 'w', newline='') as f:
+        pd.DataFrame(columns=FEATURES + ['career']).to_csv(f, index=False)
+        for rows, text, chunk_statistics in generate_in_order(render, num_samples, seed, chunk_size, workers):
+            f.write(text)
+            written += rows
+            if stats is not None:
+                stats.merge(chunk_statistics)
+            if progress:
+                report_progress(written, num_samples, start)
+
+def write_dataset_columnar(path: str, num_samples: int, seed: int = DEFAULT_SEED,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1, progress: bool = True,
+                           stats: StreamingStats = None) -> None:
+    """Stream the dataset to a columnar .cbin file chunk by chunk, with bounded memory."""
+    start = time.perf_counter()
+    render = partial(render_chunk_frame, with_stats=stats is not None)
+    with ColumnarWriter(path, FEATURES, list(CAREER_PATTERNS), num_samples) as writer:
+        for _, chunk, chunk_statistics in generate_in_order(render, num_samples, seed, chunk_size, workers):
+            writer.write(chunk)
+            if stats is not None:
+                stats.merge(chunk_statistics)
+            if progress:
+                report_progress(writer.rows_written, num_samples, start)
+
+def analyze_correlations(stats: StreamingStats):
     """Analyze correlations between abilities and orientations."""
-    # Create correlation matrix
-    features = ABILITIES + ORIENTATIONS
-    corr_matrix = df[features].corr()
+    # Correlation matrix from the single-pass statistics
+    corr_matrix = stats.correlation()
     
     # Print correlation matrix
     print("\nCorrelation Matrix:")
     print(corr_matrix)
     
-    # Find strong correlations (absolute value > 0.5)
-    strong_correlations = []
-    for i in range(len(features)):
-        for j in range(i+1, len(features)):
-            corr = corr_matrix.iloc[i, j]
-            if abs(corr) > 0.5:  # Strong correlation threshold
-                strong_correlations.append((features[i], features[j], corr))
-    
     print("\nStrong Correlations (|correlation| > 0.5):")
-    for feat1, feat2, corr in sorted(strong_correlations, key=lambda x: abs(x[2]), reverse=True):
+    for feat1, feat2, corr in stats.strong_correlations(0.5):
         print(f"{feat1} - {feat2}: {corr:.3f}")
     
+    # Plotting libraries are only needed here, so importing the generator stays light
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
     # Create correlation heatmap
     plt.figure(figsize=(12, 10))
     sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0)
@@ -515,54 +643,72 @@ def analyze_correlations(df: pd.DataFrame):
     plt.savefig('correlation_heatmap.png')
     plt.close()
 
-def analyze_career_patterns(df: pd.DataFrame):
+def analyze_career_patterns(stats: StreamingStats):
     """Analyze patterns in career requirements."""
     print("\nCareer Pattern Analysis:")
     
-    # Calculate average scores for each career
-    career_means = df.groupby('career')[ABILITIES + ORIENTATIONS].mean()
-    
-    # Find careers with highest scores in each ability/orientation
-    for feature in ABILITIES + ORIENTATIONS:
-        top_careers = career_means.nlargest(3, feature)
+    # Find careers with highest average scores in each ability/orientation
+    for feature, top_careers_for_feature in top_careers(stats.career_means(), 3).items():
         print(f"\nTop 3 careers for {feature}:")
-        for career, score in top_careers[feature].items():
+        for career, score in top_careers_for_feature.items():
             print(f"  {career}: {score:.2f}")
     
-    # Calculate standard deviations to understand score variability
-    career_std = df.groupby('career')[ABILITIES + ORIENTATIONS].std()
+    # Standard deviations show score variability
     print("\nCareers with highest score variability:")
-    for feature in ABILITIES + ORIENTATIONS:
-        top_variability = career_std.nlargest(3, feature)
+    for feature, top_variability in top_careers(stats.career_std(), 3).items():
         print(f"\n{feature}:")
-        for career, std in top_variability[feature].items():
+        for career, std in top_variability.items():
             print(f"  {career}: {std:.2f}")
 
 def main():
-    # Generate dataset
-    print("Generating dataset with 500 samples per career...")
-    df = generate_dataset(29000)  # 58 careers × 500 samples = 29,000 total samples
-    
-    # Save dataset
-    print("Saving dataset...")
-    df.to_csv('src/data/career_dataset.csv', index=False)
+    parser = argparse.ArgumentParser(description="Generate the synthetic career dataset")
+    parser.add_argument('--samples', type=int, default=29000, help="Total rows, split evenly across careers")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Master seed; the same seed gives the same dataset")
+    parser.add_argument('--output', default='src/data/career_dataset.csv',
+                        help="CSV file, or a columnar dataset when the name ends in .cbin")
+    parser.add_argument('--stream', action='store_true',
+                        help="Generate and write in chunks with bounded memory")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk when streaming")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes generating chunks when streaming (0: one per CPU); output does not depend on it")
+    args = parser.parse_args()
+
+    # Statistics are accumulated while generating, so analysis needs no second pass over the data
+    stats = StreamingStats(FEATURES, CAREER_PATTERNS)
+    if args.stream:
+        workers = args.workers or os.cpu_count()
+        print(f"Streaming {args.samples} samples (seed {args.seed}, {workers} workers) to {args.output}...")
+        write = write_dataset_columnar if is_columnar(args.output) else write_dataset_csv
+        write(args.output, args.samples, args.seed, args.chunk_size, workers, stats=stats)
+    else:
+        # Generate dataset
+        print(f"Generating dataset with {args.samples} samples (seed {args.seed})...")
+        df = generate_dataset(args.samples, args.seed)
+        stats.update_frame(df)
+
+        # Save dataset
+        print("Saving dataset...")
+        if is_columnar(args.output):
+            write_columnar(args.output, df, FEATURES, categories=list(CAREER_PATTERNS))
+        else:
+            df.to_csv(args.output, index=False)
     
     # Print dataset statistics
-    print(f"\nDataset generated successfully with {len(df)} samples")
+    print(f"\nDataset generated successfully with {stats.count} samples")
     print("\nCareer distribution:")
-    print(df['career'].value_counts())
+    print(stats.career_counts())
     
     print("\nScore ranges:")
-    for col in ABILITIES + ORIENTATIONS:
-        print(f"{col}: {df[col].min():.1f} - {df[col].max():.1f}")
-    
-    # Analyze correlations
-    print("\nAnalyzing correlations...")
-    analyze_correlations(df)
+    for col, low, high in zip(FEATURES, stats.minimum, stats.maximum):
+        print(f"{col}: {low:.1f} - {high:.1f}")
     
     # Analyze career patterns
     print("\nAnalyzing career patterns...")
-    analyze_career_patterns(df)
+    analyze_career_patterns(stats)
+    
+    # Analyze correlations (last, as the heatmap needs the plotting libraries)
+    print("\nAnalyzing correlations...")
+    analyze_correlations(stats)
     
     print("\nDataset generation completed!")
 
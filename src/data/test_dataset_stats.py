@@ -0,0 +1,78 @@
+"""Tests that StreamingStats, updated in chunks and merged, agrees with pandas.
+
+Usage:
+    python -m pytest test_dataset_stats.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_stats import StreamingStats, stats_from_dataset
+from dataset_store import LABEL_COLUMN, convert_csv
+from generate_career_dataset import FEATURES, generate_dataset
+
+ROWS = 600
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return generate_dataset(ROWS, seed=7)
+
+
+def merged_stats(dataset, boundaries):
+    """Statistics of each slice between boundaries, merged into the first."""
+    parts = []
+    for start, stop in zip(boundaries[:-1], boundaries[1:]):
+        stats = StreamingStats(FEATURES)
+        for chunk_start in range(start, stop, 50):
+            stats.update_frame(dataset.iloc[chunk_start:min(chunk_start + 50, stop)])
+        parts.append(stats)
+    for other in parts[1:]:
+        parts[0].merge(other)
+    return parts[0]
+
+
+def assert_matches_pandas(stats, dataset):
+    scores = dataset[FEATURES]
+    assert stats.count == len(dataset)
+    np.testing.assert_allclose(stats.mean, scores.mean().to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(np.diag(stats.covariance()), scores.var().to_numpy(), rtol=1e-10)
+    np.testing.assert_allclose(stats.correlation().to_numpy(), scores.corr().to_numpy(), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(stats.minimum, scores.min().to_numpy())
+    np.testing.assert_array_equal(stats.maximum, scores.max().to_numpy())
+
+    grouped = dataset.groupby(LABEL_COLUMN)[FEATURES]
+    counts = stats.career_counts()
+    assert counts.to_dict() == dataset[LABEL_COLUMN].value_counts().to_dict()
+    pd.testing.assert_frame_equal(stats.career_means().sort_index(), grouped.mean(), check_names=False,
+                                  rtol=1e-12)
+    pd.testing.assert_frame_equal(stats.career_std().sort_index(), grouped.std(), check_names=False,
+                                  rtol=1e-9)
+
+
+@pytest.mark.parametrize('boundaries', [[0, ROWS], [0, 200, 450, ROWS], [0, 1, 301, ROWS]])
+def test_merged_stats_match_pandas(dataset, boundaries):
+    assert_matches_pandas(merged_stats(dataset, boundaries), dataset)
+
+
+def test_merging_empty_stats_changes_nothing(dataset):
+    stats = merged_stats(dataset, [0, ROWS])
+    stats.merge(StreamingStats(FEATURES))
+    assert_matches_pandas(stats, dataset)
+
+
+def test_merging_other_features_is_rejected():
+    with pytest.raises(ValueError):
+        StreamingStats(FEATURES).merge(StreamingStats(FEATURES[::-1]))
+
+
+def test_csv_and_columnar_files_give_the_same_stats(dataset, tmp_path):
+    csv_path, columnar_path = str(tmp_path / 'career_dataset.csv'), str(tmp_path / 'career_dataset.cbin')
+    dataset.to_csv(csv_path, index=False)
+    convert_csv(csv_path, columnar_path)
+
+    assert_matches_pandas(stats_from_dataset(csv_path, chunk_rows=97), pd.read_csv(csv_path))
+    # The columnar file holds float32 scores, so compare with the CSV at that precision
+    columnar = pd.read_csv(csv_path)
+    columnar[FEATURES] = columnar[FEATURES].astype(np.float32).astype(np.float64)
+    assert_matches_pandas(stats_from_dataset(columnar_path, chunk_rows=97), columnar)
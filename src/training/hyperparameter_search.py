@@ -0,0 +1,348 @@
+"""Budgeted hyperparameter search for the career models, by successive halving.
+
+Random configurations of one model family start on a small stratified subset
+of the training rows with few boosting rounds (trees, for a random forest).
+After each rung only the best 1/eta of them by validation accuracy go on, and
+both the rows and the rounds grow eta-fold, until the survivors train on all
+of them. Boosted models also stop adding rounds once the validation loss has
+not improved for EARLY_STOPPING_ROUNDS rounds.
+
+The validation rows are one cross-validation fold of train_model.py's training
+split, and the search trains on the rest of that split. Its held-out split is
+never used for a decision: its accuracy is only reported, so it stays an
+unbiased estimate, comparable with training_results.json.
+
+The trials of a rung run in a process pool, each single-threaded, and the
+whole search is bounded by a total CPU-time budget: a rung only starts when its
+estimated cost (the previous rung's CPU time per trial, scaled by the growth
+in rows and rounds) fits in what is left, and when the budget runs out during
+a rung the trials not yet started are cancelled.
+
+Every finished trial records its validation and held-out accuracy, CPU time,
+pickled model size and inference latency (measured in the worker, so compare
+latencies within one run). The report lists all trials and, for every rung,
+the Pareto front of the configurations trained there: those that no other one
+at the same rows and rounds matches or beats on validation accuracy, batched
+latency and size at once. Models cut short by an early rung are smaller and
+faster only because they saw less, so they are never compared with finalists;
+the headline front is the one of the furthest rung that finished any trial.
+
+Usage (through train_model.py):
+    python train_model.py ../../career_dataset.csv --search lightgbm --cpu-budget 600
+    python train_model.py ../../career_dataset.cbin --search xgboost --trials 27 --eta 3 --workers 4
+"""
+import json
+import math
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from train_model import CANDIDATES, LATENCY_BATCH_ROWS, ROOT_DIR, load_cache, score
+
+SEARCH_RESULTS_PATH = ROOT_DIR / 'models' / 'results' / 'search_results.json'
+
+DEFAULT_TRIALS = 27
+DEFAULT_ETA = 3
+DEFAULT_MAX_ROUNDS = 243
+DEFAULT_CPU_BUDGET = 600.0
+
+# Rungs never train on fewer rows than this many per career
+MIN_ROWS_PER_CAREER = 20
+
+# Boosting stops after this many rounds without a better validation loss
+EARLY_STOPPING_ROUNDS = 20
+
+# Cross-validation fold of the training split used for validation
+VALIDATION_FOLD = 0
+
+# Timed predict_proba calls per latency measurement; the median is kept
+LATENCY_REPEATS = 5
+
+# Sampled parameters per model family: ('choice', options), ('uniform', low, high) or ('log', low, high)
+SEARCH_SPACES = {
+    'lightgbm': {
+        'num_leaves': ('choice', [7, 15, 31, 63, 127]),
+        'learning_rate': ('log', 0.02, 0.3),
+        'min_child_samples': ('choice', [5, 10, 20, 40]),
+        'subsample': ('uniform', 0.6, 1.0),
+        'colsample_bytree': ('uniform', 0.6, 1.0),
+        'reg_lambda': ('log', 1e-3, 10.0),
+    },
+    'xgboost': {
+        'max_depth': ('choice', [3, 4, 5, 6, 8]),
+        'learning_rate': ('log', 0.02, 0.3),
+        'min_child_weight': ('choice', [1, 3, 5, 10]),
+        'subsample': ('uniform', 0.6, 1.0),
+        'colsample_bytree': ('uniform', 0.6, 1.0),
+        'reg_lambda': ('log', 1e-3, 10.0),
+    },
+    'random_forest': {
+        'max_depth': ('choice', [None, 8, 12, 16, 24]),
+        'min_samples_leaf': ('choice', [1, 2, 4, 8]),
+        'max_features': ('choice', ['sqrt', 0.5, 1.0]),
+    },
+}
+
+# Parameters every trial of a family gets; LightGBM only bags rows when subsample_freq is set
+FIXED_PARAMS = {
+    'lightgbm': {'subsample_freq': 1},
+    'xgboost': {'early_stopping_rounds': EARLY_STOPPING_ROUNDS},
+}
+
+
+def sample_config(name, rng):
+    config = {}
+    for parameter, (kind, *spec) in SEARCH_SPACES[name].items():
+        if kind == 'choice':
+            value = spec[0][rng.integers(len(spec[0]))]
+            config[parameter] = value.item() if isinstance(value, np.generic) else value
+        elif kind == 'uniform':
+            config[parameter] = float(rng.uniform(*spec))
+        else:
+            config[parameter] = float(math.exp(rng.uniform(math.log(spec[0]), math.log(spec[1]))))
+    return config
+
+
+def plan_rungs(n_trials, eta, n_rows, max_rounds, min_rows):
+    """Configurations, rows and rounds of every rung, the last one training on all n_rows."""
+    last = max(int(math.floor(math.log(n_trials) / math.log(eta) + 1e-9)), 0)
+    rungs = []
+    for k in range(last + 1):
+        scale = float(eta) ** (k - last)
+        rungs.append({
+            'configs': max(n_trials // eta ** k, 1),
+            'rows': int(min(n_rows, max(min_rows, round(n_rows * scale)))),
+            'rounds': max(int(round(max_rounds * scale)), 1),
+        })
+    return rungs
+
+
+def nested_order(labels, seed):
+    """Random row order whose every prefix holds each career in about its overall share."""
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(labels)
+    permutation = rng.permutation(len(labels))
+    by_label = permutation[np.argsort(labels[permutation], kind='stable')]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.empty(len(labels))
+    rank[by_label] = np.arange(len(labels)) - np.repeat(starts, counts)
+    return np.argsort((rank + rng.random(len(labels))) / counts[labels], kind='stable')
+
+
+def search_split(fold, holdout):
+    """(train, validation) row indices, both outside the held-out split."""
+    return np.flatnonzero(~holdout & (fold != VALIDATION_FOLD)), np.flatnonzero(~holdout & (fold == VALIDATION_FOLD))
+
+
+# --- Trials ---
+
+def fit_with_early_stopping(name, model, X_train, y_train, X_val, y_val):
+    if name == 'lightgbm':
+        import lightgbm
+        # eval_set still works on every supported LightGBM, newer ones just warn about it
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message=".*'eval_set' is deprecated")
+            model.fit(X_train, y_train, eval_set=[(X_val, y_val)],
+                      callbacks=[lightgbm.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+    elif name == 'xgboost':
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    else:
+        model.fit(X_train, y_train)
+
+
+def median_seconds(function, repeats=LATENCY_REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def run_trial(task):
+    """Train one configuration on the first rows of the nested order and score it on the validation rows."""
+    name, trial, params, rows, rounds, cache, folds_path, seed = task
+    cpu_start = time.process_time()
+    features, labels, fold, holdout = load_cache(cache, folds_path)
+    n_careers = int(labels.max()) + 1
+    train, validation = search_split(fold, holdout)
+    subset = train[nested_order(labels[train], seed)[:rows]]
+    X_train, y_train = np.asarray(features[subset]), labels[subset]
+    X_val, y_val = np.asarray(features[validation]), labels[validation]
+
+    scaler = StandardScaler().fit(X_train)
+    model = CANDIDATES[name][0](seed, **{**FIXED_PARAMS.get(name, {}), **params, 'n_estimators': rounds})
+    fit_with_early_stopping(name, model, scaler.transform(X_train), y_train, scaler.transform(X_val), y_val)
+    accuracy, _, _ = score(model, scaler, X_val, y_val, n_careers)
+    cpu_seconds = time.process_time() - cpu_start
+    # Reported only; nothing in the search looks at it
+    holdout_accuracy, _, _ = score(model, scaler, np.asarray(features[holdout]), labels[holdout], n_careers)
+
+    batch = scaler.transform(X_val[:LATENCY_BATCH_ROWS])
+    # Rounds kept by early stopping: LightGBM counts them from 1, XGBoost indexes them from 0
+    if name == 'lightgbm':
+        rounds_used = getattr(model, 'best_iteration_', 0) or rounds
+    elif name == 'xgboost':
+        rounds_used = getattr(model, 'best_iteration', rounds - 1) + 1
+    else:
+        rounds_used = rounds
+    return {
+        'trial': trial,
+        'rows': rows,
+        'rounds': rounds,
+        'rounds_used': int(rounds_used),
+        'validation_accuracy': accuracy,
+        'holdout_accuracy': holdout_accuracy,
+        'cpu_seconds': cpu_seconds,
+        'single_row_ms': median_seconds(lambda: model.predict_proba(batch[:1])) * 1000.0,
+        'batch_per_row_us': median_seconds(lambda: model.predict_proba(batch)) * 1e6 / len(batch),
+        'model_size_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+
+def run_rung(tasks, pool):
+    """Yield trial results as they finish; closing the generator cancels trials not yet started."""
+    if pool is None:
+        yield from map(run_trial, tasks)
+        return
+    futures = [pool.submit(run_trial, task) for task in tasks]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+# --- Search ---
+
+def pareto_front(results):
+    """Indices of results no other one matches or beats on validation accuracy, batched latency and size."""
+    accuracy = np.array([result['validation_accuracy'] for result in results])
+    latency = np.array([result['batch_per_row_us'] for result in results])
+    size = np.array([result['model_size_bytes'] for result in results])
+    # at_least[i, j]: result i is at least as good as result j on every objective
+    at_least = ((accuracy[:, None] >= accuracy[None, :]) & (latency[:, None] <= latency[None, :])
+                & (size[:, None] <= size[None, :]))
+    better = ((accuracy[:, None] > accuracy[None, :]) | (latency[:, None] < latency[None, :])
+              | (size[:, None] < size[None, :]))
+    dominated = (at_least & better).any(axis=0)
+    front = np.flatnonzero(~dominated)
+    return front[np.argsort(-accuracy[front], kind='stable')].tolist()
+
+
+def successive_halving(name, cache, folds_path, n_trials=DEFAULT_TRIALS, eta=DEFAULT_ETA,
+                       max_rounds=DEFAULT_MAX_ROUNDS, cpu_budget=DEFAULT_CPU_BUDGET, workers=1, seed=0):
+    """Search configurations of the model family name; return the report."""
+    if eta < 2 or n_trials < 1:
+        raise ValueError("The search needs eta >= 2 and at least one trial")
+    _, labels, fold, holdout = load_cache(cache, folds_path)
+    n_careers = int(labels.max()) + 1
+    train, _ = search_split(fold, holdout)
+    rungs = plan_rungs(n_trials, eta, len(train), max_rounds, MIN_ROWS_PER_CAREER * n_careers)
+
+    rng = np.random.default_rng(seed)
+    configs = [sample_config(name, rng) for _ in range(n_trials)]
+    survivors = list(range(n_trials))
+    trials = []
+    rung_reports = []
+    spent = 0.0
+    stopped = None
+    previous = None
+
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for k, rung in enumerate(rungs):
+            survivors = survivors[:rung['configs']]
+            if previous is not None and previous['completed']:
+                growth = (rung['rows'] / previous['rows']) * (rung['rounds'] / previous['rounds'])
+                estimate = previous['cpu_seconds'] / previous['completed'] * growth * len(survivors)
+                if spent + estimate > cpu_budget:
+                    stopped = (f"rung {k} would need about {estimate:.0f} CPU seconds, "
+                               f"{cpu_budget - spent:.0f} left")
+                    break
+
+            tasks = [(name, trial, configs[trial], rung['rows'], rung['rounds'], cache, folds_path, seed)
+                     for trial in survivors]
+            results = []
+            rung_cpu = 0.0
+            for result in run_rung(tasks, pool):
+                result['rung'] = k
+                results.append(result)
+                rung_cpu += result['cpu_seconds']
+                spent += result['cpu_seconds']
+                if spent >= cpu_budget:
+                    stopped = f"the CPU budget ran out during rung {k}"
+                    break
+            trials.extend(results)
+
+            previous = {**rung, 'rung': k, 'started': len(tasks), 'completed': len(results),
+                        'cpu_seconds': rung_cpu,
+                        'best_accuracy': max((result['validation_accuracy'] for result in results), default=None),
+                        'pareto_front': [results[i]['trial'] for i in pareto_front(results)] if results else []}
+            rung_reports.append(previous)
+            print(f"Rung {k}: {len(results)}/{len(tasks)} configurations on {rung['rows']} rows, "
+                  f"{rung['rounds']} rounds, best validation accuracy {previous['best_accuracy'] or 0:.4f}, "
+                  f"{spent:.0f}/{cpu_budget:.0f} CPU seconds")
+
+            survivors = [result['trial']
+                         for result in sorted(results, key=lambda result: -result['validation_accuracy'])]
+            if stopped:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # Configurations are only compared at equal rows and rounds, so the headline front is the furthest rung's
+    front = []
+    front_rung = next((report for report in reversed(rung_reports) if report['completed']), None)
+    if front_rung is not None:
+        by_trial = {result['trial']: result for result in trials if result['rung'] == front_rung['rung']}
+        front = [{**by_trial[trial], 'params': configs[trial]} for trial in front_rung['pareto_front']]
+
+    return {
+        'model': name,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'trials': n_trials,
+        'eta': eta,
+        'max_rounds': max_rounds,
+        'cpu_budget_seconds': cpu_budget,
+        'validation_fold': VALIDATION_FOLD,
+        'cpu_seconds': spent,
+        'stopped_early': stopped,
+        'rungs': rung_reports,
+        'configurations': configs,
+        'results': trials,
+        'pareto_front_rung': None if front_rung is None else front_rung['rung'],
+        'pareto_front': front,
+    }
+
+
+def print_pareto_front(report):
+    if report['stopped_early']:
+        print(f"Stopped early: {report['stopped_early']}")
+    rung = report['pareto_front_rung']
+    if rung is None:
+        print("\nNo trial finished, so there is no Pareto front")
+        return
+    rows, rounds = report['rungs'][rung]['rows'], report['rungs'][rung]['rounds']
+    print(f"\nPareto front of {report['model']} at rung {rung}, {rows} rows and {rounds} rounds "
+          f"(validation accuracy vs. latency vs. size):")
+    print(f"  {'trial':>5} {'rung':>4} {'val acc':>8} {'held-out':>8} {'us/row':>8} {'ms/1row':>8} "
+          f"{'size MB':>8}  params")
+    for result in report['pareto_front']:
+        print(f"  {result['trial']:>5} {result['rung']:>4} {result['validation_accuracy']:>8.4f} "
+              f"{result['holdout_accuracy']:>8.4f} {result['batch_per_row_us']:>8.1f} {result['single_row_ms']:>8.2f} "
+              f"{result['model_size_bytes'] / 1e6:>8.2f}  {json.dumps(result['params'])}")
+
+
+def write_report(report, path=SEARCH_RESULTS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"\nSearch results written to {path}")
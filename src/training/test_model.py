@@ -1,12 +1,15 @@
-import joblib
+import argparse
+import sys
 import numpy as np
-import pandas as pd
-import shap
 from pathlib import Path
 import warnings
-from typing import List, Dict
-import matplotlib.pyplot as plt
-import pickle
+from typing import List, Dict, Sequence
+
+# Share the model loader and feature construction with the ML service
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'ML'))
+from inference import (DIRECT_SCORE_FEATURES, ENGINEERED_FEATURES, InferencePlan, as_score_matrix,
+                       build_feature_frame_from_matrix)
+from model_store import load_model_artifact
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
@@ -19,28 +22,8 @@ FEATURE_NAMES = [
     'social_skills', 'spatial_ability', 'verbal_ability'
 ]
 
-# Define career labels
-CAREER_LABELS = [
-    'Accountant', 'Actuary', 'Animation Artist', 'Architect', 'Army Officer',
-    'Astronomer', 'Astrophysicist', 'Athlete', 'Audiologist', 'Banker',
-    'Biochemist', 'Biomedical Engineer', 'Biotechnologist', 'Business Analyst',
-    'Cardiologist', 'Chartered Financial Analyst', 'Chemical Engineer', 'Civil Engineer',
-    'Clinical Psychologist', 'Company Secretary', 'Computer Hardware Engineer',
-    'Counselling Psychologist', 'Criminal Lawyer', 'Cyber Security Expert',
-    'Data Scientist', 'Dentist', 'Digital Artist', 'Drone Pilot', 'Economist',
-    'Electrical Engineer', 'Environmental Engineer', 'Fashion Designer',
-    'Financial Advisor', 'Food Technologist', 'Forensic Expert', 'Game Developer',
-    'Gemologist', 'Geneticist', 'Geologist', 'Graphic Designer', 'IFS Officer',
-    'Industrial Designer', 'Interior Designer', 'Investment Banker', 'Judge',
-    'Marine Engineer', 'Market Research Analyst', 'Mechanical Engineer',
-    'Medical Laboratory Technician', 'Microbiologist', 'Multimedia Artist',
-    'Neurologist', 'Neurosurgeon', 'Nuclear Engineer', 'Nutritionist',
-    'Occupational Therapist', 'Optometrist', 'Orthodontist', 'Pathologist',
-    'Petroleum Engineer', 'Pharmacist', 'Physical Therapist', 'Physicist',
-    'Professor', 'Psychiatrist', 'Quantum Computing Engineer', 'Radiologist',
-    'Robotics Engineer', 'Software Engineer', 'Space Scientist', 'Special Educator',
-    'Statistician', 'UI/UX Designer', 'Veterinarian'
-]
+# Rows scored per predict_proba call in a skill sweep
+SWEEP_BATCH_SIZE = 50000
 
 # Define profile templates with updated feature names
 PROFILES = {
@@ -114,6 +97,26 @@ PROFILES = {
     }
 }
 
+# Base profiles of the skill sweep, in the model's own direct scores (the dataset spans 40-100)
+SWEEP_PROFILES = {
+    "technical": {
+        'cognition': 90, 'reasoning': 95, 'figural_memory': 80, 'spatial_ability': 85,
+        'verbal_ability': 70, 'social_ability': 60, 'numerical_ability': 95, 'numerical_memory': 80,
+        'knowledge': 85, 'practical': 80, 'artistic': 55, 'social': 55, 'power_coping': 65
+    },
+    "creative": {
+        'cognition': 80, 'reasoning': 70, 'figural_memory': 85, 'spatial_ability': 85,
+        'verbal_ability': 80, 'social_ability': 70, 'numerical_ability': 60, 'numerical_memory': 65,
+        'knowledge': 70, 'practical': 70, 'artistic': 95, 'social': 65, 'power_coping': 60
+    },
+    "social": {
+        'cognition': 75, 'reasoning': 70, 'figural_memory': 65, 'spatial_ability': 60,
+        'verbal_ability': 85, 'social_ability': 95, 'numerical_ability': 60, 'numerical_memory': 65,
+        'knowledge': 75, 'practical': 65, 'artistic': 65, 'social': 95, 'power_coping': 80
+    },
+    "balanced": {feature: 75 for feature in DIRECT_SCORE_FEATURES}
+}
+
 def create_sample_input(profile_type):
     """Create a sample input vector based on the profile type."""
     profile_type = profile_type.upper()
@@ -129,8 +132,8 @@ def create_sample_input(profile_type):
 def load_model():
     """Load the trained model and scaler."""
     try:
-        model_path = Path(__file__).parent.parent.parent / 'models' / 'career_model_pipeline.pkl'
-        pipeline = joblib.load(model_path)
+        # SHAP needs the original estimator, so prefer the pickle over a memory-mapped export
+        pipeline = load_model_artifact(prefer_pickle=True)
         print("\nFeature names used during training:")
         if hasattr(pipeline['model'], 'feature_names_in_'):
             print(pipeline['model'].feature_names_in_)
@@ -222,6 +225,114 @@ def create_skill_variation(base_profile, skill_to_vary, values):
     
     return variations
 
+class SweepResult:
+    """Career probabilities over a grid of skill values, for several profiles.
+
+    probabilities has one axis per entry of dims: the profile, each swept skill
+    (indexed like values) and the career; coords holds the labels of every axis.
+    """
+
+    def __init__(self, probabilities: np.ndarray, profiles: List[str], skills: List[str],
+                 values: np.ndarray, careers: List[str]):
+        self.probabilities = probabilities
+        self.profiles = profiles
+        self.skills = skills
+        self.values = values
+        self.careers = careers
+        self.dims = ('profile', *skills, 'career')
+        self.coords = {'profile': profiles, **{skill: values for skill in skills}, 'career': careers}
+
+    def grid(self) -> np.ndarray:
+        """Skill values of every grid point, shape (points, skills), in the order of the flattened grid."""
+        axes = np.meshgrid(*([self.values] * len(self.skills)), indexing='ij')
+        return np.stack(axes, axis=-1).reshape(-1, len(self.skills))
+
+    def summary(self) -> Dict[str, np.ndarray]:
+        """Statistics over the grid for every (profile, career).
+
+        min, max, mean, std and range of the probability; top1_share, the fraction
+        of grid points where the career ranks first; and argmax_values, the skill
+        values where its probability peaks.
+        """
+        n_profiles, n_careers = len(self.profiles), len(self.careers)
+        flat = self.probabilities.reshape(n_profiles, -1, n_careers)
+        top1 = flat.argmax(axis=2)
+        top1_share = np.stack([np.bincount(row, minlength=n_careers) for row in top1]) / flat.shape[1]
+        return {
+            'min': flat.min(axis=1),
+            'max': flat.max(axis=1),
+            'mean': flat.mean(axis=1),
+            'std': flat.std(axis=1),
+            'range': flat.max(axis=1) - flat.min(axis=1),
+            'top1_share': top1_share,
+            'argmax_values': self.grid()[flat.argmax(axis=1)],
+        }
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, probabilities=self.probabilities, profiles=self.profiles,
+                            skills=self.skills, values=self.values, careers=self.careers)
+
+def sweep_skills(pipeline, skills: Sequence[str], values: Sequence[float], profiles: Sequence[str] = None,
+                 batch_size: int = SWEEP_BATCH_SIZE) -> SweepResult:
+    """Score every combination of values for the given skills, for each profile.
+
+    Skills are the model's direct scores; the profiles come from SWEEP_PROFILES.
+    The grid holds len(values) ** len(skills) points per profile. Rows are built
+    and scored batch_size at a time, with the engineered features recomputed and
+    the columns put in the pipeline's feature order before one scaler transform
+    and one predict_proba call per batch, so memory is bounded by the batch plus
+    the float32 result.
+    """
+    profiles = list(SWEEP_PROFILES) if profiles is None else list(profiles)
+    skills = list(skills)
+    values = np.asarray(values, dtype=float)
+    feature_names = list(pipeline.get('feature_names') or DIRECT_SCORE_FEATURES + list(ENGINEERED_FEATURES))
+    engineered = [skill for skill in skills if skill in ENGINEERED_FEATURES]
+    if engineered:
+        raise ValueError(f"{engineered} are computed from other scores; sweep "
+                         f"{sorted({score for skill in engineered for score in ENGINEERED_FEATURES[skill]})} instead")
+    unknown = [skill for skill in skills if skill not in feature_names or skill not in DIRECT_SCORE_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown skills: {unknown} (the model's scores are {DIRECT_SCORE_FEATURES})")
+
+    base = as_score_matrix([[SWEEP_PROFILES[profile][feature] for feature in DIRECT_SCORE_FEATURES]
+                            for profile in profiles])
+    skill_columns = [DIRECT_SCORE_FEATURES.index(skill) for skill in skills]
+    result = SweepResult(None, profiles, skills, values, [str(career) for career in pipeline['encoder'].classes_])
+    grid = result.grid()
+
+    scaler, model = pipeline['scaler'], pipeline['model']
+    try:
+        plan = InferencePlan(scaler, feature_names)
+        transform = plan.transform_matrix
+    except (TypeError, ValueError):
+        # Scalers the plan cannot compile go through the reference DataFrame path
+        def transform(batch):
+            return scaler.transform(build_feature_frame_from_matrix(batch)[feature_names])
+
+    n_rows = len(profiles) * len(grid)
+    probabilities = np.empty((n_rows, len(result.careers)), dtype=np.float32)
+    for start in range(0, n_rows, batch_size):
+        rows = np.arange(start, min(start + batch_size, n_rows))
+        batch = base[rows // len(grid)]
+        batch[:, skill_columns] = grid[rows % len(grid)]
+        probabilities[rows] = model.predict_proba(transform(batch))
+
+    result.probabilities = probabilities.reshape((len(profiles),) + (len(values),) * len(skills) + (-1,))
+    return result
+
+def print_sweep_summary(result: SweepResult, top: int = 10) -> None:
+    """Per profile, the careers whose probability moves most across the grid."""
+    summary = result.summary()
+    points = len(result.values) ** len(result.skills)
+    for p, profile in enumerate(result.profiles):
+        print(f"\n=== {profile.upper()}: {', '.join(result.skills)} over {points} grid points ===")
+        print(f"{'Career':30s} {'Min':>7s} {'Max':>7s} {'Mean':>7s} {'Top-1':>7s}  Peak at")
+        for c in np.argsort(summary['range'][p])[::-1][:top]:
+            peak = ', '.join(f"{skill}={value:g}" for skill, value in zip(result.skills, summary['argmax_values'][p, c]))
+            print(f"{result.careers[c]:30s} {summary['min'][p, c]:7.2%} {summary['max'][p, c]:7.2%} "
+                  f"{summary['mean'][p, c]:7.2%} {summary['top1_share'][p, c]:7.1%}  {peak}")
+
 def analyze_skill_impact(pipeline, profile_type, skill_to_vary, values):
     """Analyze how varying a skill affects career recommendations."""
     print(f"\n=== Analyzing Impact of {skill_to_vary} on Career Recommendations ===")
@@ -231,55 +342,31 @@ def analyze_skill_impact(pipeline, profile_type, skill_to_vary, values):
     print(f"Varying {skill_to_vary} from {min(values)} to {max(values)}:")
     print("-" * 70 + "\n")
     
-    # Track probability changes
-    prob_changes = {}
+    # All values scored in one batch: (values, careers) in percent
+    result = sweep_skills(pipeline, [skill_to_vary], values, [profile_type])
+    probabilities = result.probabilities[0] * 100
+    top_3 = np.argsort(probabilities, axis=1)[:, -3:][:, ::-1]
     
-    for value in values:
-        # Create a copy of the base profile
-        base_profile = PROFILES[profile_type].copy()
-        base_profile[skill_to_vary] = value
-        
-        # Convert to numpy array
-        X = np.array([list(base_profile.values())])
-        
-        # Scale the input
-        X_scaled = pipeline['scaler'].transform(X)
-        
-        # Get predictions
-        predictions = pipeline['model'].predict_proba(X_scaled)[0]
-        top_3_indices = np.argsort(predictions)[-3:][::-1]
-        
+    for value, row, indices in zip(values, probabilities, top_3):
         print(f"{skill_to_vary}: {value}")
         print("Top 3 Recommendations:")
-        for i, idx in enumerate(top_3_indices, 1):
-            career = CAREER_LABELS[idx]
-            prob = predictions[idx] * 100
-            print(f"  {i}. {career:30} {prob:6.2f}%")
-            
-            # Track probability changes
-            if career not in prob_changes:
-                prob_changes[career] = {'min': (prob, value), 'max': (prob, value)}
-            else:
-                if prob < prob_changes[career]['min'][0]:
-                    prob_changes[career]['min'] = (prob, value)
-                if prob > prob_changes[career]['max'][0]:
-                    prob_changes[career]['max'] = (prob, value)
-        
+        for i, idx in enumerate(indices, 1):
+            print(f"  {i}. {result.careers[idx]:30} {row[idx]:6.2f}%")
         print("\n")
     
-    # Report significant changes
+    # Report significant changes of careers that made a top 3
     print("Significant Career Probability Changes:")
     print("-" * 70 + "\n")
     
-    for career, changes in prob_changes.items():
-        min_prob, min_value = changes['min']
-        max_prob, max_value = changes['max']
-        prob_change = max_prob - min_prob
+    for idx in dict.fromkeys(top_3.ravel()):
+        column = probabilities[:, idx]
+        low, high = column.argmin(), column.argmax()
+        prob_change = column[high] - column[low]
         
         if prob_change >= 5.0:  # Only show changes >= 5%
-            print(f"{career}:")
-            print(f"  Lowest : {min_prob:6.2f}% (at {skill_to_vary}={min_value})")
-            print(f"  Highest: {max_prob:6.2f}% (at {skill_to_vary}={max_value})")
+            print(f"{result.careers[idx]}:")
+            print(f"  Lowest : {column[low]:6.2f}% (at {skill_to_vary}={values[low]})")
+            print(f"  Highest: {column[high]:6.2f}% (at {skill_to_vary}={values[high]})")
             print(f"  Change : {prob_change:6.2f}%\n")
 
 def analyze_with_shap(pipeline, profile_type):
@@ -299,12 +386,15 @@ def analyze_with_shap(pipeline, profile_type):
     print("Analyzing top 3 career predictions:\n")
     
     try:
+        # SHAP is slow to import and only needed here
+        import shap
+
         # Calculate SHAP values
         explainer = shap.TreeExplainer(pipeline['model'])
         shap_values = explainer.shap_values(X_scaled)
         
         for idx in top_3_indices:
-            career = CAREER_LABELS[idx]
+            career = pipeline['encoder'].classes_[idx]
             probability = predictions[idx] * 100
             
             print(f"{career} ({probability:.2f}% confidence)")
@@ -331,11 +421,37 @@ def analyze_with_shap(pipeline, profile_type):
     except Exception as e:
         print(f"Error calculating SHAP values: {str(e)}\n")
 
+def parse_values(text):
+    """'start:stop:step' (stop included) or a comma-separated list."""
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(value) for value in text.split(',')])
+
 def main():
+    parser = argparse.ArgumentParser(description="Test the career model on sample profiles")
+    parser.add_argument('--sweep', nargs='+', metavar='SKILL', default=None,
+                        help="Score every combination of values of these skills for the profiles")
+    parser.add_argument('--values', type=parse_values, default=parse_values('0:100:5'),
+                        help="Swept values, start:stop:step or a comma-separated list (default 0:100:5)")
+    parser.add_argument('--profiles', nargs='+', choices=list(SWEEP_PROFILES), default=None,
+                        help="Profiles to sweep (default: all)")
+    parser.add_argument('--top', type=int, default=10, help="Careers listed per profile in the sweep summary")
+    parser.add_argument('--output', default=None, help="Save the sweep probabilities and labels to this .npz file")
+    args = parser.parse_args()
+
     # Load the model
     pipeline = load_model()
     print("Model loaded successfully!")
 
+    if args.sweep:
+        result = sweep_skills(pipeline, args.sweep, args.values, args.profiles)
+        print_sweep_summary(result, args.top)
+        if args.output:
+            result.save(args.output)
+            print(f"\nSweep saved to {args.output}")
+        return
+
     # First analyze with SHAP for each profile type
     for profile in ["technical", "creative", "social", "balanced"]:
         analyze_with_shap(pipeline, profile)
@@ -344,9 +460,9 @@ def main():
     # Then analyze specific skill impacts
     skills_to_analyze = [
         ("technical", "numerical_ability", [60, 75, 90, 98]),
-        ("creative", "creativity", [40, 60, 80, 95]),
-        ("social", "social_skills", [50, 70, 85, 95]),
-        ("balanced", "logical_reasoning", [60, 75, 85, 95])
+        ("creative", "artistic", [40, 60, 80, 95]),
+        ("social", "social_ability", [50, 70, 85, 95]),
+        ("balanced", "reasoning", [60, 75, 85, 95])
     ]
     
     for base_profile, skill, values in skills_to_analyze:
@@ -0,0 +1,365 @@
+"""Train and compare the candidate career models, and write the served pipeline.
+
+Reads the dataset written by ``src/data/generate_career_dataset.py`` (CSV or
+columnar ``.cbin``) and recreates the engineered features with
+``inference.add_engineered_features``, so the columns are exactly the ones
+``ML/app.py`` feeds the model. Every candidate is then evaluated twice:
+
+* stratified k-fold cross-validation, for a mean and spread of the accuracy;
+* a fit on a stratified training split scored on the held-out rows, which
+  gives the per-career report stored in ``training_results.json`` along with
+  the training time, the single-row and batched inference latency through
+  ``predictor.Predictor`` and the pickled model size.
+
+Each (model, fold) fit is one task in a process pool, and models are built
+single-threaded so the tasks do not oversubscribe the cores. The feature
+matrix, labels and fold assignment are cached under ``models/cache`` keyed by
+the dataset's content hash; workers memory-map them, and later runs over the
+same dataset skip parsing it and reuse the same folds.
+
+The model with the best mean CV accuracy is refit on the whole dataset and
+saved as the ``{model, scaler, encoder, feature_names}`` pipeline.
+
+Usage:
+    python train_model.py ../../career_dataset.csv
+    python train_model.py ../../career_dataset.cbin --models random_forest lightgbm --folds 3 --workers 4
+    python train_model.py ../../career_dataset.csv --output /tmp/career_model_pipeline.pkl --export
+    python train_model.py ../../career_dataset.csv --search lightgbm --cpu-budget 600
+
+With ``--search`` it instead runs the budgeted hyperparameter search of
+``hyperparameter_search.py`` on the same cached holdout split.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Share the dataset reader, feature construction and model format with the ML service
+ML_DIR = Path(__file__).parent.parent.parent / 'ML'
+sys.path.insert(0, str(ML_DIR))
+from dataset_store import LABEL_COLUMN, load_dataset
+from inference import DIRECT_SCORE_FEATURES, EXPECTED_FEATURES_ORDER, add_engineered_features
+from model_store import MODEL_BASENAME, export_pipeline
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+RESULTS_PATH = ROOT_DIR / 'models' / 'results' / 'training_results.json'
+CACHE_DIR = ROOT_DIR / 'models' / 'cache'
+PIPELINE_PATH = ML_DIR / (MODEL_BASENAME + '.pkl')
+
+DEFAULT_FOLDS = 5
+DEFAULT_TEST_SIZE = 0.2
+DEFAULT_SEED = 42
+
+# Rows scored per call when measuring batched inference latency
+LATENCY_BATCH_ROWS = 1024
+
+
+# --- Candidate models ---
+
+# Builders take the seed plus parameters overriding their defaults, as the hyperparameter search sets them
+
+def build_random_forest(seed, **params):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(**{'n_estimators': 200, 'min_samples_leaf': 2, 'random_state': seed,
+                                     'n_jobs': 1, **params})
+
+
+def build_xgboost(seed, **params):
+    from xgboost import XGBClassifier
+    return XGBClassifier(**{'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1, 'tree_method': 'hist',
+                            'random_state': seed, 'n_jobs': 1, **params})
+
+
+def build_lightgbm(seed, **params):
+    from lightgbm import LGBMClassifier
+    return LGBMClassifier(**{'n_estimators': 200, 'num_leaves': 31, 'learning_rate': 0.05, 'random_state': seed,
+                             'n_jobs': 1, 'verbose': -1, **params})
+
+
+def build_neural_network(seed, **params):
+    from sklearn.neural_network import MLPClassifier
+    return MLPClassifier(**{'hidden_layer_sizes': (128, 64), 'early_stopping': True, 'max_iter': 300,
+                            'random_state': seed, **params})
+
+
+# Name in training_results.json: (builder, module it needs)
+CANDIDATES = {
+    'random_forest': (build_random_forest, 'sklearn'),
+    'xgboost': (build_xgboost, 'xgboost'),
+    'lightgbm': (build_lightgbm, 'lightgbm'),
+    'neural_network': (build_neural_network, 'sklearn'),
+}
+
+
+def available_models(names):
+    """The requested candidates whose library is installed; the others are reported and skipped."""
+    import importlib.util
+    available = []
+    for name in names:
+        module = CANDIDATES[name][1]
+        if importlib.util.find_spec(module) is None:
+            print(f"Skipping {name}: the '{module}' package is not installed")
+        else:
+            available.append(name)
+    return available
+
+
+# --- Cached dataset and folds ---
+
+def dataset_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def prepare_cache(dataset_path, folds, test_size, seed):
+    """Cache the feature matrix, labels and fold assignment of a dataset; return the cache directory.
+
+    ``folds_<k>_<test size>_<seed>.npz`` holds each row's cross-validation fold
+    and whether it is in the held-out test split.
+    """
+    cache = CACHE_DIR / dataset_digest(dataset_path)
+    if not (cache / 'features.npy').exists():
+        print(f"Building the feature cache in {cache}")
+        df = load_dataset(dataset_path, DIRECT_SCORE_FEATURES + [LABEL_COLUMN])
+        features = add_engineered_features(df[DIRECT_SCORE_FEATURES].astype(np.float64))
+        classes, labels = np.unique(df[LABEL_COLUMN].astype(str).to_numpy(), return_inverse=True)
+        cache.mkdir(parents=True, exist_ok=True)
+        np.save(cache / 'labels.npy', labels.astype(np.int32))
+        with open(cache / 'classes.json', 'w') as f:
+            json.dump(classes.tolist(), f)
+        # Written last: its presence marks a complete cache
+        np.save(cache / 'features.npy', features.to_numpy())
+
+    folds_path = cache / f'folds_{folds}_{test_size}_{seed}.npz'
+    if not folds_path.exists():
+        labels = np.load(cache / 'labels.npy')
+        fold = np.empty(len(labels), dtype=np.int16)
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+        for index, (_, test) in enumerate(splitter.split(np.zeros(len(labels)), labels)):
+            fold[test] = index
+        _, test = train_test_split(np.arange(len(labels)), test_size=test_size, stratify=labels,
+                                   random_state=seed)
+        holdout = np.zeros(len(labels), dtype=bool)
+        holdout[test] = True
+        np.savez(folds_path, fold=fold, holdout=holdout)
+    return cache, folds_path
+
+
+def load_cache(cache, folds_path):
+    """(features, labels, fold, holdout), with the large arrays memory-mapped."""
+    splits = np.load(folds_path)
+    return (np.load(cache / 'features.npy', mmap_mode='r'), np.load(cache / 'labels.npy'),
+            splits['fold'], splits['holdout'])
+
+
+# --- Training tasks ---
+
+def fit_pipeline(name, X, y, seed):
+    """Fit a scaler and a candidate model on X; return (scaler, model, fit seconds)."""
+    scaler = StandardScaler().fit(X)
+    model = CANDIDATES[name][0](seed)
+    start = time.perf_counter()
+    model.fit(scaler.transform(X), y)
+    return scaler, model, time.perf_counter() - start
+
+
+def score(model, scaler, X, y, n_classes):
+    """Accuracy, macro one-vs-rest ROC AUC and predictions of a fitted model."""
+    probabilities = np.zeros((len(X), n_classes))
+    # A model fitted on a split may not have seen every career
+    probabilities[:, model.classes_] = model.predict_proba(scaler.transform(X))
+    predicted = np.argmax(probabilities, axis=1)
+    try:
+        roc_auc = float(roc_auc_score(y, probabilities, multi_class='ovr', labels=np.arange(n_classes)))
+    except ValueError:
+        roc_auc = None
+    return float(np.mean(predicted == y)), roc_auc, predicted
+
+
+def run_task(task):
+    """Fit one model on one split. split is a fold index or 'holdout'."""
+    name, split, cache, folds_path, seed = task
+    features, labels, fold, holdout = load_cache(cache, folds_path)
+    n_classes = int(labels.max()) + 1
+    test = holdout if split == 'holdout' else fold == split
+    X_train, y_train = np.asarray(features[~test]), labels[~test]
+    X_test, y_test = np.asarray(features[test]), labels[test]
+
+    scaler, model, fit_seconds = fit_pipeline(name, X_train, y_train, seed)
+    accuracy, roc_auc, predicted = score(model, scaler, X_test, y_test, n_classes)
+    result = {'name': name, 'split': split, 'accuracy': accuracy, 'roc_auc': roc_auc,
+              'fit_seconds': fit_seconds}
+    if split == 'holdout':
+        result['report'] = classification_report(y_test, predicted, labels=np.arange(n_classes),
+                                                 output_dict=True, zero_division=0)
+        result['model'] = model
+        result['scaler'] = scaler
+    return result
+
+
+def run_tasks(tasks, workers):
+    """Run every task, in a process pool when workers > 1; results come back in task order."""
+    if workers <= 1:
+        return [run_task(task) for task in tasks]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(run_task, tasks))
+
+
+# --- Inference cost ---
+
+def inference_latency(pipeline, features):
+    """Single-row and batched latency of the pipeline as the service runs it."""
+    from benchmarks import measure
+    from predictor import Predictor
+
+    predictor = Predictor(pipeline)
+    direct = np.asarray(features[:LATENCY_BATCH_ROWS])[:, [EXPECTED_FEATURES_ORDER.index(f)
+                                                           for f in DIRECT_SCORE_FEATURES]]
+    scores = dict(zip(DIRECT_SCORE_FEATURES, direct[0].tolist()))
+    single = measure(lambda: predictor.predict_score_rows([scores]), min_seconds=0.2)
+    batch = measure(lambda: predictor.predict_top_n(predictor.scale_score_matrix(direct)), min_seconds=0.2)
+    return {
+        'single_row_ms': single['median_ms'],
+        'batch_rows': len(direct),
+        'batch_ms': batch['median_ms'],
+        'batch_per_row_us': batch['median_ms'] * 1000.0 / len(direct),
+    }
+
+
+# --- Main ---
+
+def summarise(results, pipeline, features):
+    folds = [result for result in results if result['split'] != 'holdout']
+    holdout = next(result for result in results if result['split'] == 'holdout')
+    fold_accuracy = [result['accuracy'] for result in folds]
+    fold_roc_auc = [result['roc_auc'] for result in folds if result['roc_auc'] is not None]
+    return {
+        'accuracy': holdout['accuracy'],
+        'roc_auc': holdout['roc_auc'],
+        'report': holdout['report'],
+        'cv': {
+            'folds': len(folds),
+            'accuracy_mean': float(np.mean(fold_accuracy)),
+            'accuracy_std': float(np.std(fold_accuracy)),
+            'roc_auc_mean': float(np.mean(fold_roc_auc)) if fold_roc_auc else None,
+            'fold_accuracy': fold_accuracy,
+        },
+        'training_time_seconds': holdout['fit_seconds'],
+        'inference_latency': inference_latency(pipeline, features),
+        'model_size_bytes': len(pickle.dumps(pipeline['model'], protocol=pickle.HIGHEST_PROTOCOL)),
+        'params': {key: value for key, value in pipeline['model'].get_params().items()
+                   if isinstance(value, (int, float, str, bool, type(None)))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and compare career models")
+    parser.add_argument('dataset', help="CSV or columnar (.cbin) dataset from generate_career_dataset.py")
+    parser.add_argument('--models', nargs='+', choices=list(CANDIDATES), default=list(CANDIDATES))
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS, help="Cross-validation folds")
+    parser.add_argument('--test-size', type=float, default=DEFAULT_TEST_SIZE, help="Held-out share for the report")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0: one per CPU)")
+    parser.add_argument('--output', default=str(PIPELINE_PATH), help="Pipeline pickle to write")
+    parser.add_argument('--results', default=str(RESULTS_PATH), help="training_results.json to update")
+    parser.add_argument('--export', action='store_true', help="Also write the memory-mapped .model artifact")
+    parser.add_argument('--search', choices=['lightgbm', 'xgboost', 'random_forest'], default=None,
+                        help="Search this model's hyperparameters instead of comparing models")
+    parser.add_argument('--cpu-budget', type=float, default=600.0, help="Total CPU seconds for --search")
+    parser.add_argument('--trials', type=int, default=27, help="Configurations sampled by --search")
+    parser.add_argument('--eta', type=int, default=3, help="Share kept (1/eta) and growth factor per rung")
+    parser.add_argument('--max-rounds', type=int, default=243, help="Boosting rounds (trees) in the last rung")
+    parser.add_argument('--search-results', default=None, help="search_results.json to write")
+    args = parser.parse_args()
+
+    if args.search:
+        if not available_models([args.search]):
+            sys.exit(1)
+        import hyperparameter_search
+        cache, folds_path = prepare_cache(args.dataset, args.folds, args.test_size, args.seed)
+        report = hyperparameter_search.successive_halving(
+            args.search, cache, folds_path, n_trials=args.trials, eta=args.eta, max_rounds=args.max_rounds,
+            cpu_budget=args.cpu_budget, workers=args.workers or os.cpu_count(), seed=args.seed)
+        hyperparameter_search.print_pareto_front(report)
+        hyperparameter_search.write_report(report, args.search_results or hyperparameter_search.SEARCH_RESULTS_PATH)
+        return
+
+    names = available_models(args.models)
+    if not names:
+        sys.exit(1)
+    cache, folds_path = prepare_cache(args.dataset, args.folds, args.test_size, args.seed)
+    features, labels, _, _ = load_cache(cache, folds_path)
+    with open(cache / 'classes.json') as f:
+        classes = json.load(f)
+    print(f"{len(labels)} rows, {len(classes)} careers, {len(EXPECTED_FEATURES_ORDER)} features")
+
+    tasks = [(name, split, cache, folds_path, args.seed)
+             for split in ['holdout'] + list(range(args.folds)) for name in names]
+    start = time.perf_counter()
+    results = run_tasks(tasks, args.workers or os.cpu_count())
+    print(f"Trained {len(tasks)} fits in {time.perf_counter() - start:.1f}s")
+
+    encoder = LabelEncoder().fit(classes)
+    summaries = {}
+    for name in names:
+        model_results = [result for result in results if result['name'] == name]
+        holdout = next(result for result in model_results if result['split'] == 'holdout')
+        pipeline = {'model': holdout['model'], 'scaler': holdout['scaler'], 'encoder': encoder,
+                    'feature_names': list(EXPECTED_FEATURES_ORDER)}
+        summary = summaries[name] = summarise(model_results, pipeline, features)
+        print(f"{name:<16} cv accuracy {summary['cv']['accuracy_mean']:.4f} +/- {summary['cv']['accuracy_std']:.4f}"
+              f"  holdout {summary['accuracy']:.4f}  fit {summary['training_time_seconds']:.1f}s"
+              f"  latency {summary['inference_latency']['single_row_ms']:.2f} ms/row,"
+              f" {summary['inference_latency']['batch_per_row_us']:.1f} us/row batched")
+
+    best = max(summaries, key=lambda name: summaries[name]['cv']['accuracy_mean'])
+    for name, summary in summaries.items():
+        summary['selected'] = name == best
+
+    # Refit the winner on every row for the served pipeline; the scaler is fitted on a
+    # DataFrame so it also accepts the service's pandas path without warnings
+    full = pd.DataFrame(np.asarray(features), columns=EXPECTED_FEATURES_ORDER)
+    scaler = StandardScaler().fit(full)
+    model = CANDIDATES[best][0](args.seed)
+    model.fit(scaler.transform(full), labels)
+    pipeline = {'model': model, 'scaler': scaler, 'encoder': encoder, 'feature_names': list(EXPECTED_FEATURES_ORDER)}
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    joblib.dump(pipeline, args.output)
+    print(f"Selected {best}; pipeline written to {args.output}")
+    if args.export:
+        artifact = os.path.splitext(args.output)[0] + '.model'
+        export_pipeline(pipeline, artifact, source=args.output)
+        print(f"Memory-mapped artifact written to {artifact}")
+
+    # Models not retrained this run keep their previous entries
+    stored = {}
+    if os.path.exists(args.results):
+        with open(args.results) as f:
+            stored = json.load(f)
+    for entry in stored.values():
+        entry.pop('selected', None)
+    stored.update(summaries)
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, 'w') as f:
+        json.dump(stored, f, indent=4)
+    print(f"Results written to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
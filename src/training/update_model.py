@@ -0,0 +1,471 @@
+"""Incremental update of the served career pipeline from newly collected test results.
+
+Instead of a full offline retrain, the existing model keeps its trees and
+training continues from it on the labelled (or feedback-confirmed) score
+vectors collected since the last version:
+
+* LightGBM and XGBoost models get ``--rounds`` more boosting rounds, starting
+  from the current ensemble (``init_model`` / ``xgb_model``);
+* a random forest grows ``--rounds`` more trees with ``warm_start``.
+
+The scaler is updated online: ``StandardScaler.partial_fit`` merges the new
+rows into the mean and variance it was fitted with. The existing trees split
+on scaled scores, so every threshold is moved by the same per-feature affine
+map as the scaler; the old trees then make exactly the decisions they made
+before, which the report checks as ``remap_max_probability_change``.
+
+Boosting on a few new rows alone would drift towards the careers they happen
+to contain, so ``--replay`` mixes in a sample of the reference dataset the
+model was trained on. Careers absent from the update set are still passed to
+the model as zero-weight rows, so its classes keep matching the encoder.
+
+Each run writes a new versioned pipeline, ``career_model_pipeline-<version>.pkl``
+(and with ``--export`` the ``.model`` artifact), into the models directory the
+service watches. Its ``version_info`` records the parent version and the date
+of the newest result used, where the next update starts. A share of the new
+rows is held back to compare the base model, the update and, with
+``--compare``, a full retrain of the same model configuration on the reference
+data plus the new rows; the report is appended to
+``models/results/update_results.json``.
+
+New results are JSON lines, one completed test each, with the scores in the
+backend's ``testResults.psychometric.scores`` shape (or flat model feature
+names), the confirmed career and the test date::
+
+    {"scores": {"abilities": {...}, "orientations": {...}}, "career": "Data Scientist", "date": "2026-10-01T12:00:00Z"}
+
+CSV and columnar datasets with a ``career`` column are read as well.
+
+Usage:
+    python update_model.py new_results.jsonl --model ../../ML/career_model_pipeline.pkl
+    python update_model.py new_results.jsonl --replay ../../career_dataset.csv --rounds 50 --compare
+    python update_model.py feedback.csv --since 2026-10-01 --output-dir ../../models --export
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+# Share the dataset reader, feature construction and model format with the ML service
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'ML'))
+from dataset_store import LABEL_COLUMN, load_dataset
+from inference import DIRECT_SCORE_FEATURES, EXPECTED_FEATURES_ORDER, add_engineered_features
+from model_store import (MODEL_BASENAME, artifact_version, export_pipeline, is_artifact_dir, read_manifest,
+                         resolve_model_path)
+from train_model import DEFAULT_FOLDS, DEFAULT_SEED, DEFAULT_TEST_SIZE, ROOT_DIR, load_cache, prepare_cache, score
+
+MODELS_DIR = ROOT_DIR / 'models'
+UPDATE_RESULTS_PATH = MODELS_DIR / 'results' / 'update_results.json'
+
+DEFAULT_ROUNDS = 50
+DEFAULT_REPLAY_RATIO = 1.0
+DEFAULT_EVAL_SHARE = 0.2
+
+# Model families that can continue training, by estimator class
+WARM_START_FAMILIES = {
+    'LGBMClassifier': 'lightgbm',
+    'XGBClassifier': 'xgboost',
+    'RandomForestClassifier': 'random_forest',
+}
+
+# The base model is confident, so the hessians of rows it gets wrong are tiny and unbounded
+# Newton steps would overwrite what the old trees learned; the added rounds cap their leaf values
+CONTINUATION_PARAMS = {
+    'lightgbm': {'max_delta_step': 1.0},
+    'xgboost': {'max_delta_step': 1.0},
+}
+
+# Backend score names (testResults.psychometric.scores), as mapped by toModelScores in modelWorker.ts
+BACKEND_SCORE_NAMES = {
+    'abilities': {
+        'cognition': 'cognition',
+        'reasoning': 'reasoning',
+        'figuralMemory': 'figural_memory',
+        'spatialAbility': 'spatial_ability',
+        'verbalAbility': 'verbal_ability',
+        'socialAbility': 'social_ability',
+        'numericalAbility': 'numerical_ability',
+        'numericalMemory': 'numerical_memory',
+    },
+    'orientations': {
+        'knowledge': 'knowledge',
+        'practical': 'practical',
+        'artistic': 'artistic',
+        'social': 'social',
+        'powerCopingStyle': 'power_coping',
+    },
+}
+
+
+# --- New results ---
+
+def model_scores(scores):
+    """Flat model feature scores from a backend score document (or already flat scores)."""
+    if 'abilities' not in scores and 'orientations' not in scores:
+        return scores
+    flat = {}
+    for group, names in BACKEND_SCORE_NAMES.items():
+        for backend_name, feature in names.items():
+            flat[feature] = (scores.get(group) or {}).get(backend_name)
+    return flat
+
+
+def read_results_file(path):
+    """DataFrame of the direct scores, career and (possibly missing) date of one results file."""
+    if not path.endswith(('.jsonl', '.json')):
+        df = load_dataset(path, DIRECT_SCORE_FEATURES + [LABEL_COLUMN])
+        df['date'] = pd.NaT
+        return df
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            career = record.get('career') or record.get('confirmedCareer')
+            if not career:
+                continue
+            scores = model_scores(record.get('scores') or {})
+            rows.append({**{feature: scores.get(feature) for feature in DIRECT_SCORE_FEATURES},
+                         LABEL_COLUMN: career, 'date': record.get('date')})
+    return pd.DataFrame(rows, columns=DIRECT_SCORE_FEATURES + [LABEL_COLUMN, 'date'])
+
+
+def read_new_results(paths, since=None):
+    """Labelled results of all files that are complete and newer than since."""
+    df = pd.concat([read_results_file(path) for path in paths], ignore_index=True)
+    df['date'] = pd.to_datetime(df['date'], utc=True, errors='coerce')
+    df[DIRECT_SCORE_FEATURES] = df[DIRECT_SCORE_FEATURES].apply(pd.to_numeric, errors='coerce')
+    complete = df[DIRECT_SCORE_FEATURES].notna().all(axis=1)
+    if complete.sum() < len(df):
+        print(f"Skipping {len(df) - complete.sum()} results with missing scores")
+    df = df[complete]
+    if since is not None:
+        # Undated rows (dataset files) are always new
+        df = df[df['date'].isna() | (df['date'] > since)]
+    return df.reset_index(drop=True)
+
+
+# --- Scaler and threshold updates ---
+
+def split_remap(old_scaler, new_scaler):
+    """Per-feature (a, b) with new_scaled = a * old_scaled + b."""
+    a = old_scaler.scale_ / new_scaler.scale_
+    b = (old_scaler.mean_ - new_scaler.mean_) / new_scaler.scale_
+    return a, b
+
+
+def remap_sklearn_forest(model, a, b):
+    model = copy.deepcopy(model)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        # Writes go straight into the tree's node array
+        threshold = tree.threshold
+        internal = tree.children_left != -1
+        feature = tree.feature[internal]
+        threshold[internal] = threshold[internal] * a[feature] + b[feature]
+    return model
+
+
+def remap_lightgbm(model, a, b):
+    import lightgbm
+
+    def remap(values, feature):
+        return ' '.join(repr(float(float(value) * a[f] + b[f])) for value, f in zip(values, feature))
+
+    lines = model.booster_.model_to_string().split('\n')
+    split_feature = None
+    for i, line in enumerate(lines):
+        key, _, value = line.partition('=')
+        if key == 'split_feature':
+            split_feature = [int(f) for f in value.split()]
+        elif key == 'threshold' and split_feature is not None:
+            lines[i] = 'threshold=' + remap(value.split(), split_feature)
+        elif key == 'feature_infos':
+            infos = []
+            for f, info in enumerate(value.split()):
+                if info.startswith('['):
+                    low, high = info[1:-1].split(':')
+                    info = f"[{remap([low], [f])}:{remap([high], [f])}]"
+                infos.append(info)
+            lines[i] = 'feature_infos=' + ' '.join(infos)
+        elif line.startswith('Tree='):
+            split_feature = None
+    # tree_sizes gives each tree's length in bytes, which the new thresholds change; without it
+    # LightGBM parses the trees one after another
+    return lightgbm.Booster(model_str='\n'.join(line for line in lines if not line.startswith('tree_sizes=')))
+
+
+def remap_xgboost(model, a, b):
+    import xgboost
+
+    raw = json.loads(model.get_booster().save_raw('json'))
+    for tree in raw['learner']['gradient_booster']['model']['trees']:
+        # Leaves keep their value in split_conditions, so only internal nodes move
+        internal = np.asarray(tree['left_children']) != -1
+        feature = np.asarray(tree['split_indices'])[internal]
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+        conditions[internal] = conditions[internal] * a[feature] + b[feature]
+        tree['split_conditions'] = conditions.tolist()
+    booster = xgboost.Booster()
+    booster.load_model(bytearray(json.dumps(raw).encode()))
+    return booster
+
+
+REMAP = {
+    'lightgbm': remap_lightgbm,
+    'xgboost': remap_xgboost,
+    'random_forest': remap_sklearn_forest,
+}
+
+
+def remapped_probabilities(family, remapped, X):
+    if family == 'lightgbm':
+        return remapped.predict(X)
+    if family == 'xgboost':
+        import xgboost
+        return remapped.predict(xgboost.DMatrix(X, feature_names=remapped.feature_names))
+    return remapped.predict_proba(X)
+
+
+# --- Warm-started training ---
+
+def with_every_class(X, y, n_classes):
+    """Append one zero-weight row per class missing from y; return (X, y, sample_weight)."""
+    missing = np.setdiff1d(np.arange(n_classes), y)
+    weight = np.ones(len(y) + len(missing))
+    weight[len(y):] = 0.0
+    return (np.vstack([X, np.zeros((len(missing), X.shape[1]))]), np.concatenate([y, missing]), weight)
+
+
+def continue_training(family, model, remapped, X, y, rounds, n_classes):
+    """Train rounds more rounds (or trees) on top of the remapped model; return the new model."""
+    X, y, weight = with_every_class(X, y, n_classes)
+    if family == 'lightgbm':
+        updated = type(model)(**{**model.get_params(), **CONTINUATION_PARAMS[family], 'n_estimators': rounds})
+        updated.fit(X, y, sample_weight=weight, init_model=remapped)
+    elif family == 'xgboost':
+        updated = type(model)(**{**model.get_params(), **CONTINUATION_PARAMS[family], 'n_estimators': rounds,
+                                 'early_stopping_rounds': None})
+        updated.fit(X, y, sample_weight=weight, xgb_model=remapped)
+    else:
+        updated = remapped
+        updated.set_params(warm_start=True, n_estimators=len(updated.estimators_) + rounds)
+        updated.fit(X, y, sample_weight=weight)
+        updated.set_params(warm_start=False)
+    return updated
+
+
+def n_trees(family, model):
+    if family == 'lightgbm':
+        return model.booster_.num_trees()
+    if family == 'xgboost':
+        return model.get_booster().num_boosted_rounds()
+    return len(model.estimators_)
+
+
+# --- Job ---
+
+def base_pipeline_path(path=None):
+    """The pickled pipeline to start from; an exported artifact points back to its pickle."""
+    path = resolve_model_path(path)
+    if is_artifact_dir(path):
+        source = read_manifest(path).get('source')
+        if not source or not os.path.isfile(source):
+            raise ValueError(f"{path} has no source pickle to continue training from")
+        path = source
+    return path
+
+
+def features_of(df):
+    return add_engineered_features(df[DIRECT_SCORE_FEATURES].astype(np.float64))[EXPECTED_FEATURES_ORDER]
+
+
+def scaler_input(scaler, X):
+    """X as the scaler was fitted: a DataFrame for the served pipeline's scaler, else the array."""
+    return pd.DataFrame(X, columns=EXPECTED_FEATURES_ORDER) if hasattr(scaler, 'feature_names_in_') else X
+
+
+def reference_rows(dataset, encoder, seed):
+    """(features, labels) of the reference dataset's training and held-out splits, in encoder codes."""
+    cache, folds_path = prepare_cache(dataset, DEFAULT_FOLDS, DEFAULT_TEST_SIZE, seed)
+    features, labels, _, holdout = load_cache(cache, folds_path)
+    with open(cache / 'classes.json') as f:
+        classes = np.asarray(json.load(f))
+    known = np.isin(classes, encoder.classes_)
+    codes = np.full(len(classes), -1)
+    codes[known] = encoder.transform(classes[known])
+    labels = codes[labels]
+    train = np.flatnonzero(~holdout & (labels >= 0))
+    test = np.flatnonzero(holdout & (labels >= 0))
+    return (np.asarray(features[train]), labels[train]), (np.asarray(features[test]), labels[test])
+
+
+def full_retrain(model, X, y):
+    """Fit a fresh scaler and a fresh copy of model, with the same configuration, on X."""
+    params = model.get_params()
+    if 'early_stopping_rounds' in params:
+        # A tuned XGBoost model may carry it, but a retrain has no validation set to stop on
+        params['early_stopping_rounds'] = None
+    scaler = StandardScaler().fit(X)
+    return scaler, type(model)(**params).fit(scaler.transform(X), y)
+
+
+def accuracy(model, scaler, X, y, n_classes):
+    return score(model, scaler, scaler_input(scaler, X), y, n_classes)[0] if len(y) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start the career model on newly collected results")
+    parser.add_argument('results', nargs='+', help="JSON lines of results, or CSV/.cbin datasets with a career column")
+    parser.add_argument('--model', default=None, help="Pipeline to update (default: the served one)")
+    parser.add_argument('--since', default=None,
+                        help="Only use results after this date (default: the newest one the model has seen)")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="Boosting rounds (or trees) to add")
+    parser.add_argument('--replay', default=None, help="Reference dataset to mix into the update")
+    parser.add_argument('--replay-ratio', type=float, default=DEFAULT_REPLAY_RATIO,
+                        help="Reference rows replayed per new row")
+    parser.add_argument('--eval-share', type=float, default=DEFAULT_EVAL_SHARE,
+                        help="Share of the new results held back for the report")
+    parser.add_argument('--freeze-scaler', action='store_true', help="Keep the scaler statistics unchanged")
+    parser.add_argument('--compare', action='store_true',
+                        help="Also run a full retrain on the reference dataset plus the new results")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output-dir', default=str(MODELS_DIR), help="Directory the new version is written to")
+    parser.add_argument('--export', action='store_true', help="Also write the memory-mapped .model artifact")
+    parser.add_argument('--results-file', default=str(UPDATE_RESULTS_PATH), help="update_results.json to append to")
+    args = parser.parse_args()
+    if args.compare and not args.replay:
+        parser.error("--compare needs the reference dataset given with --replay")
+    if args.rounds < 1:
+        parser.error("--rounds must be at least 1")
+
+    start = time.perf_counter()
+    model_path = base_pipeline_path(args.model)
+    base = joblib.load(model_path)
+    model, scaler, encoder = base['model'], base['scaler'], base['encoder']
+    family = WARM_START_FAMILIES.get(type(model).__name__)
+    if family is None:
+        print(f"Cannot warm-start a {type(model).__name__}; run train_model.py instead")
+        sys.exit(1)
+    n_classes = len(encoder.classes_)
+    info = base.get('version_info') or {}
+
+    since = args.since or info.get('data_until')
+    since = pd.to_datetime(since, utc=True) if since else None
+    new = read_new_results(args.results, since)
+    unknown = ~new[LABEL_COLUMN].astype(str).isin(encoder.classes_)
+    if unknown.any():
+        print(f"Skipping {unknown.sum()} results for careers the model does not know: "
+              f"{', '.join(sorted(new.loc[unknown, LABEL_COLUMN].astype(str).unique()))}")
+        new = new[~unknown].reset_index(drop=True)
+    if new.empty:
+        print(f"No new results since {since}" if since is not None else "No new results")
+        return
+    print(f"Updating {family} model {artifact_version(model_path)} from {model_path} with {len(new)} new results")
+
+    X_new = features_of(new)
+    y_new = encoder.transform(new[LABEL_COLUMN].astype(str))
+    order = np.random.default_rng(args.seed).permutation(len(new))
+    n_eval = int(len(new) * args.eval_share)
+    held_back, fresh = order[:n_eval], order[n_eval:]
+
+    # Online scaler update, with the existing trees' thresholds moved to match
+    new_scaler = copy.deepcopy(scaler)
+    if not args.freeze_scaler:
+        new_scaler.partial_fit(X_new.iloc[fresh])
+    a, b = split_remap(scaler, new_scaler)
+    remapped = REMAP[family](model, a, b)
+    remap_change = float(np.abs(model.predict_proba(scaler.transform(X_new))
+                                - remapped_probabilities(family, remapped, new_scaler.transform(X_new))).max())
+
+    X_train, y_train = X_new.to_numpy()[fresh], y_new[fresh]
+    reference_test = (np.empty((0, len(EXPECTED_FEATURES_ORDER))), np.empty(0, dtype=int))
+    if args.replay:
+        reference_train, reference_test = reference_rows(args.replay, encoder, args.seed)
+        replay_rows = min(int(len(fresh) * args.replay_ratio), len(reference_train[1]))
+        replay = np.random.default_rng(args.seed + 1).choice(len(reference_train[1]), replay_rows, replace=False)
+        X_train = np.vstack([X_train, reference_train[0][replay]])
+        y_train = np.concatenate([y_train, reference_train[1][replay]])
+
+    updated = continue_training(family, model, remapped, new_scaler.transform(scaler_input(new_scaler, X_train)),
+                                y_train, args.rounds, n_classes)
+    update_seconds = time.perf_counter() - start
+
+    version = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+    newest = new['date'].max()
+    pipeline = {
+        'model': updated, 'scaler': new_scaler, 'encoder': encoder,
+        'feature_names': list(base.get('feature_names') or EXPECTED_FEATURES_ORDER),
+        'version_info': {
+            'version': version,
+            'parent': artifact_version(model_path),
+            'parent_path': os.path.abspath(model_path),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'data_until': newest.isoformat() if pd.notna(newest) else info.get('data_until'),
+            'new_rows': int(len(fresh)),
+            'replay_rows': int(len(y_train) - len(fresh)),
+            'rounds_added': args.rounds,
+        },
+    }
+    output = os.path.join(args.output_dir, f'{MODEL_BASENAME}-{version}.pkl')
+    os.makedirs(args.output_dir, exist_ok=True)
+    joblib.dump(pipeline, output)
+    print(f"Updated pipeline written to {output} in {update_seconds:.1f}s "
+          f"({n_trees(family, model)} -> {n_trees(family, updated)} trees)")
+    if args.export:
+        artifact = os.path.splitext(output)[0] + '.model'
+        export_pipeline(pipeline, artifact, source=output)
+        print(f"Memory-mapped artifact written to {artifact}")
+
+    X_held, y_held = X_new.to_numpy()[held_back], y_new[held_back]
+    evaluation = {
+        'base': {'new_results': accuracy(model, scaler, X_held, y_held, n_classes),
+                 'reference_holdout': accuracy(model, scaler, *reference_test, n_classes)},
+        'update': {'new_results': accuracy(updated, new_scaler, X_held, y_held, n_classes),
+                   'reference_holdout': accuracy(updated, new_scaler, *reference_test, n_classes),
+                   'seconds': update_seconds},
+    }
+    if args.compare:
+        retrain_start = time.perf_counter()
+        full_scaler, full_model = full_retrain(
+            model, np.vstack([reference_train[0], X_new.to_numpy()[fresh]]),
+            np.concatenate([reference_train[1], y_new[fresh]]))
+        evaluation['full_retrain'] = {
+            'new_results': accuracy(full_model, full_scaler, X_held, y_held, n_classes),
+            'reference_holdout': accuracy(full_model, full_scaler, *reference_test, n_classes),
+            'seconds': time.perf_counter() - retrain_start,
+        }
+
+    print(f"\n{'':<14} {'new results':>12} {'reference':>10} {'seconds':>8}")
+    for name, result in evaluation.items():
+        cells = [f"{result[key]:.4f}" if result.get(key) is not None else '-'
+                 for key in ('new_results', 'reference_holdout')]
+        seconds = f"{result['seconds']:.1f}" if 'seconds' in result else '-'
+        print(f"{name:<14} {cells[0]:>12} {cells[1]:>10} {seconds:>8}")
+    print(f"Largest probability change from moving the thresholds: {remap_change:.2e}")
+
+    report = {**pipeline['version_info'], 'model': family, 'path': output, 'held_back_rows': int(n_eval),
+              'reference_holdout_rows': int(len(reference_test[1])), 'remap_max_probability_change': remap_change,
+              'accuracy': evaluation}
+    runs = []
+    if os.path.exists(args.results_file):
+        with open(args.results_file) as f:
+            runs = json.load(f)
+    runs.append(report)
+    os.makedirs(os.path.dirname(os.path.abspath(args.results_file)), exist_ok=True)
+    with open(args.results_file, 'w') as f:
+        json.dump(runs, f, indent=4)
+    print(f"Report appended to {args.results_file}")
+
+
+if __name__ == '__main__':
+    main()